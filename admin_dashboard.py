@@ -1,13 +1,267 @@
+import functools
+import uuid
+
+import pandas as pd
 import streamlit as st
-from utils import load_design_system, render_header
+from utils import load_design_system, persisted_session, render_header
+from claims_store import STATUSES, join_rows
+from decision_log import DECISION_STATUSES, DecisionLog
+from detail_cache import DetailCache, assemble_detail
+from duplicate_index import DuplicateIndex, claim_digests, fingerprint_images
+from claims_query import DEFAULT_PAGE_SIZE, PAGE_SIZES, ClaimFilter, ClaimsGrid
+from kpi_aggregates import KpiAggregates
+from risk_scoring import RiskScores
+from session_store import open_session_backend
+from rule_engine import OUTCOME_LABELS, SEVERITY_LEVEL_NAMES, claim_values, evaluate_rules, evidence_images, model_severity
+from evidence_index import load_evidence_index
+from geo_index import LOCATION_RADIUS_KM, GeoIndex, resolve_location
+from image_store import ImageStore
+from instrumentation import RECORDER, span, timed
+from severity_model import SeverityClassifier, assess_evidence, load_severity_model
+from telematics import incident_window, load_telematics
+from telematics_stream import start_live_telematics
+from warehouse import Warehouse
 
-# --- MOCK DATA (In real app, this comes from Databricks SQL) ---
-MOCK_CLAIMS = [
-    {"id": "CLM-8821", "policy": "66777", "date": "Aug 16, 2025", "amount": "$12,345", "severity": "Major", "status": "Under Review", "risk": "30%", "img": "car_crash_1.jpg"},
-    {"id": "CLM-9923", "policy": "76283", "date": "Aug 16, 2025", "amount": "$5,000", "severity": "Minor", "status": "Processed", "risk": "5%", "img": "car_crash_2.jpg"},
-    {"id": "CLM-1102", "policy": "12345", "date": "Aug 15, 2025", "amount": "$30,000", "severity": "Major", "status": "Under Review", "risk": "85%", "img": "car_crash_3.jpg"},
+SEVERITIES = ["Trivial Damage", "Minor Damage", "Major Damage", "Total Loss"]
+GRID_SORTS = {"Newest First": "newest", "Highest Risk": "risk"}
+# Checks filter: (ClaimFilter.checks, whether it reads the last bulk re-adjudication rather than the live rules)
+CHECK_FILTERS = {
+    "All Checks": (None, False),
+    "Passed All Checks": ("passed", False),
+    "Needs Attention": ("attention", False),
+    "Batch: Passed": ("passed", True),
+    "Batch: Needs Attention": ("attention", True),
+}
+# Risk scores from this level up are highlighted in the grid
+HIGH_RISK_PERCENT = 50
+# Other vehicles listed on the detail view that passed this close to the incident
+NEAR_INCIDENT_RADIUS_KM = LOCATION_RADIUS_KM
+NEAR_INCIDENT_LIMIT = 10
+# Gold columns included in the CSV export of the grid
+EXPORT_COLUMNS = [
+    "claim_no", "policy_no", "claim_date", "severity", "collision_type", "total",
+    "MAKE", "MODEL", "CHASSIS_NO", "SUM_INSURED", "name", "borough",
 ]
 
+# --- DATA ACCESS (parsed once per server process, shared by all sessions) ---
+@timed("data.get_warehouse")
+@st.cache_resource(show_spinner="Updating claims warehouse...")
+def get_warehouse():
+    warehouse = Warehouse()
+    warehouse.refresh()
+    return warehouse
+
+@timed("data.get_claims_store")
+@st.cache_resource(show_spinner="Loading claims data...")
+def get_claims_store():
+    # From silver, not gold: the grid pages, filters and sorts in memory (a gold read per
+    # page costs ~25 ms against ~0.2 ms) and must include claims logged since the refresh
+    store = get_warehouse().load_store()
+    # Claims and decisions committed to the log since the last warehouse refresh; later
+    # ones are applied by script runs (`apply_to`), while the log files compact off-thread
+    log = get_decision_log()
+    log.compact(store)
+    log.start_compaction()
+    return store
+
+@timed("data.get_decision_log")
+@st.cache_resource
+def get_decision_log():
+    return DecisionLog()
+
+@timed("data.get_telematics")
+@st.cache_resource(show_spinner="Loading telematics...")
+def get_telematics():
+    # Static partitions plus the live feed, ingested in the background
+    return start_live_telematics(load_telematics())
+
+@timed("data.get_geo_index")
+@st.cache_resource(show_spinner="Indexing GPS readings...")
+def get_geo_index():
+    # Static readings only; the live stream is not indexed by area
+    return GeoIndex.from_telematics(get_telematics().index)
+
+@timed("data.get_severity_classifier")
+@st.cache_resource(show_spinner="Loading severity model...")
+def get_severity_classifier():
+    return SeverityClassifier(load_severity_model())
+
+@timed("data.get_image_store")
+@st.cache_resource
+def get_image_store():
+    return ImageStore()
+
+@timed("data.get_evidence_digests")
+@st.cache_resource(show_spinner="Loading evidence images...")
+def get_evidence_digests():
+    return get_image_store().import_directory()
+
+@timed("data.get_evidence_assessments")
+@st.cache_resource(show_spinner="Assessing evidence images...")
+def get_evidence_assessments():
+    return assess_evidence(get_severity_classifier(), get_image_store(), get_evidence_digests())
+
+@timed("data.get_evidence_index")
+@st.cache_resource(show_spinner="Opening evidence index...")
+def get_evidence_index():
+    return load_evidence_index()
+
+# Derived structures are keyed by the store version so appended claims trigger a rebuild
+@timed("data.get_evidence_images")
+@st.cache_resource(max_entries=1)
+def get_evidence_images(version):
+    return evidence_images(get_claims_store(), get_evidence_index())
+
+@timed("data.get_claim_locations")
+@st.cache_resource(max_entries=1)
+def get_claim_locations(version):
+    return claim_values(get_claims_store(), get_decision_log().form_values("location"))
+
+@timed("data.get_duplicate_index")
+@st.cache_resource(show_spinner="Indexing duplicate evidence...", max_entries=1)
+def get_duplicate_index(version):
+    store = get_claims_store()
+    uploaded = claim_values(store, get_decision_log().form_values("image_digest"))
+    digests = claim_digests(get_evidence_images(version), get_evidence_digests(), uploaded)
+    return DuplicateIndex.from_store(store, digests, fingerprint_images(get_image_store(), digests))
+
+@timed("data.get_rule_results")
+@st.cache_resource(show_spinner="Running rule engine...", max_entries=1)
+def get_rule_results(version, telematics_version):
+    store = get_claims_store()
+    levels = model_severity(get_evidence_images(version), get_evidence_assessments())
+    return evaluate_rules(store, levels, get_telematics(), get_claim_locations(version),
+                          get_duplicate_index(version).matches())
+
+@timed("data.get_batch_outcomes")
+@st.cache_resource(max_entries=1)
+def get_batch_outcomes(version):
+    """Worst outcome per claim from the last readjudicate.py run (-1 where none), or None before the first run."""
+    claims = get_claims_store().claims
+    if "adjudication" not in claims:
+        return None
+    return pd.Categorical(claims["adjudication"], categories=OUTCOME_LABELS).codes
+
+@timed("data.get_risk_scores")
+@st.cache_resource(show_spinner="Scoring claim risk...")
+def get_risk_scores():
+    store = get_claims_store()
+    inputs = get_rule_results(store.version, get_telematics().version).inputs
+    # Later submissions are scored incrementally by the listener
+    risk = RiskScores.score_all(store, get_telematics(), speed=(inputs["speed_readings"], inputs["max_speed"]))
+    store.add_listener(risk)
+    return risk
+
+@timed("data.get_claims_grid")
+@st.cache_resource(show_spinner="Indexing claims...", max_entries=2)
+def get_claims_grid(version, sort="newest"):
+    store = get_claims_store()
+    return ClaimsGrid(store, get_risk_scores().sort_key() if sort == "risk" else None)
+
+@timed("data.get_detail_cache")
+@st.cache_resource
+def get_detail_cache():
+    cache = DetailCache()
+    get_claims_store().add_listener(cache)
+    get_telematics().add_listener(cache)
+    return cache
+
+def detail_builder():
+    """Assembles detail payloads from the data versions current in this run."""
+    store, telematics = get_claims_store(), get_telematics()
+    return functools.partial(
+        assemble_detail, store=store, rules=get_rule_results(store.version, telematics.version),
+        risk=get_risk_scores(), evidence_index=get_evidence_index(), digests=get_evidence_digests(),
+        assessments=get_evidence_assessments(), telematics=telematics, image_store=get_image_store(),
+    )
+
+@timed("data.get_kpis")
+@st.cache_resource
+def get_kpis():
+    store = get_claims_store()
+    kpis = KpiAggregates.from_claims(store.claims)
+    store.add_listener(kpis)
+    return kpis
+
+@timed("data.get_session_backend")
+@st.cache_resource
+def get_session_backend():
+    return open_session_backend()
+
+# Session-state keys that follow a user across replicas and restarts (ids only)
+PERSISTED_KEYS = ('current_view', 'selected_claim', 'decision_lsn')
+
+def session_id():
+    return st.session_state.setdefault('session_id', uuid.uuid4().hex)
+
+@timed("data.record_decision")
+def record_decision(claim_no, decision):
+    """Commits the decision to the log, then applies it to this process's store."""
+    st.session_state['decision_lsn'] = get_decision_log().record_decision(claim_no, decision, session=session_id())
+    get_claims_store().set_status(claim_no, DECISION_STATUSES[decision])
+    get_detail_cache().invalidate(claim_no)
+
+@timed("data.vehicles_near_incident")
+def vehicles_near_incident(claim, chassis):
+    """
+    (place, vehicles, window) for the detail view: the other vehicles with a GPS
+    fix within NEAR_INCIDENT_RADIUS_KM of the incident during its window, closest
+    first, with the policy insuring each (if any). The incident is placed at the
+    stated location, else at the insured vehicle's own fixes in the window; place
+    is None when neither exists.
+    """
+    store = get_claims_store()
+    start, end = incident_window(claim['date'], claim['hour'])
+    place = get_claim_locations(store.version)[store.claim_row(claim['claim_no'])]
+    point = resolve_location(place)
+    if point is None and chassis:
+        fixes = get_telematics().index.readings(chassis, start, end)
+        if len(fixes):
+            place, point = "the insured vehicle", (float(fixes['latitude'].mean()), float(fixes['longitude'].mean()))
+    if point is None:
+        return None, None, (start, end)
+    vehicles = get_geo_index().vehicles_near(*point, NEAR_INCIDENT_RADIUS_KM, int(start), int(end))
+    vehicles = vehicles[vehicles['chassis_no'] != chassis].reset_index(drop=True)
+    policies = store.policies
+    policy_row = join_rows(vehicles['chassis_no'].to_numpy(), policies['CHASSIS_NO'].to_numpy())
+    vehicles['policy_no'] = pd.Series(policies['POLICY_NO'].to_numpy()[policy_row]).where(policy_row >= 0)
+    return place, vehicles, (start, end)
+
+def format_amount(value):
+    return f"${value:,.0f}"
+
+def format_compact_amount(value):
+    for threshold, suffix in [(1e9, "B"), (1e6, "M"), (1e3, "K")]:
+        if abs(value) >= threshold:
+            return f"${value / threshold:.1f}{suffix}"
+    return format_amount(value)
+
+def format_date(value):
+    return value.strftime("%b %d, %Y") if value else "—"
+
+def short_claim_id(claim_no):
+    return claim_no[:8].upper()
+
+def is_major(severity):
+    return severity in ("Major Damage", "Total Loss")
+
+@timed("data.export_claims_csv")
+def export_claims_csv(version, filters, outcomes, sort):
+    """
+    CSV of the claims matching the grid filters, read from the gold table with
+    only the exported columns and the severity filter pushed down to parquet.
+    Claims submitted since the last warehouse refresh are not in gold yet.
+    """
+    store = get_claims_store()
+    rows = get_claims_grid(version, sort).matching_rows(filters, outcomes)
+    pushdown = [("severity", "=", filters.severity)] if filters.severity else None
+    gold = get_warehouse().read_gold(EXPORT_COLUMNS, pushdown)
+    positions = join_rows(store.claims["claim_no"].to_numpy()[rows], gold["claim_no"].to_numpy())
+    export = gold.iloc[positions[positions >= 0]].reset_index(drop=True)
+    export["status"] = store.claims["status"].to_numpy()[rows[positions >= 0]]
+    export["risk"] = get_risk_scores().scores[rows[positions >= 0]].round(4)
+    return export.to_csv(index=False)
+
 def render_kpi_card(label, value, icon):
     st.markdown(f"""
         <div class="metric-container">
@@ -17,79 +271,153 @@ def render_kpi_card(label, value, icon):
         </div>
     """, unsafe_allow_html=True)
 
+@timed("view.render_list_view")
 def render_list_view():
     st.markdown("### 📋 All Claims Management")
     
     # 1. TOP KPI ROW
+    kpis = get_kpis().totals()
     k1, k2, k3, k4 = st.columns(4)
-    with k1: render_kpi_card("Total Claims", "4,528", "📄")
-    with k2: render_kpi_card("Total Loss", "2,485", "📅") # Icon placeholder
-    with k3: render_kpi_card("Major Damage", "1,631", "👁️")
-    with k4: render_kpi_card("Total Amount", "$237.9M", "💲")
+    with k1: render_kpi_card("Total Claims", f"{kpis['claims']:,}", "📄")
+    with k2: render_kpi_card("Total Loss", f"{kpis['total_loss']:,}", "📅") # Icon placeholder
+    with k3: render_kpi_card("Major Damage", f"{kpis['major_damage']:,}", "👁️")
+    with k4: render_kpi_card("Total Amount", format_compact_amount(kpis['amount']), "💲")
 
     st.markdown("---")
 
     # 2. FILTERS
-    f1, f2 = st.columns([3, 1])
+    f1, f2, f3, f4, f5 = st.columns([3, 1, 1, 1, 1])
     with f1:
-        st.text_input("Search", placeholder="Search by Claim ID or Policy...", label_visibility="collapsed")
+        search = st.text_input("Search", placeholder="Search by Claim ID or Policy...", label_visibility="collapsed")
     with f2:
-        st.selectbox("Filter Status", ["All Status", "Under Review", "Processed"], label_visibility="collapsed")
+        status = st.selectbox("Filter Status", ["All Status"] + STATUSES, label_visibility="collapsed")
+    with f3:
+        severity = st.selectbox("Filter Severity", ["All Severities"] + SEVERITIES, label_visibility="collapsed")
+    # One store version for the grid and every outcome array it is filtered by
+    store = get_claims_store()
+    version = store.version
+    batch_outcomes = get_batch_outcomes(version)
+    with f4:
+        check_filters = [name for name, (_, batch) in CHECK_FILTERS.items() if not batch or batch_outcomes is not None]
+        checks, batch = CHECK_FILTERS[st.selectbox("Filter Checks", check_filters, label_visibility="collapsed")]
+    with f5:
+        sort = GRID_SORTS[st.selectbox("Sort", list(GRID_SORTS), label_visibility="collapsed")]
+
+    filters = ClaimFilter(
+        search=search.strip() or None,
+        status=None if status == "All Status" else status,
+        severity=None if severity == "All Severities" else severity,
+        checks=checks,
+    )
+    page_size = st.session_state.get('page_size', DEFAULT_PAGE_SIZE)
+
+    # Keyset pagination: one cursor per visited page, reset whenever the filters change
+    if st.session_state.get('grid_filters') != (filters, sort, page_size):
+        st.session_state['grid_filters'] = (filters, sort, page_size)
+        st.session_state['grid_cursors'] = [None]
+    cursors = st.session_state['grid_cursors']
+
+    grid = get_claims_grid(version, sort)
+    risk = get_risk_scores()
+    outcomes = batch_outcomes if batch else get_rule_results(version, get_telematics().version).worst
+    with span("data.grid_page"):
+        page = grid.page(filters, cursors[-1], page_size, outcomes)
 
     # 3. CUSTOM DATA GRID
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Header
-    h1, h2, h3, h4, h5, h6, h7 = st.columns([1.5, 1.5, 1.5, 1, 1, 1, 1])
-    headers = ["Claim Number", "Policy", "Date", "Amount", "Severity", "Status", "Action"]
-    for col, h in zip([h1, h2, h3, h4, h5, h6, h7], headers):
+    header_cols = st.columns([1.5, 1.5, 1.5, 1, 1, 0.7, 1, 1])
+    headers = ["Claim Number", "Policy", "Date", "Amount", "Severity", "Risk", "Status", "Action"]
+    for col, h in zip(header_cols, headers):
         col.markdown(f"<div class='grid-header'>{h}</div>", unsafe_allow_html=True)
 
-    # Rows
-    for claim in MOCK_CLAIMS:
-        c1, c2, c3, c4, c5, c6, c7 = st.columns([1.5, 1.5, 1.5, 1, 1, 1, 1])
+    # Rows (current page only); their detail payloads are assembled in the background
+    get_detail_cache().prefetch([store.claim_at(row)['claim_no'] for row in page.rows], detail_builder())
+    if len(page.rows) == 0:
+        st.info("No claims match the current filters.")
+    for row in page.rows:
+        claim = store.claim_at(row)
+        c1, c2, c3, c4, c5, c_risk, c6, c7 = st.columns([1.5, 1.5, 1.5, 1, 1, 0.7, 1, 1])
         
-        with c1: st.write(f"**{claim['id']}**")
-        with c2: st.caption(claim['policy'])
-        with c3: st.write(claim['date'])
-        with c4: st.write(claim['amount'])
+        with c1: st.write(f"**{short_claim_id(claim['claim_no'])}**")
+        with c2: st.caption(claim['policy_no'])
+        with c3: st.write(format_date(claim['claim_date']))
+        with c4: st.write(format_amount(claim['total']))
         with c5: 
             # Conditional Formatting for Severity
-            color = "#EF4444" if claim['severity'] == "Major" else "#10B981"
+            color = "#EF4444" if is_major(claim['severity']) else "#10B981"
             st.markdown(f"<span style='color:{color}; font-weight:600'>● {claim['severity']}</span>", unsafe_allow_html=True)
+        with c_risk:
+            percent = risk.percent(row)
+            color = "#EF4444" if percent >= HIGH_RISK_PERCENT else "#64748B"
+            st.markdown(f"<span style='color:{color}; font-weight:600'>{percent}%</span>", unsafe_allow_html=True)
         with c6:
             # Badge CSS
             badge_class = "badge-blue" if claim['status'] == "Under Review" else "badge-green"
             st.markdown(f"<span class='badge {badge_class}'>{claim['status']}</span>", unsafe_allow_html=True)
         with c7:
-            if st.button("👁️ View", key=claim['id']):
+            if st.button("👁️ View", key=claim['claim_no']):
                 # SET STATE TO VIEW DETAIL
                 st.session_state['current_view'] = 'detail'
-                st.session_state['selected_claim'] = claim
+                st.session_state['selected_claim'] = claim['claim_no']
                 st.rerun()
         
         st.markdown("<div style='border-bottom: 1px solid #F1F5F9; margin-bottom: 10px;'></div>", unsafe_allow_html=True)
 
+    # 4. PAGINATION
+    p1, p2, p3, p4, p5 = st.columns([1, 2, 1, 1, 1])
+    with p1:
+        if st.button("← Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with p2:
+        st.caption(f"Page {len(cursors)} • {len(page.rows)} claims shown • {len(grid):,} claims in total")
+    with p3:
+        st.selectbox("Page Size", PAGE_SIZES, index=PAGE_SIZES.index(page_size), key='page_size', label_visibility="collapsed")
+    with p4:
+        if st.button("Next →", disabled=not page.has_more):
+            cursors.append(page.cursor)
+            st.rerun()
+    with p5:
+        # Generated only when clicked
+        st.download_button(
+            "⬇️ Export CSV", data=lambda: export_claims_csv(version, filters, outcomes, sort),
+            file_name="claims_export.csv", mime="text/csv", on_click="ignore",
+        )
+
+@timed("view.render_detail_view")
 def render_detail_view():
-    claim = st.session_state.get('selected_claim', MOCK_CLAIMS[0])
+    store = get_claims_store()
+    claim_no = st.session_state.get('selected_claim') or store.claim_at(0)['claim_no']
+    # The builder (and the rule results it needs) is only resolved on a miss
+    with span("data.claim_detail"):
+        detail = get_detail_cache().get(claim_no, lambda claim_no: detail_builder()(claim_no))
     
     # Breadcrumb / Back Button
     if st.button("← Back to List"):
         st.session_state['current_view'] = 'list'
         st.rerun()
 
-    st.markdown(f"## 🔍 Investigation: {claim['id']}")
+    if detail is None:
+        st.error(f"Claim {claim_no} was not found.")
+        return
+    claim, policy, customer = detail['claim'], detail['policy'] or {}, detail['customer'] or {}
+
+    st.markdown(f"## 🔍 Investigation: {short_claim_id(claim['claim_no'])}")
+    st.caption(
+        f"Claim {claim['claim_no']} • Filed {format_date(claim['claim_date'])} • Incident {format_date(claim['date'])}"
+        f" • Risk score {detail['risk_percent']}%"
+    )
 
     # --- RULE ENGINE RESULTS (Top Section of Image 5) ---
     st.markdown('<div class="css-card">', unsafe_allow_html=True)
     st.markdown("#### ⚙️ Automated Rule Engine Results")
     
-    r1, r2, r3, r4 = st.columns(4)
-    
     # Helper for Check Results
     def check_box(label, status, subtext):
-        icon = "✅" if status == "PASS" else "⚠️"
-        color = "green" if status == "PASS" else "orange"
+        icon = {"PASS": "✅", "WARN": "⚠️"}.get(status, "❌")
+        color = {"PASS": "green", "WARN": "orange"}.get(status, "red")
         return f"""
         <div style="text-align: center; padding: 10px; background: #F8FAFC; border-radius: 8px;">
             <div style="color: #64748B; font-size: 0.8rem;">{label}</div>
@@ -98,10 +426,18 @@ def render_detail_view():
         </div>
         """
 
-    r1.markdown(check_box("Severity Check", "PASS", "AI matches User input"), unsafe_allow_html=True)
-    r2.markdown(check_box("Policy Amount", "PASS", "Within Limit ($50k)"), unsafe_allow_html=True)
-    r3.markdown(check_box("Policy Active", "PASS", "Active until 12/2025"), unsafe_allow_html=True)
-    r4.markdown(check_box("Speed Check", "WARN", "44mph in 35mph zone"), unsafe_allow_html=True)
+    checks = detail['checks']
+    for col, (label, status, subtext) in zip(st.columns(len(checks)), checks):
+        col.markdown(check_box(label, status, subtext), unsafe_allow_html=True)
+    # Results persisted by the last bulk re-adjudication (readjudicate.py), if it saw this claim
+    adjudication = claim.get('adjudication')
+    if not pd.isna(adjudication):
+        live = max((status for _, status, _ in checks), key=OUTCOME_LABELS.index)
+        st.caption(
+            f"Batch re-adjudication {claim['adjudicated_at']:%b %d, %Y %H:%M}: {adjudication} • "
+            f"AI severity {claim['model_severity'] if not pd.isna(claim['model_severity']) else '—'} • "
+            f"risk {claim['risk_score']:.0%}" + (f" • live checks now {live}" if live != adjudication else "")
+        )
     st.markdown('</div>', unsafe_allow_html=True)
 
     # --- MAIN CONTENT ---
@@ -111,52 +447,143 @@ def render_detail_view():
     with c1:
         st.markdown('<div class="css-card">', unsafe_allow_html=True)
         st.markdown("#### Claim Details")
-        st.markdown(f"**Incident Type:** Multi-Vehicle")
-        st.markdown(f"**Collision:** Front-End")
-        st.markdown(f"**Vehicles:** 2")
+        st.markdown(f"**Incident Type:** {claim['type']}")
+        st.markdown(f"**Collision:** {claim['collision_type'] or '—'}")
+        st.markdown(f"**Vehicles:** {claim['number_of_vehicles_involved']}")
+        st.markdown(f"**Reported Severity:** {claim['severity']}")
         st.divider()
-        st.metric("Total Claim Amount", claim['amount'])
+        st.metric("Total Claim Amount", format_amount(claim['total']))
         st.markdown('</div>', unsafe_allow_html=True)
 
     # Middle: The Image (Centerpiece)
     with c2:
         st.markdown('<div class="css-card" style="text-align:center;">', unsafe_allow_html=True)
         st.markdown("#### 📸 Accident Image")
-        # Placeholder image logic
-        st.image("https://placehold.co/600x400/png?text=Car+Damage+Evidence", caption="Uploaded Evidence", use_container_width=True)
-        st.info("AI Detected: Major Damage (98% Confidence)")
+        image_name, digest = detail['image_name'], detail['image_digest']
+        if digest:
+            st.image(get_image_store().thumbnail(digest), caption=f"Uploaded Evidence • {image_name}", use_container_width=True)
+        else:
+            st.markdown("""
+                <div style="height: 200px; border: 2px dashed #CBD5E1; border-radius: 8px; display: flex; align-items: center; justify-content: center; color: #94A3B8;">
+                    No Image on File
+                </div>
+            """, unsafe_allow_html=True)
+        assessment = detail['assessment']
+        if assessment:
+            level, confidence = assessment
+            st.info(f"AI Detected: {SEVERITY_LEVEL_NAMES[level]} Severity ({confidence:.0%} Confidence)")
+        else:
+            st.info("AI Detected: no evidence image on file")
         st.markdown('</div>', unsafe_allow_html=True)
 
     # Right: Customer Info & Action
     with c3:
         st.markdown('<div class="css-card">', unsafe_allow_html=True)
         st.markdown("#### 👤 Customer")
-        st.markdown("**Zeki Tekin**")
-        st.caption("Policy #10212")
-        st.caption("Redmond, Washington")
+        st.markdown(f"**{customer.get('name', 'Unknown customer')}**")
+        st.caption(f"Policy #{claim['policy_no']}")
+        if policy:
+            st.caption(f"{policy['MAKE']} {policy['MODEL'] or ''} • {policy['CHASSIS_NO']}")
+            live = detail['live']
+            if live:
+                st.caption(
+                    f"📡 Live: {live['last_speed']:.0f}mph at {live['latitude']:.4f}, {live['longitude']:.4f} "
+                    f"({live['last_seen']:%b %d %H:%M}) • max {live['max_speed']:.0f}mph • "
+                    f"{live['speeding_episodes']} speeding episodes"
+                )
+        if customer:
+            st.caption(f"{(customer['neighborhood'] or '').title()}, {(customer['borough'] or '').title()}")
         st.divider()
         
         st.markdown("#### Decision")
+        # Read-your-writes: never show a decision older than this session's last one
+        decision = get_decision_log().decision(claim_no, st.session_state.get('decision_lsn', 0))
+        if decision:
+            st.caption(f"{decision['decision'].title()} on {decision['at'].replace('T', ' ')}")
         if st.button("✅ Approve Claim", type="primary"):
+            record_decision(claim_no, "approved")
             st.success("Claim Approved & Payment Scheduled")
         if st.button("❌ Reject Claim"):
+            record_decision(claim_no, "rejected")
             st.error("Claim Rejected. Email sent to customer.")
         st.markdown('</div>', unsafe_allow_html=True)
 
+    # --- AREA SEARCH ---
+    st.markdown('<div class="css-card">', unsafe_allow_html=True)
+    st.markdown("#### 🛰️ Vehicles Near This Incident")
+    place, vehicles, (start, end) = vehicles_near_incident(claim, detail['chassis'])
+    window = f"{pd.Timestamp(int(start), unit='s'):%b %d, %Y %H:%M}–{pd.Timestamp(int(end), unit='s'):%H:%M}"
+    if place is None:
+        st.caption(f"No placeable location reported and no GPS fixes of the insured vehicle in {window}")
+    else:
+        st.caption(f"{len(vehicles):,} other vehicles within {NEAR_INCIDENT_RADIUS_KM:.0f} km of {place} in {window}")
+        if len(vehicles):
+            st.dataframe(vehicles.head(NEAR_INCIDENT_LIMIT).round({"distance_km": 2}), hide_index=True, width="stretch")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    cache = get_detail_cache().stats()
+    st.caption(
+        f"Detail cache: {cache['hit_rate']:.0%} hit rate • {cache['entries']:,} claims in {cache['bytes'] / 1024:,.0f} KB • "
+        f"{cache['prefetched']:,} prefetched • {cache['evictions']:,} evicted • {cache['expirations']:,} expired • "
+        f"{cache['invalidations']:,} invalidated"
+    )
+
+def render_profiling_panel():
+    """
+    Span percentiles and the slowest spans of this server process. Recording is
+    on with SMART_CLAIMS_INSTRUMENTATION=1; the panel itself is opt-in per
+    session, so runs that don't show it only pay for the recording.
+    """
+    spans = RECORDER.snapshot()
+    if not spans:
+        st.caption("No spans recorded yet.")
+        return
+    table = pd.DataFrame.from_dict(spans, orient="index")
+    views = table.index.str.startswith("view.")
+    table = pd.concat([table[views], table[~views]])
+    for column in ["mean", "p50", "p95", "p99", "max"]:
+        table[column] = (table[column] * 1000).round(2)
+    st.markdown("**Spans** (ms, last %d calls each)" % RECORDER.capacity)
+    st.dataframe(table[["count", "mean", "p50", "p95", "p99", "max"]], width="stretch")
+    st.markdown("**Slowest spans**")
+    st.dataframe(
+        pd.DataFrame(
+            [(name, round(seconds * 1000, 2), pd.Timestamp(at, unit="s").strftime("%H:%M:%S"))
+             for name, seconds, at in RECORDER.slowest()],
+            columns=["span", "ms", "at"],
+        ),
+        width="stretch", hide_index=True,
+    )
+    e1, e2, e3 = st.columns(3)
+    # Generated only when clicked
+    e1.download_button("Prometheus", RECORDER.to_prometheus, file_name="spans.prom", mime="text/plain", on_click="ignore")
+    e2.download_button("JSON", RECORDER.to_json, file_name="spans.json", mime="application/json", on_click="ignore")
+    if e3.button("Reset"):
+        RECORDER.reset()
+        st.rerun()
+
 # --- MAIN EXECUTION ---
 def main():
     load_design_system()
     render_header()
     
-    # Initialize State
-    if 'current_view' not in st.session_state:
-        st.session_state['current_view'] = 'list'
+    with persisted_session(get_session_backend(), PERSISTED_KEYS):
+        # Initialize State
+        if 'current_view' not in st.session_state:
+            st.session_state['current_view'] = 'list'
 
-    # Router
-    if st.session_state['current_view'] == 'list':
-        render_list_view()
-    else:
-        render_detail_view()
+        # Claims and decisions other processes logged, as of the last background compaction
+        with span("data.decision_log_apply"):
+            get_decision_log().apply_to(get_claims_store())
+
+        # Router
+        if st.session_state['current_view'] == 'list':
+            render_list_view()
+        else:
+            render_detail_view()
+
+    if RECORDER.enabled and st.toggle("⏱️ Profiling", key='show_profiling'):
+        render_profiling_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
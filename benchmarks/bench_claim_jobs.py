@@ -0,0 +1,93 @@
+"""
+Drives the claim-analysis job queue with concurrent submitters. A share of the
+jobs simulates a slow image analysis, to show that they do not stall the rest.
+
+    python -m benchmarks.bench_claim_jobs [--jobs 400] [--sessions 16] [--workers 4]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from claim_jobs import DONE, JobQueue
+from claims_store import load_claims_store
+from rule_engine import evaluate_submission
+from telematics import load_telematics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=400)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--fast-ms", type=float, default=20.0, help="simulated image analysis time")
+    parser.add_argument("--slow-ms", type=float, default=2000.0, help="simulated slow image analysis time")
+    parser.add_argument("--slow-share", type=float, default=0.02)
+    args = parser.parse_args()
+
+    store, telematics = load_claims_store(), load_telematics()
+    policies = store.policies["POLICY_NO"].tolist()
+
+    def handler(job_id, payload, image):
+        time.sleep(payload["analysis_ms"] / 1000)  # stand-in for the image model
+        results = evaluate_submission(store, payload, telematics=telematics)
+        return {"approved": bool(results.worst[0] == 0)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(handler, db_path=os.path.join(tmp, "jobs.sqlite"), workers=args.workers)
+        submit_latency, kinds, ids, lock = [], {}, [], threading.Lock()
+
+        def session(n, seed):
+            rng = random.Random(seed)
+            for _ in range(n):
+                slow = rng.random() < args.slow_share
+                payload = {"policy_no": rng.choice(policies), "total": rng.randint(500, 60000),
+                           "claim_date": "2018-06-01", "severity": "Major",
+                           "analysis_ms": args.slow_ms if slow else args.fast_ms}
+                started = time.perf_counter()
+                job_id = queue.submit(payload, os.urandom(2048))
+                elapsed = time.perf_counter() - started
+                with lock:
+                    submit_latency.append(elapsed)
+                    kinds[job_id] = "slow" if slow else "fast"
+                    ids.append(job_id)
+                time.sleep(rng.uniform(0, 0.01))
+
+        started = time.perf_counter()
+        per_session = args.jobs // args.sessions
+        threads = [threading.Thread(target=session, args=(per_session, i)) for i in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+        peak_depth = 0
+        while any(t.is_alive() for t in threads) or queue.metrics()["queue_depth"] or queue.metrics()["running"]:
+            peak_depth = max(peak_depth, queue.metrics()["queue_depth"])
+            time.sleep(0.05)
+        wall = time.perf_counter() - started
+        metrics = queue.metrics()
+        queue.close()
+
+        latency = {"fast": [], "slow": []}
+        for job_id in ids:
+            job = queue.status(job_id)
+            assert job["status"] == DONE, job
+            latency[kinds[job_id]].append(job["finished_at"] - job["submitted_at"])
+
+    submit_ms = np.array(submit_latency) * 1000
+    print(f"{len(ids)} jobs from {args.sessions} sessions on {args.workers} workers in {wall:.1f}s "
+          f"({len(ids) / wall:.0f} jobs/s), peak queue depth {peak_depth}")
+    print(f"submit() latency: p50 {np.percentile(submit_ms, 50):.2f} ms, p99 {np.percentile(submit_ms, 99):.2f} ms")
+    for kind, values in latency.items():
+        if values:
+            values = np.array(values)
+            print(f"{kind:>4} jobs ({len(values):>3}): end-to-end p50 {np.percentile(values, 50):.2f}s, "
+                  f"p99 {np.percentile(values, 99):.2f}s")
+    print(f"queue metrics: utilization {metrics['utilization']:.0%}, "
+          f"p50 {metrics['latency_p50']:.2f}s, p99 {metrics['latency_p99']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Time to first paint of the admin claims grid: the server-side work of building
+one page (keyset seek, filtering, search and row materialization) at the
+shipped 13k claims and at a 1M-claim synthetic scale-up.
+
+    python -m benchmarks.bench_claims_grid [--rows 1000000]
+"""
+import argparse
+import time
+
+from claims_query import DEFAULT_PAGE_SIZE, ClaimFilter, ClaimsGrid
+from claims_store import load_claims_store
+from rule_engine import evaluate_rules
+from benchmarks.synthetic import scale_store
+
+SCENARIOS = [
+    ("first page, no filters", ClaimFilter()),
+    ("status filter", ClaimFilter(status="Under Review")),
+    ("severity filter", ClaimFilter(severity="Trivial Damage")),
+    ("severity + checks", ClaimFilter(severity="Total Loss", checks="attention")),
+    ("policy prefix search", ClaimFilter(search="10212")),
+    ("claim prefix search", ClaimFilter(search="ab")),
+]
+
+
+def first_paint(store, grid, outcomes, filters, repeat=20):
+    """Best time to produce one rendered page worth of row dicts."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page = grid.page(filters, None, DEFAULT_PAGE_SIZE, outcomes)
+        [store.claim_at(row) for row in page.rows]
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def deep_page(store, grid, outcomes, pages=40):
+    """Walks `pages` pages forward and returns the time of the last one."""
+    cursor = None
+    for _ in range(pages):
+        started = time.perf_counter()
+        page = grid.page(ClaimFilter(), cursor, DEFAULT_PAGE_SIZE, outcomes)
+        [store.claim_at(row) for row in page.rows]
+        cursor = page.cursor
+    return time.perf_counter() - started
+
+
+def run(label, store):
+    started = time.perf_counter()
+    grid = ClaimsGrid(store)
+    build = time.perf_counter() - started
+    outcomes = evaluate_rules(store).worst
+    print(f"\n{label}: {len(store):,} claims (grid index build {build * 1000:.0f} ms, once per process)")
+    for name, filters in SCENARIOS:
+        print(f"  {name:<26} {first_paint(store, grid, outcomes, filters) * 1000:7.2f} ms")
+    print(f"  {'page 40 via keyset':<26} {deep_page(store, grid, outcomes) * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    store = load_claims_store()
+    run("claims.csv", store)
+    run("synthetic", scale_store(store, args.rows))
+
+
+if __name__ == "__main__":
+    main()
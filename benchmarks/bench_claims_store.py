@@ -0,0 +1,54 @@
+"""
+Measures the claims store: one-off parse/index time, point lookup latency and
+memory per row.
+
+    python -m benchmarks.bench_claims_store
+"""
+import random
+import time
+
+from claims_store import load_claims_store
+
+
+def time_lookups(fn, keys, repeat=3):
+    """Returns the best per-call latency (microseconds) over `repeat` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for key in keys:
+            fn(key)
+        best = min(best, (time.perf_counter() - started) / len(keys))
+    return best * 1e6
+
+
+def main():
+    store = load_claims_store()
+    print(f"Loaded {len(store.claims):,} claims, {len(store.policies):,} policies, "
+          f"{len(store.customers):,} customers in {store.load_seconds * 1000:.0f} ms")
+
+    rng = random.Random(7)
+    claim_keys = rng.choices(store.claims["claim_no"].tolist(), k=20000)
+    policy_keys = rng.choices(store.policies["POLICY_NO"].tolist(), k=20000)
+    chassis_keys = rng.choices(store.policies["CHASSIS_NO"].tolist(), k=20000)
+    customer_keys = rng.choices(store.customers["customer_id"].tolist(), k=20000)
+
+    print("\nPoint lookups (best of 3, per call)")
+    print(f"  claim_no -> row         {time_lookups(store.claim_row, claim_keys):8.2f} us")
+    print(f"  claim_no -> claim dict  {time_lookups(store.claim, claim_keys):8.2f} us")
+    print(f"  claim_no -> detail      {time_lookups(store.claim_detail, claim_keys):8.2f} us")
+    print(f"  policy_no -> policy     {time_lookups(store.policy, policy_keys):8.2f} us")
+    print(f"  CHASSIS_NO -> rows      {time_lookups(store.chassis_index.rows, chassis_keys):8.2f} us")
+    print(f"  CUST_ID -> customer     {time_lookups(store.customer, customer_keys):8.2f} us")
+
+    # Baseline: what the old list-of-dicts layout costs for the same lookup
+    records = store.claims.to_dict("records")
+    linear = lambda key: next(r for r in records if r["claim_no"] == key)
+    print(f"  linear scan (baseline)  {time_lookups(linear, claim_keys[:200], repeat=1):8.2f} us")
+
+    print("\nMemory")
+    for name, stats in store.memory_report().items():
+        print(f"  {name:<10} {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures the decision log: decisions/sec and commit latency (submit to fsynced)
+with 1, 8 and 64 concurrent writers, group commit against one fsync per
+record, plus the cost of compacting the log into the claims store.
+
+    python -m benchmarks.bench_decision_log [--decisions 2000]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from decision_log import DecisionLog
+
+
+def run_writers(log, writers, decisions, claim_nos):
+    """Each writer thread records its share of decisions; returns (seconds, latencies)."""
+    latencies = [[] for _ in range(writers)]
+    barrier = threading.Barrier(writers + 1)
+
+    def writer(i):
+        rng = np.random.default_rng(i)
+        barrier.wait()
+        for _ in range(decisions // writers):
+            claim_no = claim_nos[rng.integers(len(claim_nos))]
+            started = time.perf_counter()
+            log.record_decision(claim_no, "approved" if rng.random() < 0.7 else "rejected", session=f"writer-{i}")
+            latencies[i].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, np.concatenate([np.asarray(l) for l in latencies])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--decisions", type=int, default=2000, help="decisions per run")
+    args = parser.parse_args()
+
+    from claims_store import load_claims_store
+    store = load_claims_store()
+    claim_nos = store.claims["claim_no"].to_numpy()
+
+    print(f"{'writers':>7} {'mode':>13} {'decisions/s':>12} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for writers in [1, 8, 64]:
+            for mode, batch in [("group commit", None), ("fsync each", 1)]:
+                path = os.path.join(tmp, f"{writers}-{batch}.log")
+                log = DecisionLog(path) if batch is None else DecisionLog(path, max_batch_size=batch)
+                seconds, latencies = run_writers(log, writers, args.decisions, claim_nos)
+                stats = log.stats()
+                log.close()
+                print(f"{writers:>7} {mode:>13} {len(latencies) / seconds:>12,.0f} "
+                      f"{np.percentile(latencies, 50) * 1000:>8.2f} {np.percentile(latencies, 99) * 1000:>8.2f} "
+                      f"{stats['mean_batch_size']:>10.1f}")
+
+        log = DecisionLog(os.path.join(tmp, "8-None.log"))
+        started = time.perf_counter()
+        applied = log.compact(store)
+        print(f"Compacting {applied:,} log records into the claims store: {(time.perf_counter() - started) * 1000:.1f} ms")
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measures the claim detail cache under a live telematics feed. As in the admin
+app, a payload built after new readings arrived first re-evaluates the rules
+for the new telematics version. Concurrent "users" page through the grid
+(mostly its first pages) and open claims from the current page, with no cache,
+a cache filled on demand, and a cache with page prefetch. Reports view latency,
+hit rate, evictions and invalidations.
+
+    python -m benchmarks.bench_detail_cache [--users 8] [--views 40]
+"""
+import argparse
+import pickle
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from claims_store import load_claims_store
+from detail_cache import DetailCache, assemble_detail
+from evidence_index import load_evidence_index
+from image_store import ImageStore
+from risk_scoring import RiskScores
+from rule_engine import evaluate_rules
+from telematics import load_telematics
+from telematics_stream import LiveTelematics, StreamingTelematics
+
+PAGE_SIZE = 25
+# Seconds a user spends on the list before opening a claim, and on each claim
+LIST_THINK, DETAIL_THINK = 0.2, 0.05
+# Live feed: batches per second, vehicles per batch
+FEED_RATE, FEED_VEHICLES = 5, 20
+
+
+def version_memo(store, telematics):
+    """Rule results for the current telematics version, rebuilt when it moves (like get_rule_results)."""
+    memo, lock = {}, threading.Lock()
+
+    def rules():
+        with lock:
+            if memo.get("version") != telematics.version:
+                memo["results"] = evaluate_rules(store, telematics=telematics)
+                memo["version"] = telematics.version
+            return memo["results"]
+    return rules
+
+
+def feed(telematics, chassis, stop, seed):
+    """Ingests FEED_RATE batches a second of readings for random vehicles until stopped."""
+    rng = np.random.default_rng(seed)
+    while not stop.wait(1 / FEED_RATE):
+        picked = rng.choice(chassis, FEED_VEHICLES)
+        now = np.full(len(picked), int(time.time()))
+        telematics.stream.ingest(picked, now, rng.uniform(20, 60, len(picked)),
+                                 np.full(len(picked), 40.7), np.full(len(picked), -74.0))
+
+
+def browse(cache, build, claim_nos, users, views, prefetch, seed):
+    """Each user opens `views` claims, five from each grid page visited; returns view latencies."""
+    latencies = [[] for _ in range(users)]
+    pages = len(claim_nos) // PAGE_SIZE
+
+    def user(i):
+        rng = np.random.default_rng(seed + i)
+        for _ in range(views // 5):
+            first = min(int(rng.geometric(0.3)) - 1, pages - 1) * PAGE_SIZE
+            page = list(claim_nos[first:first + PAGE_SIZE])
+            if prefetch:
+                cache.prefetch(page, build)
+            time.sleep(LIST_THINK)
+            for claim_no in rng.choice(page, 5, replace=False):
+                started = time.perf_counter()
+                if cache is None:
+                    build(claim_no)
+                else:
+                    cache.get(claim_no, build)
+                latencies[i].append(time.perf_counter() - started)
+                time.sleep(DETAIL_THINK)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.asarray(l) for l in latencies])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--views", type=int, default=40, help="claims opened per user")
+    args = parser.parse_args()
+
+    store, index = load_claims_store(), load_telematics()
+    telematics = LiveTelematics(index, StreamingTelematics())
+    rules = version_memo(store, telematics)
+    risk = RiskScores.score_all(store, telematics)
+    evidence_index = load_evidence_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        image_store = ImageStore(tmp)
+        digests = image_store.import_directory()
+        for digest in digests.values():
+            image_store.thumbnail(digest)
+
+        def build(claim_no):
+            return assemble_detail(claim_no, store, rules(), risk, evidence_index, digests, {}, telematics, image_store)
+
+        # Newest first, as the grid's default sort lists them
+        claim_nos = store.claims.sort_values("claim_date", ascending=False)["claim_no"].to_numpy()
+        chassis = store.policies["CHASSIS_NO"].dropna().to_numpy()
+
+        started = time.perf_counter()
+        payload = build(claim_nos[0])
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        for claim_no in claim_nos[:200]:
+            build(claim_no)
+        warm = (time.perf_counter() - started) / 200
+        print(f"Assemble one payload: {cold * 1000:.1f} ms after new telematics (rules re-evaluated), "
+              f"{warm * 1000:.2f} ms otherwise; {len(pickle.dumps(payload)) / 1024:.1f} KB")
+
+        print(f"{args.users} users x {args.views} views, {PAGE_SIZE} claims per page, "
+              f"live feed {FEED_RATE} batches/s x {FEED_VEHICLES} vehicles:")
+        print(f"{'mode':>16} {'p50 ms':>8} {'p99 ms':>8} {'hit rate':>9} {'evictions':>10} {'invalidated':>12}")
+        for mode, cache_bytes, prefetch in [("no cache", None, False), ("on demand", 32 * 2**20, False),
+                                            ("prefetch", 32 * 2**20, True), ("prefetch, 64 KB", 64 * 1024, True)]:
+            cache = DetailCache(cache_bytes) if cache_bytes else None
+            if cache:
+                store.add_listener(cache)
+                telematics.add_listener(cache)
+            stop = threading.Event()
+            feeder = threading.Thread(target=feed, args=(telematics, chassis, stop, 3))
+            feeder.start()
+            latencies = browse(cache, build, claim_nos, args.users, args.views, prefetch, seed=11)
+            stop.set()
+            feeder.join()
+            stats = cache.stats() if cache else {"hit_rate": 0.0, "evictions": 0, "invalidations": 0}
+            print(f"{mode:>16} {np.percentile(latencies, 50) * 1000:>8.2f} {np.percentile(latencies, 99) * 1000:>8.2f} "
+                  f"{stats['hit_rate']:>9.0%} {stats['evictions']:>10,} {stats['invalidations']:>12,}")
+            if cache:
+                cache.close()
+
+
+if __name__ == "__main__":
+    main()
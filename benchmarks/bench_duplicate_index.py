@@ -0,0 +1,127 @@
+"""
+Measures duplicate detection: perceptual hashing of the evidence images,
+near-duplicate search in the HammingIndex against a linear popcount scan, and
+the DuplicateIndex build, the all-claims `matches` pass and single-submission
+`match` latency.
+
+Hashes are random 64-bit values with a share of near copies (a few bits
+flipped), the shape of re-encoded uploads; claims are synthetic, drawing their
+policy, vehicle, incident day and evidence image from small pools so images
+and incidents repeat.
+
+    python -m benchmarks.bench_duplicate_index [--hashes 1000000,10000000] [--claims 1000000]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from duplicate_index import MAX_HAMMING_DISTANCE, DuplicateIndex, HammingIndex, perceptual_hash
+
+IMAGES_DIR = os.path.join("data", "claims", "images")
+
+
+def synthetic_hashes(n, near_share=0.1, seed=5):
+    """`n` random hashes, `near_share` of them copies of others with up to MAX_HAMMING_DISTANCE bits flipped."""
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, 2**63, n, dtype=np.int64).astype(np.uint64) << np.uint64(1)
+    hashes |= rng.integers(0, 2, n, dtype=np.int64).astype(np.uint64)
+    near = rng.random(n) < near_share
+    source = rng.integers(0, n, near.sum())
+    flips = np.zeros(near.sum(), dtype=np.uint64)
+    for _ in range(MAX_HAMMING_DISTANCE // 2):
+        flips |= np.uint64(1) << rng.integers(0, 64, len(flips)).astype(np.uint64)
+    hashes[near] = hashes[source] ^ flips
+    return hashes
+
+
+def percentiles(latencies):
+    return f"p50 {np.percentile(latencies, 50) * 1e6:8.1f} us, p99 {np.percentile(latencies, 99) * 1e6:8.1f} us"
+
+
+def bench_hashing():
+    names = sorted(os.listdir(IMAGES_DIR))
+    started = time.perf_counter()
+    for name in names:
+        perceptual_hash(os.path.join(IMAGES_DIR, name))
+    elapsed = time.perf_counter() - started
+    print(f"Perceptual hash: {elapsed / len(names) * 1000:.1f} ms per image ({len(names)} images)")
+
+
+def bench_hamming(n, args):
+    hashes = synthetic_hashes(n)
+    started = time.perf_counter()
+    index = HammingIndex(hashes)
+    build = time.perf_counter() - started
+    print(f"\nHammingIndex over {n:,} hashes: build {build:.2f} s, {index.nbytes() / 2**20:,.0f} MiB")
+
+    rng = np.random.default_rng(9)
+    flips = np.uint64(1) << rng.integers(0, 64, args.queries).astype(np.uint64)
+    queries = hashes[rng.integers(0, n, args.queries)] ^ flips
+    latencies = np.empty(min(args.single, len(queries)))
+    for i in range(len(latencies)):
+        started = time.perf_counter()
+        index.query(queries[i])
+        latencies[i] = time.perf_counter() - started
+    started = time.perf_counter()
+    query, _, _ = index.bulk_query(queries)
+    bulk = time.perf_counter() - started
+    print(f"Near-duplicate query: single {percentiles(latencies)} | bulk {len(queries):,} queries "
+          f"{bulk * 1000:,.0f} ms ({len(queries) / bulk:,.0f}/s, {len(query) / len(queries):.2f} matches each)")
+
+    scans = []
+    for i in range(3):
+        started = time.perf_counter()
+        np.nonzero(np.bitwise_count(hashes ^ queries[i]) <= MAX_HAMMING_DISTANCE)
+        scans.append(time.perf_counter() - started)
+    print(f"Linear popcount scan: {min(scans) * 1000:,.1f} ms per query")
+
+
+def bench_claims(n, args):
+    rng = np.random.default_rng(3)
+    policies = max(n // 4, 1)
+    policy = rng.integers(0, policies, n)
+    policy_no = np.array([f"P{p:09d}" for p in range(policies)], dtype=object)[policy]
+    chassis_no = np.array([f"C{p:016d}" for p in range(policies)], dtype=object)[policy]
+    incident = np.datetime64("2015-01-01") + rng.integers(0, 3 * 365, n).astype("timedelta64[D]")
+    total = rng.integers(500, 50_000, n).astype(np.float64)
+    images = max(n // 2, 1)
+    fingerprints = dict(zip((f"{i:064x}" for i in range(images)), synthetic_hashes(images).tolist()))
+    digests = np.array(list(fingerprints), dtype=object)[rng.integers(0, images, n)]
+    claim_no = np.array([f"CL{i:010d}" for i in range(n)], dtype=object)
+
+    started = time.perf_counter()
+    index = DuplicateIndex(claim_no, policy_no, chassis_no, incident, total, digests, fingerprints)
+    print(f"\nDuplicateIndex over {n:,} claims: build {time.perf_counter() - started:.2f} s")
+    started = time.perf_counter()
+    matches = index.matches()
+    elapsed = time.perf_counter() - started
+    print(f"matches(): {elapsed * 1000:,.0f} ms ({n / elapsed:,.0f} claims/s, "
+          f"{(matches['duplicate_image_vehicles'] > 0).mean():.1%} share an image across vehicles)")
+
+    picks = rng.integers(0, n, args.single)
+    latencies = np.empty(len(picks))
+    for i, row in enumerate(picks):
+        started = time.perf_counter()
+        digest = digests[row]
+        index.match(policy_no[row], chassis_no[row], incident[row], total[row], digest, fingerprints[digest])
+        latencies[i] = time.perf_counter() - started
+    print(f"match() of one submission: {percentiles(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hashes", default="1000000,10000000", help="comma-separated hash counts")
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=10_000, help="queries in each bulk pass")
+    parser.add_argument("--single", type=int, default=2_000, help="queries timed one at a time")
+    args = parser.parse_args()
+    bench_hashing()
+    for n in (int(v) for v in args.hashes.split(",")):
+        bench_hamming(n, args)
+    bench_claims(args.claims, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures the claim/image/chassis join index: build from image_metadata.csv,
+size on disk, open (memory-map) time, and lookup latency in each direction
+compared with a pandas filter over the parsed CSV.
+
+    python -m benchmarks.bench_evidence_index
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from evidence_index import IMAGE_METADATA_PATH, EvidenceIndex
+
+
+def latency_us(fn, keys):
+    samples = np.empty(len(keys))
+    for i, key in enumerate(keys):
+        started = time.perf_counter()
+        fn(key)
+        samples[i] = time.perf_counter() - started
+    return f"p50 {np.percentile(samples, 50) * 1e6:7.1f} us, p99 {np.percentile(samples, 99) * 1e6:7.1f} us"
+
+
+def main():
+    started = time.perf_counter()
+    built = EvidenceIndex.build()
+    build_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "evidence_index.bin")
+        built.save(path)
+        print(f"Built index over {len(built):,} claims, {len(built.image_keys)} images, "
+              f"{len(built.chassis_keys):,} chassis in {build_seconds * 1000:.0f} ms; "
+              f"{os.path.getsize(path) / 1024:.0f} KB on disk "
+              f"(CSV {os.path.getsize(IMAGE_METADATA_PATH) / 1024:.0f} KB)")
+
+        opens = []
+        for _ in range(20):
+            started = time.perf_counter()
+            index = EvidenceIndex.open(path)
+            opens.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        pd.read_csv(IMAGE_METADATA_PATH, dtype=str)
+        print(f"Open (mmap): {np.median(opens) * 1000:.2f} ms vs re-parsing the CSV: "
+              f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+        metadata = pd.read_csv(IMAGE_METADATA_PATH, dtype=str)
+        rng = np.random.default_rng(11)
+        claims = metadata["claim_no"].to_numpy()[rng.integers(len(metadata), size=5000)]
+        chassis = metadata["chassis_no"].to_numpy()[rng.integers(len(metadata), size=5000)]
+        images = metadata["image_name"].to_numpy()[rng.integers(len(metadata), size=200)]
+
+        print("Lookups (index | pandas filter):")
+        print(f"  claim -> image   {latency_us(index.image_for_claim, claims)} | "
+              f"{latency_us(lambda c: metadata.loc[metadata['claim_no'] == c, 'image_name'], claims[:300])}")
+        print(f"  chassis -> claims {latency_us(index.claims_for_chassis, chassis)} | "
+              f"{latency_us(lambda c: metadata.loc[metadata['chassis_no'] == c, 'claim_no'].tolist(), chassis[:300])}")
+        print(f"  image -> claims   {latency_us(index.claims_for_image, images)} | "
+              f"{latency_us(lambda i: metadata.loc[metadata['image_name'] == i, 'claim_no'].tolist(), images[:50])}")
+
+        print(f"  image -> claim positions (no decode) {latency_us(index.claim_positions_for_image, images)}")
+
+        started = time.perf_counter()
+        index.images_for_claims(metadata["claim_no"].to_numpy())
+        print(f"  all {len(metadata):,} claims -> image (vectorized): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
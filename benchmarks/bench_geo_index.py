@@ -0,0 +1,131 @@
+"""
+Measures the location checks over GPS points: GeoIndex build time and size,
+area queries ("which vehicles passed within R km in this window"), single and
+as a bulk pass, against a full scan; and the per-chassis location check on the
+TelematicsIndex ("was this chassis within R km around T"), single and bulk.
+
+Points are synthetic one-minute trips around New York City spread over a year
+(the shape of data/telematics), generated straight into arrays so 100M points
+fit in memory; the per-chassis part needs chassis numbers per point and so only
+runs up to --chassis-max points.
+
+    python -m benchmarks.bench_geo_index [--points 1000000,100000000] [--chassis-max 10000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from geo_index import LOCATION_RADIUS_KM, GeoIndex, distance_km
+from telematics import TelematicsIndex
+
+TRIP_READINGS = 60
+TRIPS_PER_VEHICLE = 3
+YEAR_START = int(np.datetime64("2015-01-01", "s").astype(np.int64))
+_TRIPS_PER_CHUNK = 200_000
+
+
+def synthetic_points(n, seed=7):
+    """(latitude, longitude float32, event_ts int64, vehicle int32) of `n` readings."""
+    rng = np.random.default_rng(seed)
+    trips = -(-n // TRIP_READINGS)
+    vehicles = max(trips // TRIPS_PER_VEHICLE, 1)
+    latitude, longitude = np.empty(n, dtype=np.float32), np.empty(n, dtype=np.float32)
+    event_ts, vehicle = np.empty(n, dtype=np.int64), np.empty(n, dtype=np.int32)
+    minutes = np.arange(TRIP_READINGS, dtype=np.int64) * 60
+    for first in range(0, trips, _TRIPS_PER_CHUNK):
+        k = min(_TRIPS_PER_CHUNK, trips - first)
+        lo, hi = first * TRIP_READINGS, min((first + k) * TRIP_READINGS, n)
+        size = hi - lo
+        # ~200 m a minute in a random direction, starting anywhere in the five boroughs
+        lat = np.cumsum(rng.normal(0, 0.0018, (k, TRIP_READINGS)), axis=1) + rng.uniform(40.55, 40.90, (k, 1))
+        lon = np.cumsum(rng.normal(0, 0.0024, (k, TRIP_READINGS)), axis=1) + rng.uniform(-74.10, -73.75, (k, 1))
+        latitude[lo:hi], longitude[lo:hi] = lat.ravel()[:size], lon.ravel()[:size]
+        event_ts[lo:hi] = (rng.integers(0, 365 * 86400, (k, 1)) + YEAR_START + minutes).ravel()[:size]
+        vehicle[lo:hi] = np.repeat(rng.integers(0, vehicles, k).astype(np.int32), TRIP_READINGS)[:size]
+    return latitude, longitude, event_ts, vehicle, vehicles
+
+
+def percentiles(latencies):
+    return f"p50 {np.percentile(latencies, 50) * 1e6:8.1f} us, p99 {np.percentile(latencies, 99) * 1e6:8.1f} us"
+
+
+def single(fn, queries):
+    latencies = np.empty(len(queries[0]))
+    for i, args in enumerate(zip(*queries)):
+        started = time.perf_counter()
+        fn(*args)
+        latencies[i] = time.perf_counter() - started
+    return latencies
+
+
+def run(n, args):
+    started = time.perf_counter()
+    latitude, longitude, event_ts, vehicle, vehicles = synthetic_points(n)
+    print(f"\n{n:,} points, {vehicles:,} vehicles (generated in {time.perf_counter() - started:.1f} s)")
+    names = np.array([f"SYN{v:014d}" for v in range(vehicles)], dtype=object)
+
+    started = time.perf_counter()
+    index = GeoIndex(latitude, longitude, event_ts, vehicle, names, cell_km=args.cell_km)
+    build = time.perf_counter() - started
+    print(f"GeoIndex build: {build:.2f} s ({n / build / 1e6:.1f}M points/s), {index.nbytes() / 2**20:,.0f} MiB, "
+          f"{index.rows} x {index.cols} cells of {args.cell_km} km")
+
+    # Queries centred near real readings, so windows and areas are populated
+    rng = np.random.default_rng(11)
+    picks = rng.integers(0, n, args.queries)
+    q_lat = latitude[picks] + rng.normal(0, 0.01, len(picks))
+    q_lon = longitude[picks] + rng.normal(0, 0.01, len(picks))
+    for radius, window in [(1.0, 3600), (LOCATION_RADIUS_KM, 2 * 3600)]:
+        q_start, q_end = event_ts[picks] - window // 2, event_ts[picks] + window // 2
+        latencies = single(lambda *q: index.bulk_vehicles_near([q[0]], [q[1]], radius, [q[2]], [q[3]]),
+                           (q_lat[:args.single], q_lon[:args.single], q_start[:args.single], q_end[:args.single]))
+        started = time.perf_counter()
+        query, _, _ = index.bulk_vehicles_near(q_lat, q_lon, radius, q_start, q_end)
+        bulk = time.perf_counter() - started
+        print(f"Area query, {radius:g} km / {window // 3600} h: single {percentiles(latencies)} | "
+              f"bulk {len(picks):,} queries {bulk * 1000:,.0f} ms ({len(picks) / bulk:,.0f}/s, "
+              f"{len(query) / len(picks):.1f} vehicles each)")
+
+    # A full scan of the points for the same question, for scale
+    scans = []
+    for i in range(3):
+        started = time.perf_counter()
+        inside = (event_ts >= q_start[i]) & (event_ts <= q_end[i])
+        near = distance_km(q_lat[i], q_lon[i], latitude[inside], longitude[inside]) <= LOCATION_RADIUS_KM
+        np.unique(vehicle[inside][near])
+        scans.append(time.perf_counter() - started)
+    print(f"Full scan, {LOCATION_RADIUS_KM:g} km / 2 h: {min(scans) * 1000:,.1f} ms per query")
+
+    if n > args.chassis_max:
+        print(f"Per-chassis check skipped above --chassis-max {args.chassis_max:,} points")
+        return
+    started = time.perf_counter()
+    telematics = TelematicsIndex(names[vehicle], event_ts, np.zeros(n, dtype=np.float32), latitude, longitude)
+    print(f"TelematicsIndex build: {time.perf_counter() - started:.2f} s")
+    chassis = names[vehicle[picks]]
+    q_start, q_end = event_ts[picks] - 3600, event_ts[picks] + 3600
+    latencies = single(lambda *q: telematics.bulk_location_check([q[0]], [q[1]], [q[2]], [q[3]], [q[4]]),
+                       (chassis[:args.single], q_lat[:args.single], q_lon[:args.single],
+                        q_start[:args.single], q_end[:args.single]))
+    started = time.perf_counter()
+    counts, _ = telematics.bulk_location_check(chassis, q_lat, q_lon, q_start, q_end)
+    bulk = time.perf_counter() - started
+    print(f"Chassis check, 2 h window: single {percentiles(latencies)} | bulk {len(picks):,} claims "
+          f"{bulk * 1000:,.1f} ms ({len(picks) / bulk:,.0f}/s, {counts.mean():.0f} readings each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", default="1000000,100000000", help="comma-separated point counts")
+    parser.add_argument("--queries", type=int, default=10_000, help="queries in each bulk pass")
+    parser.add_argument("--single", type=int, default=2_000, help="queries timed one at a time")
+    parser.add_argument("--cell-km", type=float, default=1.0)
+    parser.add_argument("--chassis-max", type=int, default=10_000_000)
+    args = parser.parse_args()
+    for n in (int(v) for v in args.points.split(",")):
+        run(n, args)
+
+
+if __name__ == "__main__":
+    main()
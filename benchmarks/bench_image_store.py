@@ -0,0 +1,64 @@
+"""
+Measures the content-addressed image store: evidence import, cold vs cached
+thumbnails for the admin detail view, and deduplicated analysis of the
+evidence images referenced by every claim in image_metadata.csv.
+
+    python -m benchmarks.bench_image_store
+"""
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from evidence_index import IMAGE_METADATA_PATH
+from image_store import ImageStore
+from severity_model import SEVERITY_ANALYSIS, SeverityClassifier, load_severity_model
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        store = ImageStore(root)
+        elapsed, digests = timed(store.import_directory)
+        print(f"Imported {len(digests)} evidence images ({len(set(digests.values()))} distinct) "
+              f"in {elapsed * 1000:.0f} ms")
+
+        # Thumbnails: first view decodes from the memory-mapped file, later views hit the LRU
+        cold = [timed(store.thumbnail, digest)[0] for digest in digests.values()]
+        warm = [timed(store.thumbnail, digest)[0] for digest in digests.values() for _ in range(100)]
+        stats = store.stats()
+        print(f"Thumbnail cold: p50 {np.percentile(cold, 50) * 1000:.1f} ms, "
+              f"cached: p50 {np.percentile(warm, 50) * 1e6:.1f} us "
+              f"({stats['thumbnails']} thumbnails, {stats['thumbnail_bytes'] / 2**20:.1f} MB resident)")
+
+        # Full-resolution reads: copying through the memory map vs a plain file read
+        digest = max(digests.values(), key=lambda d: len(store.read(d)))
+        mapped = [timed(store.read, digest)[0] for _ in range(50)]
+        plain = [timed(lambda: open(store.path(digest), "rb").read())[0] for _ in range(50)]
+        print(f"Full-resolution read ({len(store.read(digest)) / 2**20:.1f} MB): "
+              f"mmap {np.median(mapped) * 1000:.2f} ms, open().read() {np.median(plain) * 1000:.2f} ms")
+
+        # Every claim with evidence, analyzed through the store
+        names = pd.read_csv(IMAGE_METADATA_PATH, usecols=["image_name"], dtype=str)["image_name"]
+        claim_digests = names.map(digests).dropna().tolist()
+        classifier = SeverityClassifier(load_severity_model())
+        calls = []
+
+        def classify(mapped):
+            calls.append(1)
+            return classifier.classify(mapped)
+
+        elapsed, _ = timed(lambda: [store.analyze(SEVERITY_ANALYSIS, d, classify) for d in claim_digests])
+        classifier.close()
+        print(f"Analyzed evidence of {len(claim_digests):,} claims in {elapsed * 1000:.0f} ms "
+              f"with {len(calls)} classifier calls")
+
+
+if __name__ == "__main__":
+    main()
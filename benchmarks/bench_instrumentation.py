@@ -0,0 +1,153 @@
+"""
+Measures what instrumentation costs: a timed call and a span against a plain
+call; the admin list and detail views' data path (cached getters, a grid page,
+25 rows, one claim detail) instrumented as the app does, with the recorder off
+and on; and, with --apptest, whole admin list-view reruns under Streamlit's
+AppTest in two processes, with SMART_CLAIMS_INSTRUMENTATION unset and set.
+Also times the exports.
+
+    python -m benchmarks.bench_instrumentation [--renders 300] [--apptest 30]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from claims_query import ClaimFilter, ClaimsGrid
+from claims_store import load_claims_store
+from detail_cache import assemble_detail
+from evidence_index import load_evidence_index
+from instrumentation import Recorder
+from risk_scoring import RiskScores
+from rule_engine import evaluate_rules
+from telematics import load_telematics
+from telematics_stream import LiveTelematics, StreamingTelematics
+
+
+def per_call(fn, calls=200_000):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+
+def views(recorder, store, grid, rules, risk, evidence_index, telematics):
+    """The list and detail renders' data access, timed like admin_dashboard does."""
+    timed, span = recorder.timed, recorder.span
+    getters = {
+        name: timed(f"data.{name}")(lambda value=value: value)
+        for name, value in [("get_claims_store", store), ("get_claims_grid", grid), ("get_rule_results", rules),
+                            ("get_risk_scores", risk), ("get_evidence_index", evidence_index),
+                            ("get_telematics", telematics)]
+    }
+
+    @timed("view.render_list_view")
+    def render_list_view():
+        store, grid, risk = getters["get_claims_store"](), getters["get_claims_grid"](), getters["get_risk_scores"]()
+        with span("data.grid_page"):
+            page = grid.page(ClaimFilter(), None, 25, getters["get_rule_results"]().worst)
+        return [(store.claim_at(row), risk.percent(row)) for row in page.rows]
+
+    @timed("view.render_detail_view")
+    def render_detail_view(claim_no):
+        with span("data.claim_detail"):
+            return assemble_detail(
+                claim_no, getters["get_claims_store"](), getters["get_rule_results"](), getters["get_risk_scores"](),
+                getters["get_evidence_index"](), {}, {}, getters["get_telematics"](),
+            )
+
+    def render(i):
+        rows = render_list_view()
+        render_detail_view(rows[i % len(rows)][0]["claim_no"])
+    return render
+
+
+APPTEST_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("admin_dashboard.py", default_timeout=600).run()
+timings = []
+for _ in range(int(sys.argv[1])):
+    started = time.perf_counter()
+    at.run()
+    timings.append(time.perf_counter() - started)
+print(min(timings), sorted(timings)[len(timings) // 2])
+"""
+
+
+def apptest_rerun(reruns, enabled):
+    """(best, median) seconds of an admin list-view rerun in a fresh process."""
+    env = dict(os.environ, SMART_CLAIMS_INSTRUMENTATION="1" if enabled else "")
+    out = subprocess.run([sys.executable, "-c", APPTEST_SCRIPT, str(reruns)], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return tuple(float(v) for v in out.split()[-2:])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--apptest", type=int, default=0, help="admin reruns per mode under AppTest (0: skip)")
+    args = parser.parse_args()
+
+    on, off = Recorder(enabled=True), Recorder(enabled=False)
+    noop = lambda: None
+    plain = per_call(noop)
+    timed_on, timed_off = per_call(on.timed("noop")(noop)), per_call(off.timed("noop")(noop))
+
+    def in_span(recorder):
+        def fn():
+            with recorder.span("noop"):
+                pass
+        return fn
+    span_on, span_off = per_call(in_span(on)), per_call(in_span(off))
+    print("Per call (ns): plain {:.0f} | timed off {:.0f}, on {:.0f} | span off {:.0f}, on {:.0f}".format(
+        plain * 1e9, timed_off * 1e9, timed_on * 1e9, span_off * 1e9, span_on * 1e9))
+
+    store = load_claims_store()
+    telematics = LiveTelematics(load_telematics(), StreamingTelematics())
+    rules = evaluate_rules(store, telematics=telematics)
+    risk = RiskScores.score_all(store, telematics)
+    grid = ClaimsGrid(store)
+    data = (store, grid, rules, risk, load_evidence_index(), telematics)
+    renders = {"off": views(off, *data), "on": views(Recorder(enabled=True), *data)}
+    best = {mode: float("inf") for mode in renders}
+    # Alternate the modes so drift (caches, frequency) hits both equally
+    for _ in range(args.repeat):
+        for mode, render in renders.items():
+            started = time.perf_counter()
+            for i in range(args.renders):
+                render(i)
+            best[mode] = min(best[mode], (time.perf_counter() - started) / args.renders)
+    overhead = best["on"] / best["off"] - 1
+    print(f"List + detail render data path: {best['off'] * 1000:.3f} ms off, {best['on'] * 1000:.3f} ms on "
+          f"({overhead:+.1%} overhead)")
+
+    recorder = Recorder(enabled=True)
+    render = views(recorder, *data)
+    for i in range(args.renders):
+        render(i)
+    spans = recorder.snapshot()
+    print(f"  {sum(s['count'] for s in spans.values()) / args.renders:.0f} spans per render over {len(spans)} names")
+    for name in ["view.render_list_view", "view.render_detail_view", "data.grid_page"]:
+        s = spans[name]
+        print(f"  {name:26} p50 {s['p50'] * 1000:.3f} ms, p95 {s['p95'] * 1000:.3f} ms, p99 {s['p99'] * 1000:.3f} ms")
+    started = time.perf_counter()
+    text = recorder.to_prometheus()
+    prometheus = time.perf_counter() - started
+    started = time.perf_counter()
+    recorder.to_json()
+    print(f"Exports: Prometheus {prometheus * 1000:.2f} ms ({len(text.splitlines())} lines), "
+          f"JSON {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    if args.apptest:
+        off_best, off_median = apptest_rerun(args.apptest, False)
+        on_best, on_median = apptest_rerun(args.apptest, True)
+        print(f"Admin list-view rerun under AppTest ({args.apptest} reruns): best {off_best * 1000:.1f} ms off, "
+              f"{on_best * 1000:.1f} ms on ({on_best / off_best - 1:+.1%}); median {off_median * 1000:.1f} ms off, "
+              f"{on_median * 1000:.1f} ms on ({on_median / off_median - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
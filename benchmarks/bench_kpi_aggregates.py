@@ -0,0 +1,67 @@
+"""
+Checks and times the incrementally maintained KPI aggregates.
+
+Replays a random stream of claim submissions and status changes against a
+ClaimsStore, verifying after every batch that the incremental aggregates agree
+with a full recompute, then compares per-event update cost with a rescan.
+
+    python -m benchmarks.bench_kpi_aggregates [--events 2000]
+"""
+import argparse
+import random
+import time
+
+from claims_store import STATUSES, load_claims_store
+from kpi_aggregates import KpiAggregates
+from benchmarks.synthetic import random_claim_numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = load_claims_store()
+    kpis = KpiAggregates.from_claims(store.claims)
+    store.add_listener(kpis)
+
+    new_ids = iter(random_claim_numbers(args.events, seed=args.seed))
+    status_time, status_events, pending = 0.0, 0, []
+    for event in range(args.events):
+        if rng.random() < 0.2:
+            # Submissions are appended in small batches, like a compaction would
+            record = dict(store.claim_at(rng.randrange(len(store))))
+            record.update(claim_no=next(new_ids), status=rng.choice(STATUSES),
+                          severity=rng.choice(["Total Loss", "Major Damage", "Minor Damage"]))
+            pending.append(record)
+            if len(pending) == 10:
+                store.add_claims(pending)
+                pending = []
+        else:
+            claim_no = store.claim_at(rng.randrange(len(store)))["claim_no"]
+            started = time.perf_counter()
+            store.set_status(claim_no, rng.choice(STATUSES))
+            status_time += time.perf_counter() - started
+            status_events += 1
+        if event % 100 == 0:
+            kpis.verify(store.claims)
+    kpis.verify(store.claims)
+    print(f"{args.events:,} events replayed; incremental and full aggregates agree "
+          f"({len(store):,} claims, totals {kpis.totals()})")
+
+    started = time.perf_counter()
+    for _ in range(100):
+        kpis.totals()
+    read = (time.perf_counter() - started) / 100
+    started = time.perf_counter()
+    for _ in range(20):
+        KpiAggregates.from_claims(store.claims).totals()
+    rescan = (time.perf_counter() - started) / 20
+    print(f"Header read: incremental {read * 1e6:.1f} us vs full rescan {rescan * 1000:.2f} ms")
+    print(f"Status change incl. aggregate update: {status_time / max(status_events, 1) * 1e6:.1f} us/event")
+
+
+if __name__ == "__main__":
+    main()
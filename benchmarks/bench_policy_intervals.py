@@ -0,0 +1,88 @@
+"""
+Measures the policy-validity interval index: build time, size and lookup
+throughput on the shipped policies, then on synthetic fleets up to 10M
+policies (int64 chassis ids), against a pandas merge_asof baseline for the
+batch "which policy covered this vehicle on date D" question.
+
+    python -m benchmarks.bench_policy_intervals [--max-policies 10000000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_policy_terms
+from claims_store import load_claims_store
+from policy_intervals import PolicyIntervalIndex
+from rule_engine import check_policy_active, rule_inputs
+
+QUERIES = 1_000_000
+
+
+def merge_asof_rows(chassis, eff, expiry, query_chassis, query_dates):
+    """Baseline: latest policy starting on or before each date, then an expiry check."""
+    policies = pd.DataFrame({"chassis": chassis, "start": eff, "end": expiry, "row": np.arange(len(chassis))})
+    queries = pd.DataFrame({"chassis": query_chassis, "date": query_dates, "q": np.arange(len(query_chassis))})
+    merged = pd.merge_asof(
+        queries.sort_values("date"), policies.sort_values("start"),
+        left_on="date", right_on="start", by="chassis", direction="backward",
+    ).sort_values("q")
+    return np.where(merged["end"].to_numpy() >= merged["date"].to_numpy(), merged["row"].fillna(-1).to_numpy(), -1)
+
+
+def run(label, chassis, eff, expiry, query_chassis, query_dates, baseline):
+    started = time.perf_counter()
+    index = PolicyIntervalIndex(chassis, eff, expiry)
+    build_s = time.perf_counter() - started
+    started = time.perf_counter()
+    rows = index.covering_rows(query_chassis, query_dates)
+    batch_s = time.perf_counter() - started
+    n = len(query_chassis)
+    line = (f"{label:<22} {len(index):>11,} policies | build {build_s * 1000:8.1f} ms, {index.nbytes() / 2**20:7.1f} MB"
+            f" | {n:,} lookups {batch_s * 1000:7.1f} ms ({n / batch_s:>12,.0f}/s), {np.mean(rows >= 0):.0%} covered")
+    if baseline:
+        started = time.perf_counter()
+        expected = merge_asof_rows(chassis, eff, expiry, query_chassis, query_dates)
+        line += f" | merge_asof {(time.perf_counter() - started) * 1000:7.1f} ms"
+        # merge_asof ignores earlier terms still in force, so it can only miss coverage
+        assert np.all((expected < 0) | (rows >= 0))
+    print(line)
+    singles = np.empty(200)
+    for i in range(len(singles)):
+        started = time.perf_counter()
+        index.covering_row(query_chassis[i], query_dates[i])
+        singles[i] = time.perf_counter() - started
+    print(f"{'':<22} single lookup p50 {np.percentile(singles, 50) * 1e6:.1f} us, "
+          f"p99 {np.percentile(singles, 99) * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-policies", type=int, default=10_000_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    store = load_claims_store()
+    policies = store.policies
+    inputs = rule_inputs(store)
+    started = time.perf_counter()
+    check_policy_active(inputs)
+    print(f"Policy Active check over all {len(store.claims):,} claims: {(time.perf_counter() - started) * 1000:.2f} ms "
+          f"(+ covering lookups inside rule_inputs)")
+    picks = rng.integers(len(policies), size=QUERIES)
+    dates = policies["POL_EFF_DATE"].to_numpy()[picks] + rng.integers(-200, 600, QUERIES).astype("timedelta64[D]")
+    run("shipped policies", policies["CHASSIS_NO"].to_numpy(), policies["POL_EFF_DATE"].to_numpy(),
+        policies["POL_EXPIRY_DATE"].to_numpy(), policies["CHASSIS_NO"].to_numpy()[picks], dates, True)
+
+    size = 100_000
+    while size <= args.max_policies:
+        chassis, eff, expiry = synthetic_policy_terms(size, seed=size)
+        picks = rng.integers(size, size=QUERIES)
+        dates = eff[picks] + rng.integers(-200, 600, QUERIES).astype("timedelta64[D]")
+        run(f"synthetic", chassis, eff, expiry, chassis[picks], dates, size <= 1_000_000)
+        size *= 10
+
+
+if __name__ == "__main__":
+    main()
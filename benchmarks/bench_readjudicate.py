@@ -0,0 +1,66 @@
+"""
+Measures bulk re-adjudication wall-clock time by worker count on a scaled-up
+claims table, against one in-process pass (rules and risk, no pool). Every run
+starts from an empty checkpoint directory and writes nothing back; the results
+of each worker count are checked equal to the first.
+
+The speedup is bounded by the cores actually available (printed first): worker
+counts above it share them and only add fork and scheduling overhead.
+
+    python -m benchmarks.bench_readjudicate [--claims 1000000] [--workers 1,4,16]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import scale_store
+from claims_store import load_claims_store
+from duplicate_index import claim_digests
+from evidence_index import load_evidence_index
+from image_store import ImageStore
+from readjudicate import DEFAULT_PARTITIONS, RESULT_COLUMNS, readjudicate
+from risk_scoring import risk_features, score_features
+from rule_engine import evaluate_rules, evidence_images
+from telematics import load_telematics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--workers", default="1,4,16", help="comma-separated worker counts")
+    parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+    args = parser.parse_args()
+
+    store = scale_store(load_claims_store(), args.claims)
+    telematics = load_telematics()
+    image_store = ImageStore()
+    digests = claim_digests(evidence_images(store, load_evidence_index()), image_store.import_directory())
+    print(f"{len(store.claims):,} claims, {args.partitions} partitions by policy_no, "
+          f"{len(os.sched_getaffinity(0))} cores available")
+
+    started = time.perf_counter()
+    results = evaluate_rules(store, telematics=telematics)
+    score_features(risk_features(store, telematics=telematics,
+                                 speed=(results.inputs["speed_readings"], results.inputs["max_speed"])))
+    serial = time.perf_counter() - started
+    print(f"In-process rules + risk (no images or duplicates): {serial:.1f}s")
+
+    baseline, first = None, None
+    for workers in (int(v) for v in args.workers.split(",")):
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            results = readjudicate(store, telematics, image_store, digests, workers=workers,
+                                   partitions=args.partitions, directory=os.path.join(directory, "run"))
+            elapsed = time.perf_counter() - started
+        if first is None:
+            baseline, first = elapsed, results
+        assert all(np.array_equal(results[name], first[name]) for name in RESULT_COLUMNS + ["model_level"])
+        print(f"{workers:>3} workers: {elapsed:6.1f}s ({len(store.claims) / elapsed:,.0f} claims/s, "
+              f"{baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measures the risk scoring job: feature-matrix size, batch scoring throughput
+over the whole claims table (and a tiled scale-up), and the incremental path
+that scores only newly submitted claims compared with rescoring everything.
+
+    python -m benchmarks.bench_risk_scoring [--scale 100]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from claims_store import load_claims_store
+from risk_scoring import RISK_FEATURES, RiskScores, risk_features, score_features
+from rule_engine import speed_inputs
+from telematics import load_telematics
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=100, help="tiling factor for the scale-up run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    store, telematics = load_claims_store(), load_telematics()
+    n = len(store.claims)
+
+    speed_s, speed = best_time(lambda: speed_inputs(store, telematics), args.repeat)
+    features_s, features = best_time(lambda: risk_features(store, speed=speed), args.repeat)
+    score_s, scores = best_time(lambda: score_features(features), args.repeat)
+    print(f"Feature matrix: {features.shape[0]:,} claims x {features.shape[1]} features "
+          f"({', '.join(name for name, _ in RISK_FEATURES)}), {features.dtype}, {features.nbytes / 1024:.0f} KB "
+          f"({features.nbytes / n:.0f} bytes/claim)")
+    total_s = speed_s + features_s + score_s
+    print(f"Batch over {n:,} claims: telematics {speed_s * 1000:.1f} ms + features {features_s * 1000:.1f} ms "
+          f"+ scoring {score_s * 1000:.2f} ms = {n / total_s:,.0f} claims/s")
+    print(f"  risk percentiles p50 {np.percentile(scores, 50):.2f}, p90 {np.percentile(scores, 90):.2f}, "
+          f"p99 {np.percentile(scores, 99):.2f}")
+
+    tiled = np.tile(features, (args.scale, 1))
+    tiled_s, _ = best_time(lambda: score_features(tiled), args.repeat)
+    print(f"Scoring a x{args.scale} tiled matrix ({len(tiled):,} claims, {tiled.nbytes / 2**20:.1f} MB): "
+          f"{tiled_s * 1000:.1f} ms, {len(tiled) / tiled_s:,.0f} claims/s")
+
+    risk = RiskScores.score_all(store, telematics, speed=speed)
+    store.add_listener(risk)
+    template = store.claim_at(0)
+    rng = np.random.default_rng(3)
+    print("Incremental (claims_added listener) vs full rescore:")
+    for count in [1, 10, 100]:
+        records = [dict(template, claim_no=f"bench-{rng.integers(1 << 62):x}") for _ in range(count)]
+        store.add_claims(records)
+        rows = np.arange(len(store.claims) - count, len(store.claims))
+        incremental_s, new_scores = best_time(lambda: score_features(risk_features(store, rows, telematics)), args.repeat)
+        full_s, _ = best_time(lambda: RiskScores.score_all(store, telematics), 1)
+        assert np.allclose(risk.scores[rows], new_scores) and len(risk) == len(store.claims)
+        print(f"  {count:4} new claims: {incremental_s * 1000:7.2f} ms incremental | {full_s * 1000:7.1f} ms full rescore")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the batch rule engine against a naive row-by-row loop, on the shipped
+claims table and on a synthetic scale-up made by tiling it.
+
+    python -m benchmarks.bench_rule_engine [--scale 100]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from claims_store import load_claims_store
+from rule_engine import FAIL, PASS, WARN, evaluate_batch, load_model_severity, rule_inputs
+
+
+def evaluate_row_by_row(inputs):
+    """The per-claim Python loop the batch engine replaces (reference only)."""
+    n = len(inputs["total"])
+    outcomes = {"severity": [], "amount": [], "policy_active": []}
+    for i in range(n):
+        model, reported = inputs["model_level"][i], inputs["reported_level"][i]
+        outcomes["severity"].append(PASS if model >= 0 and model == reported else WARN)
+        covered = WARN if inputs["covering_row"][i] >= 0 else FAIL
+        if not inputs["has_policy"][i]:
+            outcomes["amount"].append(FAIL)
+            outcomes["policy_active"].append(covered)
+            continue
+        total = inputs["total"][i]
+        if total > inputs["sum_insured"][i]:
+            outcomes["amount"].append(FAIL)
+        elif total <= inputs["deductible"][i]:
+            outcomes["amount"].append(WARN)
+        else:
+            outcomes["amount"].append(PASS)
+        active = inputs["eff_date"][i] <= inputs["claim_date"][i] <= inputs["expiry_date"][i]
+        outcomes["policy_active"].append(PASS if active else covered)
+    return outcomes
+
+
+def tile_inputs(inputs, factor):
+    return {key: np.tile(values, factor) for key, values in inputs.items()}
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(label, inputs, repeat):
+    n = len(inputs["total"])
+    batch_s, batch = best_time(lambda: evaluate_batch(inputs), repeat)
+    loop_s, loop = best_time(lambda: evaluate_row_by_row(inputs), 1)
+    for key, codes in loop.items():
+        assert np.array_equal(batch.outcomes[key], np.asarray(codes, dtype=np.int8)), key
+    print(f"{label:<18} {n:>10,} claims | batch {n / batch_s:>14,.0f} claims/s ({batch_s * 1000:8.1f} ms)"
+          f" | row loop {n / loop_s:>10,.0f} claims/s ({loop_s * 1000:9.1f} ms) | x{loop_s / batch_s:,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=int, default=100, help="tiling factor for the synthetic run")
+    args = parser.parse_args()
+
+    store = load_claims_store()
+    inputs = rule_inputs(store, load_model_severity(store))
+    run("claims.csv", inputs, repeat=5)
+    run(f"synthetic x{args.scale}", tile_inputs(inputs, args.scale), repeat=3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measures per-session memory and the session backends with simulated sessions.
+
+Memory compares the state shape the apps used to keep in st.session_state
+(whole claim rows and the uploaded image buffer) against the compact ids they
+persist now (claim numbers and the image's content digest), by the Python heap
+growth of holding --sessions of each. Each backend is then timed saving and
+loading every session's state, with a second backend instance standing in for
+another replica reading what the first one wrote.
+
+    python -m benchmarks.bench_sessions [--sessions 1000]
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+from claims_store import load_claims_store
+from image_store import EVIDENCE_DIR, content_digest
+from session_store import FileSessionBackend, SqliteSessionBackend
+
+
+def held_bytes(build):
+    """Heap bytes still allocated by what `build()` returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return held
+
+
+def percentiles(latencies):
+    return f"p50 {np.percentile(latencies, 50) * 1e6:7.1f} us, p99 {np.percentile(latencies, 99) * 1e6:7.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=1000)
+    args = parser.parse_args()
+
+    store = load_claims_store()
+    images = [open(os.path.join(EVIDENCE_DIR, name), "rb").read() for name in sorted(os.listdir(EVIDENCE_DIR))]
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, len(store.claims), args.sessions)
+    uploads = rng.integers(0, len(images), args.sessions)
+    digests = [content_digest(data) for data in images]
+
+    def full_sessions():
+        # Every session held its own copy of the claim row and of the uploaded file
+        return [{
+            "current_view": "detail", "selected_claim": dict(store.claim_at(row)), "page": "results",
+            "uploaded_image": io.BytesIO(bytearray(images[image])),
+        } for row, image in zip(rows, uploads)]
+
+    def compact_sessions():
+        return [{
+            "current_view": "detail", "selected_claim": str(store.claim_at(row)["claim_no"]), "page": "results",
+            "uploaded_image": {"file_id": uuid.uuid4().hex, "digest": digests[image], "name": "crash.jpg",
+                               "size": len(images[image])},
+        } for row, image in zip(rows, uploads)]
+
+    full, compact = held_bytes(full_sessions), held_bytes(compact_sessions)
+    print(f"{args.sessions:,} sessions: claim rows + upload buffers {full / args.sessions / 1024:,.1f} KiB/session, "
+          f"compact ids {compact / args.sessions / 1024:,.2f} KiB/session ({full / compact:,.0f}x smaller)")
+
+    states = compact_sessions()
+    ids = [uuid.uuid4().hex for _ in states]
+    with tempfile.TemporaryDirectory() as root:
+        backends = {
+            "sqlite": lambda: SqliteSessionBackend(os.path.join(root, "sessions.sqlite")),
+            "file": lambda: FileSessionBackend(os.path.join(root, "sessions")),
+        }
+        for name, open_backend in backends.items():
+            writer, reader = open_backend(), open_backend()
+            saves = np.empty(len(ids))
+            for i, (session, state) in enumerate(zip(ids, states)):
+                started = time.perf_counter()
+                writer.save(session, state)
+                saves[i] = time.perf_counter() - started
+            loads = np.empty(len(ids))
+            for i, session in enumerate(ids):
+                started = time.perf_counter()
+                assert reader.load(session) == states[i]
+                loads[i] = time.perf_counter() - started
+            print(f"{name:>6} backend: save {percentiles(saves)} | load on another replica {percentiles(loads)}")
+
+
+if __name__ == "__main__":
+    main()
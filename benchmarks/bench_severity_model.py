@@ -0,0 +1,92 @@
+"""
+Measures the image-severity classifier: leave-one-out accuracy on the training
+images, forward-pass throughput (images/sec) by batch size, and concurrent
+requests served through the micro-batcher versus one forward pass each.
+
+    python -m benchmarks.bench_severity_model [--requests 512] [--clients 16]
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from severity_model import (
+    MAX_BATCH_DELAY, MAX_BATCH_SIZE, MicroBatcher, SeverityModel, decode_image, image_features,
+    load_severity_model, training_set,
+)
+
+
+def leave_one_out(pixels, levels):
+    features = image_features(pixels)
+    mirrored = image_features(pixels[:, :, ::-1])
+    hits = 0
+    for i in range(len(levels)):
+        keep = np.arange(len(levels)) != i
+        model = SeverityModel.fit(np.vstack([features[keep], mirrored[keep]]), np.concatenate([levels[keep]] * 2))
+        hits += int(model.predict(pixels[i:i + 1])[0][0] == levels[i])
+    return hits / len(levels)
+
+
+def concurrent_latency(score, images, clients, requests):
+    """Each client thread scores its share of `requests` images one at a time."""
+    latencies, lock = [], threading.Lock()
+
+    def client(seed):
+        rng = np.random.default_rng(seed)
+        for _ in range(requests // clients):
+            started = time.perf_counter()
+            score(images[rng.integers(len(images))])
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+
+    paths, levels = training_set()
+    started = time.perf_counter()
+    pixels = np.stack([decode_image(path) for path in paths])
+    decode = (time.perf_counter() - started) / len(paths)
+    print(f"{len(paths)} training images, decode {decode * 1000:.1f} ms/image (1024px PNG to 64px)")
+    print(f"Leave-one-out accuracy: {leave_one_out(pixels, levels):.0%} (chance {np.bincount(levels).max() / len(levels):.0%})")
+
+    model = load_severity_model()
+    rng = np.random.default_rng(3)
+    print("\nForward pass (features + logits) on decoded images:")
+    for batch_size in [1, 2, 4, 8, 16, 32, 64, 128]:
+        batch = pixels[rng.integers(len(pixels), size=batch_size)]
+        repeats = max(3, 512 // batch_size)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            model.predict(batch)
+        elapsed = (time.perf_counter() - started) / repeats
+        print(f"  batch {batch_size:>3}: {elapsed * 1000:7.2f} ms/batch, {batch_size / elapsed:8,.0f} images/s")
+
+    print(f"\n{args.requests} requests from {args.clients} concurrent clients (decoded images):")
+    unbatched = lambda image: model.predict(image[None])
+    wall, latency = concurrent_latency(unbatched, pixels, args.clients, args.requests)
+    print(f"  one pass per request: {len(latency) / wall:8,.0f} images/s, "
+          f"p50 {np.percentile(latency, 50) * 1000:.1f} ms, p99 {np.percentile(latency, 99) * 1000:.1f} ms")
+    batcher = MicroBatcher(lambda images: list(model.predict(np.stack(images))[0]), MAX_BATCH_SIZE, MAX_BATCH_DELAY)
+    wall, latency = concurrent_latency(lambda image: batcher.submit(image).result(), pixels, args.clients, args.requests)
+    batcher.close()
+    print(f"  micro-batched (max {MAX_BATCH_SIZE}, {MAX_BATCH_DELAY * 1000:.0f} ms budget): "
+          f"{len(latency) / wall:8,.0f} images/s, p50 {np.percentile(latency, 50) * 1000:.1f} ms, "
+          f"p99 {np.percentile(latency, 99) * 1000:.1f} ms, mean batch {batcher.stats()['mean_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
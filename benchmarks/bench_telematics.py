@@ -0,0 +1,51 @@
+"""
+Measures the telematics speed-check engine: partition load + index build,
+single-claim window lookups and the bulk check over every claim.
+
+    python -m benchmarks.bench_telematics
+"""
+import time
+
+import numpy as np
+
+from claims_store import load_claims_store
+from rule_engine import speed_inputs
+from telematics import load_telematics
+
+
+def main():
+    telematics = load_telematics()
+    print(f"Loaded {len(telematics):,} readings for {telematics.vehicle_count:,} vehicles "
+          f"in {telematics.load_seconds * 1000:.0f} ms")
+
+    # Single lookups on windows that actually contain readings
+    rng = np.random.default_rng(7)
+    chassis = np.array(list(telematics._slots), dtype=object)
+    picks = rng.integers(0, len(telematics), 20000)
+    slots = np.searchsorted(telematics.offsets, picks, "right") - 1
+    starts = telematics.event_ts[picks] - 1800
+    ends = starts + 5400
+    latencies = np.empty(len(picks))
+    for i, (slot, start, end) in enumerate(zip(slots, starts, ends)):
+        started = time.perf_counter()
+        telematics.speed_check(chassis[slot], start, end)
+        latencies[i] = time.perf_counter() - started
+    print(f"Single-claim speed check: p50 {np.percentile(latencies, 50) * 1e6:.1f} us, "
+          f"p99 {np.percentile(latencies, 99) * 1e6:.1f} us")
+
+    started = time.perf_counter()
+    counts, _ = telematics.bulk_speed_check(chassis[slots], starts, ends)
+    elapsed = time.perf_counter() - started
+    print(f"Bulk check, {len(picks):,} windows: {elapsed * 1000:.1f} ms "
+          f"({len(picks) / elapsed:,.0f} windows/s, {(counts > 0).mean():.0%} with readings)")
+
+    store = load_claims_store()
+    started = time.perf_counter()
+    counts, _ = speed_inputs(store, telematics)
+    elapsed = time.perf_counter() - started
+    print(f"Bulk check, all {len(store):,} claims: {elapsed * 1000:.1f} ms "
+          f"({(counts > 0).sum():,} claims with readings near the incident)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measures the bronze/silver/gold pipeline against reading the CSVs directly:
+store load time and peak allocation, cold build vs no-op vs incremental
+refresh (after editing a copy of the sources), and gold reads with column and
+partition/predicate pruning. Peak memory is what tracemalloc sees (Python and
+NumPy allocations); Arrow's own buffer pool is not included.
+
+    python -m benchmarks.bench_warehouse
+"""
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from claims_store import SQL_SERVER_DIR, load_claims_store
+from warehouse import TABLES, Warehouse
+
+
+def measure(fn, repeat=3):
+    """Returns (result, best seconds, peak traced MB of the first run)."""
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return result, min(timings), peak
+
+
+def edit_sources(source_dir, rng, updates, appends):
+    """Changes `updates` random claims and appends `appends` copies with new claim numbers."""
+    path = os.path.join(source_dir, "claims.csv")
+    claims = pd.read_csv(path, dtype=str, keep_default_na=False)
+    rows = rng.choice(len(claims), updates, replace=False)
+    claims.loc[rows, "total"] = (pd.to_numeric(claims.loc[rows, "total"]) + 1).astype(str)
+    extra = claims.sample(appends, random_state=int(rng.integers(1 << 31)))
+    extra["claim_no"] = [f"bench-{rng.integers(1 << 62):x}" for _ in range(appends)]
+    pd.concat([claims, extra]).to_csv(path, index=False)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "sql_server")
+        os.makedirs(source_dir)
+        for spec in TABLES:
+            shutil.copy(os.path.join(SQL_SERVER_DIR, spec.file), source_dir)
+        root = os.path.join(tmp, "warehouse")
+
+        started = time.perf_counter()
+        warehouse = Warehouse(root, source_dir)
+        warehouse.refresh()
+        cold = time.perf_counter() - started
+        csv_bytes = sum(os.path.getsize(os.path.join(source_dir, spec.file)) for spec in TABLES)
+        silver_bytes = sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for dirpath, _, names in os.walk(os.path.join(root, "silver")) for name in names
+        )
+        print(f"Sources: {csv_bytes / 2**20:.1f} MB CSV -> {silver_bytes / 2**20:.1f} MB silver parquet")
+
+        store, csv_seconds, csv_peak = measure(lambda: load_claims_store(source_dir))
+        _, silver_seconds, silver_peak = measure(warehouse.load_store)
+        print(f"Load ClaimsStore ({len(store.claims):,} claims):")
+        print(f"  from CSV     {csv_seconds * 1000:7.1f} ms, peak {csv_peak:6.1f} MB allocated")
+        print(f"  from silver  {silver_seconds * 1000:7.1f} ms, peak {silver_peak:6.1f} MB allocated")
+
+        print("Refresh:")
+        print(f"  cold build            {cold * 1000:7.1f} ms")
+        started = time.perf_counter()
+        warehouse.refresh()
+        print(f"  unchanged sources     {(time.perf_counter() - started) * 1000:7.1f} ms")
+        rng = np.random.default_rng(5)
+        for updates, appends in [(1, 0), (50, 50), (1000, 500)]:
+            edit_sources(source_dir, rng, updates, appends)
+            run = warehouse.refresh()
+            claims = run["tables"]["claims"]
+            print(f"  {updates:4} updated + {appends:3} new claims: {run['seconds'] * 1000:7.1f} ms "
+                  f"({claims['partitions_rewritten']} silver, {len(run['gold_partitions'])} gold partitions rewritten)")
+        started = time.perf_counter()
+        Warehouse(os.path.join(tmp, "rebuild"), source_dir).refresh()
+        print(f"  full rebuild of the edited sources {(time.perf_counter() - started) * 1000:7.1f} ms")
+
+        print("Gold reads:")
+        full, full_seconds, full_peak = measure(warehouse.read_gold)
+        print(f"  all {full.shape[1]} columns        {full_seconds * 1000:7.1f} ms, peak {full_peak:6.1f} MB")
+        columns = ["claim_no", "severity", "total", "MAKE", "borough"]
+        _, pruned_seconds, pruned_peak = measure(lambda: warehouse.read_gold(columns))
+        print(f"  {len(columns)} columns          {pruned_seconds * 1000:7.1f} ms, peak {pruned_peak:6.1f} MB")
+        filters = [("claim_year", ">=", 2020), ("severity", "=", "Total Loss")]
+        filtered, filtered_seconds, filtered_peak = measure(lambda: warehouse.read_gold(columns, filters))
+        print(f"  {len(columns)} columns, {len(filtered):,} of {len(full):,} rows (year >= 2020, Total Loss) "
+              f"{filtered_seconds * 1000:7.1f} ms, peak {filtered_peak:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
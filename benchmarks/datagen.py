@@ -0,0 +1,535 @@
+"""
+Generates synthetic datasets of any size modelled on the shipped data, for
+performance work at volumes the repo does not ship (10M claims, 100M
+telematics readings).
+
+`DatasetModel.fit` learns from data/ (or SMART_CLAIMS_DATA_DIR):
+  - the count distributions down the key chain: vehicles per customer, policy
+    terms per vehicle, claims per policy, trips per tracked vehicle and
+    readings per trip;
+  - row templates that are resampled whole, so that columns which move
+    together stay together: customer demographics, the vehicle and its cover,
+    and the facts of a claim;
+  - dates as offsets: issue to effective date, term length, the gap before a
+    renewal, where the claim falls in its term, and the incident and licence
+    dates around the claim;
+  - telematics trips: start days, times and positions, the speed distribution
+    for each minute of a trip, and the position steps between readings.
+
+`generate` splits the customers into chunks. A worker process generates each
+chunk from its own seed, together with everything that hangs off those
+customers (vehicles, policies, claims, image metadata and telematics). Each
+chunk is written as one parquet part per table.
+
+Ids need no coordination between workers. Policy numbers and chassis serials
+are scoped to their chunk, and claim numbers are random UUIDs. Workers share
+nothing, so a worker's memory is bounded by the chunk size rather than the
+dataset size.
+
+    python -m benchmarks.datagen OUT_DIR [--claims 10000000] [--telematics-rows 100000000]
+        [--workers N] [--seed 0] [--csv]
+
+Parquet parts are written under OUT_DIR/sql_server/<table>/,
+OUT_DIR/claims/metadata/image_metadata/ and OUT_DIR/telematics/. The values are
+the source CSVs' text, and telematics keeps its source schema. With --csv the
+tables and image metadata are also written as the CSV files the apps read, so
+that SMART_CLAIMS_DATA_DIR can point at OUT_DIR.
+"""
+import argparse
+import functools
+import glob
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from benchmarks.synthetic import link_media, random_claim_numbers
+from claims_store import DATA_DIR
+from telematics import TELEMATICS_COLUMNS
+
+# Expected rows per chunk; a chunk is the unit of work and bounds a worker's memory
+CLAIMS_PER_CHUNK = 250_000
+TELEMATICS_ROWS_PER_CHUNK = 500_000
+# Policy numbers and chassis serials are chunk * ID_STRIDE + position in the chunk
+ID_STRIDE = 10**8
+POLICY_NO_BASE = 300_000_000
+CUSTOMER_ID_BASE = 1_000_000
+# VINs never use I, O or Q; a chassis number is the source's 3-character
+# manufacturer prefix, 2 random characters and a serial (33**12 > any serial)
+VIN_ALPHABET = np.frombuffer(b"0123456789ABCDEFGHJKLMNPRSTUVWXYZ", dtype="S1")
+VIN_SERIAL_LENGTH = 12
+# Spread of sampled first issue dates around the source's, in days
+ISSUE_JITTER_DAYS = 30
+# Log-normal spread applied to a resampled claim's amounts
+AMOUNT_JITTER = 0.1
+SPEED_QUANTILES = 101
+
+CUSTOMER_COLUMNS = ["customer_id", "date_of_birth", "borough", "neighborhood", "zip_code", "name"]
+POLICY_COLUMNS = [
+    "POLICY_NO", "CUST_ID", "POLICYTYPE", "POL_ISSUE_DATE", "POL_EFF_DATE", "POL_EXPIRY_DATE", "MAKE", "MODEL",
+    "MODEL_YEAR", "CHASSIS_NO", "USE_OF_VEHICLE", "PRODUCT", "SUM_INSURED", "PREMIUM", "DEDUCTABLE",
+]
+CLAIM_COLUMNS = [
+    "claim_no", "policy_no", "claim_date", "months_as_customer", "injury", "property", "vehicle", "total",
+    "collision_type", "number_of_vehicles_involved", "age", "insured_relationship", "license_issue_date", "date",
+    "hour", "type", "severity", "number_of_witnesses", "suspicious_activity",
+]
+IMAGE_METADATA_COLUMNS = ["image_name", "image_id", "claim_no", "chassis_no"]
+# Resampled as a unit from the source rows
+DEMOGRAPHIC_COLUMNS = ["date_of_birth", "borough", "neighborhood", "zip_code"]
+COVER_COLUMNS = ["POLICYTYPE", "MAKE", "MODEL", "MODEL_YEAR", "USE_OF_VEHICLE", "PRODUCT", "SUM_INSURED", "PREMIUM", "DEDUCTABLE"]
+CLAIM_FACT_COLUMNS = [
+    "months_as_customer", "collision_type", "number_of_vehicles_involved", "age", "insured_relationship",
+    "hour", "type", "severity", "number_of_witnesses", "suspicious_activity",
+]
+AMOUNT_COLUMNS = ["injury", "property", "vehicle"]
+
+# Output layout: table -> (parquet part directory, CSV file), relative to the output directory
+TABLE_PATHS = {
+    "customers": (os.path.join("sql_server", "customers"), os.path.join("sql_server", "customers.csv")),
+    "policies": (os.path.join("sql_server", "policies"), os.path.join("sql_server", "policies.csv")),
+    "claims": (os.path.join("sql_server", "claims"), os.path.join("sql_server", "claims.csv")),
+    "image_metadata": (os.path.join("claims", "metadata", "image_metadata"),
+                       os.path.join("claims", "metadata", "image_metadata.csv")),
+    "telematics": ("telematics", None),
+}
+TABLE_COLUMNS = {
+    "customers": CUSTOMER_COLUMNS, "policies": POLICY_COLUMNS, "claims": CLAIM_COLUMNS,
+    "image_metadata": IMAGE_METADATA_COLUMNS, "telematics": TELEMATICS_COLUMNS,
+}
+
+
+# --- MODEL ---
+def _pmf(counts):
+    """(values, probabilities) of the empirical distribution of `counts`."""
+    freq = pd.Series(counts).value_counts().sort_index()
+    return freq.index.to_numpy(), (freq / freq.sum()).to_numpy()
+
+
+def _expectation(pmf):
+    values, probs = pmf
+    return float(np.dot(values, probs))
+
+
+def _draw(rng, pmf, n):
+    values, probs = pmf
+    return values[rng.choice(len(values), n, p=probs)]
+
+
+def _days(text, fmt="%Y-%m-%d"):
+    """Date text -> int64 days since the epoch."""
+    return pd.to_datetime(text, format=fmt, errors="coerce").to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+class DatasetModel:
+    """
+    Distributions and row templates learned from a source dataset; see the
+    module docstring. Everything is plain arrays and small Arrow tables, so the
+    model pickles cheaply into worker processes.
+    """
+
+    @classmethod
+    def fit(cls, source_dir=DATA_DIR):
+        started = time.perf_counter()
+        model = cls()
+        read = lambda *parts: pd.read_csv(os.path.join(source_dir, *parts), dtype=str, keep_default_na=False)
+        customers = read("sql_server", "customers.csv")
+        policies = read("sql_server", "policies.csv")
+        claims = read("sql_server", "claims.csv")
+        metadata = read("claims", "metadata", "image_metadata.csv")
+        paths = sorted(glob.glob(os.path.join(source_dir, "telematics", "*.parquet")))
+        telematics = pd.concat([pd.read_parquet(path, columns=TELEMATICS_COLUMNS) for path in paths], ignore_index=True)
+
+        # Customers: demographics resampled as rows, names recombined from their parts
+        model.demographics = pa.Table.from_pandas(customers[DEMOGRAPHIC_COLUMNS], preserve_index=False)
+        last, _, first = customers["name"].str.partition(", ").T.to_numpy()
+        model.last_names = _pmf(last)
+        model.first_names = _pmf(first)
+
+        # Vehicles (chassis) and their policy terms, oldest first
+        policies = policies.assign(
+            customer=pd.to_numeric(policies["CUST_ID"], errors="coerce"),
+            issue=_days(policies["POL_ISSUE_DATE"]),
+            eff=_days(policies["POL_EFF_DATE"]),
+            expiry=_days(policies["POL_EXPIRY_DATE"]),
+        ).sort_values(["CHASSIS_NO", "eff"], kind="stable")
+        first_terms = policies.drop_duplicates("CHASSIS_NO")
+        per_customer = first_terms.groupby("customer").size()
+        customer_ids = pd.to_numeric(customers["customer_id"], errors="coerce")
+        model.vehicles_per_customer = _pmf(per_customer.reindex(customer_ids, fill_value=0).to_numpy())
+        model.cover = pa.Table.from_pandas(first_terms[COVER_COLUMNS], preserve_index=False)
+        model.wmi = first_terms["CHASSIS_NO"].str[:3].to_numpy().astype("S3")
+        model.terms_per_vehicle = _pmf(policies.groupby("CHASSIS_NO").size().to_numpy())
+        model.first_issue_days = first_terms["issue"].to_numpy()
+        model.issue_to_eff_days = (policies["eff"] - policies["issue"]).to_numpy()
+        model.term_days = (policies["expiry"] - policies["eff"]).to_numpy()
+        renewal = policies["CHASSIS_NO"].eq(policies["CHASSIS_NO"].shift())
+        gaps = (policies["eff"] - policies["expiry"].shift()).to_numpy()[renewal.to_numpy()]
+        model.renewal_gap_days = gaps.astype(np.int64) if len(gaps) else np.zeros(1, dtype=np.int64)
+
+        # Claims: facts and amounts resampled per row, dates as offsets from the policy term
+        terms = policies.drop_duplicates("POLICY_NO").set_index("POLICY_NO")
+        claims = claims[claims["policy_no"].isin(terms.index)]
+        term = terms.loc[claims["policy_no"]]
+        claim_day = _days(claims["claim_date"])
+        model.claims_per_policy = _pmf(claims.groupby("policy_no").size().to_numpy())
+        model.claim_facts = pa.Table.from_pandas(claims[CLAIM_FACT_COLUMNS], preserve_index=False)
+        model.claim_amounts = claims[AMOUNT_COLUMNS].astype(np.int64).to_numpy()
+        model.term_position = (claim_day - term["eff"].to_numpy()) / np.maximum(term["expiry"].to_numpy() - term["eff"].to_numpy(), 1)
+        model.incident_days = _days(claims["date"]) - claim_day
+        licence = pd.to_datetime(claims["license_issue_date"], format="%d-%m-%Y", errors="coerce")
+        # Missing licence dates stay missing (NaN offset)
+        model.licence_days = np.where(licence.isna(), np.nan, (licence.to_numpy().astype("datetime64[D]").astype(np.int64) - claim_day))
+
+        model.image_names = _pmf(metadata["image_name"].to_numpy())
+        model.image_ids = metadata.drop_duplicates("image_name").set_index("image_name")["image_id"]
+
+        model._fit_telematics(telematics, policies["CHASSIS_NO"].nunique())
+        model.vehicles_per_customer_mean = _expectation(model.vehicles_per_customer)
+        model.claims_per_customer = (model.vehicles_per_customer_mean * _expectation(model.terms_per_vehicle)
+                                     * _expectation(model.claims_per_policy))
+        model.telematics_rows_per_customer = (model.vehicles_per_customer_mean * model.tracked_fraction
+                                              * _expectation(model.trips_per_vehicle) * _expectation(model.trip_length))
+        model.fit_seconds = time.perf_counter() - started
+        return model
+
+    def _fit_telematics(self, telematics, vehicles):
+        seconds = pd.to_datetime(telematics["event_timestamp"], format="%Y-%m-%d %H:%M:%S").to_numpy()
+        frame = pd.DataFrame({
+            "chassis": telematics["chassis_no"].to_numpy(), "t": seconds.astype("datetime64[s]").astype(np.int64),
+            "lat": telematics["latitude"].to_numpy(), "lon": telematics["longitude"].to_numpy(),
+            "speed": telematics["speed"].to_numpy(),
+        }).drop_duplicates(["chassis", "t"]).sort_values(["chassis", "t"], kind="stable")
+        gap = frame["t"].diff().to_numpy()
+        same_vehicle = frame["chassis"].eq(frame["chassis"].shift()).to_numpy()
+        # Readings of one trip are one interval apart; anything else starts a new trip
+        self.reading_interval = int(pd.Series(gap[same_vehicle]).mode().iloc[0]) if same_vehicle.any() else 60
+        starts = ~same_vehicle | (gap != self.reading_interval)
+        trip = np.cumsum(starts) - 1
+        minute = np.arange(len(frame)) - np.flatnonzero(starts)[trip]
+
+        self.tracked_fraction = min(1.0, frame["chassis"].nunique() / max(vehicles, 1))
+        self.trips_per_vehicle = _pmf(pd.Series(trip).groupby(frame["chassis"].to_numpy()).nunique().to_numpy())
+        self.trip_length = _pmf(np.bincount(trip))
+        start_t = frame["t"].to_numpy()[starts]
+        self.trip_days = (int(start_t.min() // 86400), int(start_t.max() // 86400))
+        self.trip_start_seconds = start_t % 86400
+        self.trip_start_positions = frame[["lat", "lon"]].to_numpy()[starts]
+        within = ~starts
+        self.position_steps = np.column_stack([
+            np.diff(frame["lat"].to_numpy(), prepend=0)[within], np.diff(frame["lon"].to_numpy(), prepend=0)[within],
+        ])
+        self.bounds = (frame["lat"].min(), frame["lat"].max(), frame["lon"].min(), frame["lon"].max())
+        # Speed quantiles for each minute of a trip (longer trips reuse the profile cyclically)
+        speed = frame["speed"].to_numpy()
+        levels = np.linspace(0, 1, SPEED_QUANTILES)
+        self.speed_profile = np.array([np.quantile(speed[minute == m], levels) for m in range(minute.max() + 1)])
+
+
+# --- TEXT FORMATTING ---
+def _day_text(days, day_first=False):
+    """
+    Int64 epoch days -> "YYYY-MM-DD" (or "DD-MM-YYYY") text, formatting each
+    distinct day once; NaN -> "null".
+    """
+    days = np.asarray(days)
+    missing = np.isnan(days) if days.dtype.kind == "f" else np.zeros(len(days), dtype=bool)
+    if missing.all():
+        return pa.array(["null"] * len(days), pa.string())
+    if missing.any():
+        days = np.where(missing, np.nanmin(days), days)
+    # Distinct days, not a dense range: the source has placeholder dates centuries out
+    distinct, position = np.unique(days.astype(np.int64, copy=False), return_inverse=True)
+    calendar = np.datetime_as_string(distinct.astype("datetime64[D]")).astype("S10")
+    if day_first:
+        calendar = np.ascontiguousarray(calendar.view("S1").reshape(-1, 10)[:, [8, 9, 7, 5, 6, 4, 0, 1, 2, 3]]).view("S10").ravel()
+    text = pc.take(pa.array(calendar.astype(str)), pa.array(position))
+    return pc.if_else(pa.array(missing), "null", text) if missing.any() else text
+
+
+@functools.lru_cache(maxsize=1)
+def _clock_text():
+    """"HH:MM:SS" for every second of the day."""
+    return pa.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)])
+
+
+def _timestamp_text(seconds):
+    """Int64 epoch seconds -> "YYYY-MM-DD HH:MM:SS", assembled from per-day and per-second lookups."""
+    days, clock = np.divmod(seconds, 86400)
+    return pc.binary_join_element_wise(_day_text(days), pc.take(_clock_text(), pa.array(clock)), " ")
+
+
+def _number_text(values, suffix=""):
+    text = pc.cast(pa.array(values), pa.string())
+    return pc.binary_join_element_wise(text, suffix, "") if suffix else text
+
+
+def _chassis_numbers(rng, wmi, serials):
+    """VIN-shaped chassis numbers, unique per serial."""
+    powers = len(VIN_ALPHABET) ** np.arange(VIN_SERIAL_LENGTH - 1, -1, -1, dtype=np.int64)
+    digits = np.concatenate([rng.integers(0, len(VIN_ALPHABET), (len(serials), 2)),
+                             (serials[:, None] // powers) % len(VIN_ALPHABET)], axis=1)
+    text = np.ascontiguousarray(VIN_ALPHABET[digits]).view(f"S{VIN_SERIAL_LENGTH + 2}").ravel()
+    return np.char.add(wmi, text).astype(str)
+
+
+def _segment_offsets(lengths):
+    """Position of every element within its segment, for segments of the given lengths."""
+    return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+# --- CHUNK GENERATION (runs in the worker processes) ---
+def generate_chunk(model, chunk, first_customer, customers, seed=0, telematics_scale=1.0):
+    """
+    Generates `customers` customers (global positions from `first_customer`) and
+    everything hanging off them. Returns {table: Arrow table}; the same
+    arguments always produce the same tables.
+    """
+    rng = np.random.default_rng([seed, chunk])
+    tables = {}
+
+    customer_ids = CUSTOMER_ID_BASE + first_customer + np.arange(customers, dtype=np.int64)
+    demographics = model.demographics.take(rng.integers(0, model.demographics.num_rows, customers))
+    names = pc.binary_join_element_wise(
+        pa.array(_draw(rng, model.last_names, customers)), pa.array(_draw(rng, model.first_names, customers)), ", ")
+    tables["customers"] = pa.table({
+        "customer_id": _number_text(customer_ids, ".0"),
+        **{name: demographics[name] for name in DEMOGRAPHIC_COLUMNS},
+        "name": names,
+    })
+
+    # Vehicles, each with a resampled cover and 1+ consecutive policy terms
+    vehicles_of = _draw(rng, model.vehicles_per_customer, customers)
+    owner = np.repeat(customer_ids, vehicles_of)
+    vehicles = len(owner)
+    cover_row = rng.integers(0, model.cover.num_rows, vehicles)
+    chassis = pa.array(_chassis_numbers(rng, model.wmi[cover_row], chunk * ID_STRIDE + np.arange(vehicles, dtype=np.int64)))
+
+    terms = _draw(rng, model.terms_per_vehicle, vehicles)
+    vehicle = np.repeat(np.arange(vehicles), terms)
+    policies = len(vehicle)
+    term_no = _segment_offsets(terms)
+    issue_to_eff = rng.choice(model.issue_to_eff_days, policies)
+    term_days = rng.choice(model.term_days, policies)
+    first_issue = rng.choice(model.first_issue_days, vehicles) + rng.integers(-ISSUE_JITTER_DAYS, ISSUE_JITTER_DAYS + 1, vehicles)
+    # Each renewal starts a sampled gap after the previous term's expiry
+    step = np.where(term_no > 0, np.roll(term_days, 1) + rng.choice(model.renewal_gap_days, policies), 0)
+    elapsed = np.cumsum(step)
+    eff = (first_issue + issue_to_eff[term_no == 0])[vehicle] + elapsed - elapsed[np.repeat(np.cumsum(terms) - terms, terms)]
+    expiry = eff + term_days
+    policy_nos = _number_text(POLICY_NO_BASE + chunk * ID_STRIDE + np.arange(policies, dtype=np.int64))
+    cover = model.cover.take(cover_row[vehicle])
+    tables["policies"] = pa.table({
+        "POLICY_NO": policy_nos,
+        "CUST_ID": _number_text(owner[vehicle], ".0"),
+        "POLICYTYPE": cover["POLICYTYPE"],
+        "POL_ISSUE_DATE": _day_text(eff - issue_to_eff),
+        "POL_EFF_DATE": _day_text(eff),
+        "POL_EXPIRY_DATE": _day_text(expiry),
+        **{name: cover[name] for name in ["MAKE", "MODEL", "MODEL_YEAR"]},
+        "CHASSIS_NO": pc.take(chassis, pa.array(vehicle)),
+        **{name: cover[name] for name in ["USE_OF_VEHICLE", "PRODUCT", "SUM_INSURED", "PREMIUM", "DEDUCTABLE"]},
+    })
+
+    # Claims: resampled facts placed in their policy's term
+    policy = np.repeat(np.arange(policies), _draw(rng, model.claims_per_policy, policies))
+    claims = len(policy)
+    fact_row = rng.integers(0, model.claim_facts.num_rows, claims)
+    claim_day = eff[policy] + np.floor(model.term_position[fact_row] * term_days[policy]).astype(np.int64)
+    amounts = np.round(model.claim_amounts[fact_row] * rng.lognormal(0, AMOUNT_JITTER, (claims, 1)) / 10).astype(np.int64) * 10
+    claim_nos = pa.array(random_claim_numbers(claims, [seed, chunk]), pa.string())
+    facts = model.claim_facts.take(fact_row)
+    tables["claims"] = pa.table({
+        "claim_no": claim_nos,
+        "policy_no": pc.take(policy_nos, pa.array(policy)),
+        "claim_date": _day_text(claim_day),
+        "months_as_customer": facts["months_as_customer"],
+        **{name: _number_text(amounts[:, i]) for i, name in enumerate(AMOUNT_COLUMNS)},
+        "total": _number_text(amounts.sum(axis=1)),
+        **{name: facts[name] for name in ["collision_type", "number_of_vehicles_involved", "age", "insured_relationship"]},
+        "license_issue_date": _day_text(claim_day + model.licence_days[fact_row], day_first=True),
+        "date": _day_text(claim_day + model.incident_days[fact_row]),
+        **{name: facts[name] for name in ["hour", "type", "severity", "number_of_witnesses", "suspicious_activity"]},
+    })
+
+    image_names = _draw(rng, model.image_names, claims)
+    tables["image_metadata"] = pa.table({
+        "image_name": pa.array(image_names, pa.string()),
+        "image_id": pa.array(model.image_ids.reindex(image_names).to_numpy(), pa.string()),
+        "claim_no": claim_nos,
+        "chassis_no": pc.take(chassis, pa.array(vehicle[policy])),
+    })
+
+    tables["telematics"] = _generate_trips(model, rng, chassis, telematics_scale)
+    return tables
+
+
+def _generate_trips(model, rng, chassis, scale):
+    """Telematics readings for a sample of the vehicles; `scale` multiplies the expected row count."""
+    tracked = np.flatnonzero(rng.random(len(chassis)) < model.tracked_fraction * min(scale, 1.0))
+    trips_of = _draw(rng, model.trips_per_vehicle, len(tracked)).astype(np.float64)
+    if scale > 1:
+        # More trips per vehicle, stochastically rounded so the mean scales exactly
+        trips_of *= scale
+        trips_of = np.floor(trips_of + rng.random(len(trips_of)))
+    trips_of = trips_of.astype(np.int64)
+    trip_vehicle = np.repeat(tracked, trips_of)
+    trips = len(trip_vehicle)
+    lengths = _draw(rng, model.trip_length, trips)
+    first_day, last_day = model.trip_days
+    trip_start = (rng.integers(first_day, last_day + 1, trips) * 86400
+                  + rng.choice(model.trip_start_seconds, trips))
+    start_position = model.trip_start_positions[rng.integers(0, len(model.trip_start_positions), trips)]
+
+    trip = np.repeat(np.arange(trips), lengths)
+    minute = _segment_offsets(lengths)
+    seconds = trip_start[trip] + minute * model.reading_interval
+    # Speed: inverse-CDF sample of this minute's distribution
+    profile = model.speed_profile
+    level = rng.random(len(trip)) * (profile.shape[1] - 1)
+    low = level.astype(np.int64)
+    row = minute % len(profile)
+    speed = profile[row, low] + (profile[row, np.minimum(low + 1, profile.shape[1] - 1)] - profile[row, low]) * (level - low)
+    # Position: a walk of resampled steps from the trip's start
+    steps = model.position_steps[rng.integers(0, len(model.position_steps), len(trip))]
+    steps[minute == 0] = 0
+    walked = np.cumsum(steps, axis=0)
+    walked -= walked[np.repeat(np.cumsum(lengths) - lengths, lengths)]
+    lat_min, lat_max, lon_min, lon_max = model.bounds
+    position = start_position[trip]
+    position += walked
+    return pa.table({
+        "chassis_no": pc.take(chassis, pa.array(trip_vehicle[trip])),
+        "latitude": np.clip(position[:, 0], lat_min, lat_max),
+        "longitude": np.clip(position[:, 1], lon_min, lon_max),
+        "event_timestamp": _timestamp_text(seconds),
+        "speed": speed,
+    })
+
+
+def _write_atomic(write, path):
+    """Writes through a temp file + rename so an interrupted run leaves no partial part."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _part_name(chunk, extension):
+    return f"part-{chunk:05d}.{extension}"
+
+
+_WORKER = {}
+
+
+def _init_worker(model, out_dir, seed, telematics_scale, csv):
+    _WORKER.update(model=model, out_dir=out_dir, seed=seed, telematics_scale=telematics_scale, csv=csv)
+
+
+def _generate_part(task):
+    """Generates one chunk and writes its parts; returns {table: rows}."""
+    chunk, first_customer, customers = task
+    tables = generate_chunk(_WORKER["model"], chunk, first_customer, customers, _WORKER["seed"], _WORKER["telematics_scale"])
+    out_dir = _WORKER["out_dir"]
+    for name, table in tables.items():
+        part_dir, csv_path = TABLE_PATHS[name]
+        _write_atomic(lambda path: pq.write_table(table, path), os.path.join(out_dir, part_dir, _part_name(chunk, "parquet")))
+        if _WORKER["csv"] and csv_path:
+            options = pa_csv.WriteOptions(include_header=False, quoting_style="needed")
+            _write_atomic(lambda path: pa_csv.write_csv(table, path, options),
+                          os.path.join(out_dir, ".csv_parts", name, _part_name(chunk, "csv")))
+    return {name: table.num_rows for name, table in tables.items()}
+
+
+def _join_csv_parts(out_dir, chunks):
+    """Concatenates the per-chunk CSV parts of each table behind one header, in chunk order."""
+    for name, (_, csv_path) in TABLE_PATHS.items():
+        if csv_path is None:
+            continue
+
+        def write(path, name=name):
+            with open(path, "wb") as out:
+                out.write((",".join(TABLE_COLUMNS[name]) + "\n").encode())
+                for chunk in range(chunks):
+                    with open(os.path.join(out_dir, ".csv_parts", name, _part_name(chunk, "csv")), "rb") as part:
+                        shutil.copyfileobj(part, out, 2**20)
+        _write_atomic(write, os.path.join(out_dir, csv_path))
+    shutil.rmtree(os.path.join(out_dir, ".csv_parts"))
+
+
+def generate(out_dir, claims, telematics_rows=None, workers=None, seed=0, csv=False, source_dir=DATA_DIR,
+             model=None, progress=None):
+    """
+    Writes a synthetic dataset of about `claims` claims (and `telematics_rows`
+    readings; default: as many per vehicle as the source has) to `out_dir`.
+    Returns {table: rows written}.
+    """
+    model = model or DatasetModel.fit(source_dir)
+    customers = max(1, round(claims / model.claims_per_customer))
+    scale = 1.0 if telematics_rows is None else telematics_rows / (customers * model.telematics_rows_per_customer)
+    per_chunk = max(1, int(min(CLAIMS_PER_CHUNK / model.claims_per_customer,
+                               TELEMATICS_ROWS_PER_CHUNK / max(model.telematics_rows_per_customer * scale, 1e-9))))
+    tasks = [(chunk, first, min(per_chunk, customers - first))
+             for chunk, first in enumerate(range(0, customers, per_chunk))]
+
+    totals = dict.fromkeys(TABLE_PATHS, 0)
+    # Spawned, not forked: workers start from the imports and the pickled model
+    # rather than inheriting the fitting process's peak memory
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, context, _init_worker, (model, out_dir, seed, scale, csv)) as pool:
+        for done, counts in enumerate(pool.map(_generate_part, tasks), 1):
+            for name, rows in counts.items():
+                totals[name] += rows
+            if progress:
+                progress(done, len(tasks), totals)
+    if csv:
+        _join_csv_parts(out_dir, len(tasks))
+    link_media(out_dir, source_dir)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out_dir")
+    parser.add_argument("--claims", type=int, default=1_000_000)
+    parser.add_argument("--telematics-rows", type=int, help="default: the source's readings per vehicle")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", action="store_true", help="also write the CSV files the apps read")
+    parser.add_argument("--source-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    model = DatasetModel.fit(args.source_dir)
+    print(f"Fitted on {args.source_dir} in {model.fit_seconds:.1f}s: {model.claims_per_customer:.2f} claims and "
+          f"{model.telematics_rows_per_customer:.0f} telematics rows per customer")
+    started = time.perf_counter()
+
+    def progress(done, chunks, totals):
+        elapsed = time.perf_counter() - started
+        print(f"\r{done}/{chunks} chunks, {totals['claims']:,} claims, {totals['telematics']:,} telematics rows "
+              f"in {elapsed:.0f}s", end="", file=sys.stderr, flush=True)
+
+    totals = generate(args.out_dir, args.claims, args.telematics_rows, args.workers, args.seed, args.csv,
+                      args.source_dir, model, progress)
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+    print(f"Wrote {args.out_dir} in {elapsed:.1f}s with {args.workers} workers: "
+          + ", ".join(f"{rows:,} {name}" for name, rows in totals.items()))
+    print(f"  {sum(totals.values()) / elapsed:,.0f} rows/s; peak worker RSS "
+          f"{resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 2**10:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Headless load test of the claim flows, driven through Streamlit's AppTest:
+
+  admin   list -> detail -> approve/reject -> back to the list
+  portal  form -> upload -> submit -> results (polled until the analysis is done)
+          -> submit another
+
+The shipped dataset is first tiled `--scale` times (claims, policies,
+customers, image metadata and telematics, joins intact). Each flow then runs
+against that data in `--processes` server processes (replicas) sharing a fresh
+cache directory. In each, one session renders first (the cold start: loading
+every shared resource), then its share of `--sessions` sessions each run the
+flow `--iterations` times.
+
+AppTest swaps process-global runtime state for each run, so a process cannot
+execute two of them at once. Sessions in one process therefore interleave one
+rerun at a time (as on a single-core server) while sharing its cached
+resources and background threads; parallelism comes from the processes.
+
+Reported per flow: throughput, latency percentiles per step, cold start and
+peak RSS. The results are written as JSON and compared with a baseline file of
+the same shape; `--update-baseline` makes this run the new baseline.
+
+    python -m benchmarks.load_test [--scale 2] [--sessions 8] [--iterations 3] [--processes 1]
+        [--flows admin portal] [--baseline PATH] [--update-baseline]
+"""
+import argparse
+import glob
+import heapq
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import write_scaled_dataset
+from claims_store import CACHE_DIR, DATA_DIR
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_DIR, "benchmarks", "load_test_baseline.json")
+RESULTS_PATH = os.path.join(CACHE_DIR, "load_test_latest.json")
+# A metric this much worse than the baseline is reported as a regression
+REGRESSION_TOLERANCE = 0.25
+# Seconds between result-page polls, and the longest a submitted analysis may take
+RESULTS_POLL_SECONDS = 0.25
+RESULTS_TIMEOUT_SECONDS = 120
+APP_TIMEOUT_SECONDS = 600
+PERCENTILES = (50, 95, 99)
+
+
+# --- SESSIONS AND FLOWS (run inside the worker process) ---
+class Session:
+    """One simulated browser session: an AppTest of the app plus its step timings."""
+
+    def __init__(self, script, timings):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(os.path.join(REPO_DIR, script), default_timeout=APP_TIMEOUT_SECONDS)
+        self.timings = timings
+        self.started = False
+
+    def step(self, name, run):
+        """Times `run()` (a rerun of the app) as step `name`; fails on an app exception."""
+        started = time.perf_counter()
+        run()
+        self.timings[name].append(time.perf_counter() - started)
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].value}")
+
+    def button(self, text):
+        return next(b for b in self.at.button if text in b.label)
+
+    def start(self, first_step):
+        if not self.started:
+            self.step(first_step, self.at.run)
+            self.started = True
+
+
+# Flows are generators: each `yield` hands the process to the next session,
+# optionally with the seconds this one waits before its next rerun.
+def admin_flow(session, rng, context):
+    session.start("list")
+    yield
+    views = [b for b in session.at.button if b.label.startswith("👁")]
+    if not views:
+        raise RuntimeError(f"no claims listed: {[e.value for e in list(session.at.info) + list(session.at.error)]}")
+    session.step("detail", views[rng.integers(len(views))].click().run)
+    yield
+    session.step("decision", session.button("Approve" if rng.random() < 0.7 else "Reject").click().run)
+    yield
+    session.step("back_to_list", session.button("Back to List").click().run)
+    yield
+
+
+def portal_flow(session, rng, context):
+    at = session.at
+    session.start("form")
+    yield
+    name, content = context["images"][rng.integers(len(context["images"]))]
+    session.step("upload", at.file_uploader[0].set_value((name, content, "image/png")).run)
+    yield
+    next(t for t in at.text_input if t.label.startswith("Policy Number")).set_value(
+        context["policies"][rng.integers(len(context["policies"]))])
+    next(t for t in at.text_input if t.label.startswith("Claim Amount")).set_value(str(int(rng.integers(500, 40000))))
+    submitted = time.perf_counter()
+    session.step("submit", session.button("Submit Claim").click().run)
+    # The results page polls the analysis job; a browser would rerun on its fragment timer
+    while not any(b.label == "Submit Another Claim" for b in at.button):
+        if time.perf_counter() - submitted > RESULTS_TIMEOUT_SECONDS:
+            raise RuntimeError("analysis did not finish")
+        yield RESULTS_POLL_SECONDS
+        session.step("results_poll", at.run)
+    session.timings["submit_to_results"].append(time.perf_counter() - submitted)
+    session.step("submit_another", session.button("Submit Another Claim").click().run)
+    yield
+
+
+FLOWS = {
+    "admin": ("admin_dashboard.py", admin_flow),
+    "portal": ("customer_portal.py", portal_flow),
+}
+
+
+def flow_context(flow):
+    if flow != "portal":
+        return {}
+    import pandas as pd
+    policies = pd.read_csv(os.path.join(DATA_DIR, "sql_server", "policies.csv"), usecols=["POLICY_NO"], dtype=str)
+    images = [(os.path.basename(path), open(path, "rb").read())
+              for path in sorted(glob.glob(os.path.join(DATA_DIR, "training_imgs", "*.png")))[:8]]
+    return {"policies": policies["POLICY_NO"].dropna().to_numpy(), "images": images}
+
+
+def summarize(samples):
+    samples = np.asarray(samples)
+    return {
+        "count": len(samples),
+        "mean": float(samples.mean()),
+        **{f"p{p}": float(np.percentile(samples, p)) for p in PERCENTILES},
+        "max": float(samples.max()),
+    }
+
+
+def peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_worker(flow, sessions, iterations, seed):
+    """Runs `sessions` sessions of one flow in this process; returns raw samples and totals."""
+    script, run_flow = FLOWS[flow]
+    context = flow_context(flow)
+
+    started = time.perf_counter()
+    for _ in run_flow(Session(script, defaultdict(list)), np.random.default_rng(seed), context):
+        pass
+    cold_start = time.perf_counter() - started
+    rss_after_cold_start = peak_rss_bytes()
+
+    timings, errors = defaultdict(list), []
+    completed = itertools.count()
+
+    def session_loop(i):
+        session = Session(script, timings)
+        rng = np.random.default_rng(seed + 1 + i)
+        for _ in range(iterations):
+            try:
+                yield from run_flow(session, rng, context)
+                next(completed)
+            except Exception as error:  # count it and carry on with a fresh session
+                errors.append(f"{type(error).__name__}: {error}")
+                session = Session(script, timings)
+
+    # Round-robin over the sessions ready to rerun; (ready at, arrival order, session)
+    order = itertools.count()
+    ready = [(0.0, next(order), session_loop(i)) for i in range(sessions)]
+    started = time.perf_counter()
+    while ready:
+        at, _, loop = heapq.heappop(ready)
+        wait = at - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            delay = next(loop) or 0.0
+        except StopIteration:
+            continue
+        heapq.heappush(ready, (time.perf_counter() + delay, next(order), loop))
+    wall = time.perf_counter() - started
+
+    return {
+        "sessions": sessions,
+        "cold_start_seconds": cold_start,
+        "wall_seconds": wall,
+        "flows_completed": next(completed),
+        "errors": errors,
+        "samples": dict(timings),
+        "rss_after_cold_start_bytes": rss_after_cold_start,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def merge_workers(workers, iterations):
+    """One flow's results from its worker processes."""
+    steps = defaultdict(list)
+    for worker in workers:
+        for name, samples in worker["samples"].items():
+            steps[name].extend(samples)
+    wall = max(worker["wall_seconds"] for worker in workers)
+    flows = sum(worker["flows_completed"] for worker in workers)
+    errors = [error for worker in workers for error in worker["errors"]]
+    reruns = sum(len(samples) for name, samples in steps.items() if name != "submit_to_results")
+    return {
+        "processes": len(workers),
+        "sessions": sum(worker["sessions"] for worker in workers),
+        "iterations": iterations,
+        "cold_start_seconds": max(worker["cold_start_seconds"] for worker in workers),
+        "wall_seconds": wall,
+        "flows_completed": flows,
+        "flows_per_second": flows / wall,
+        "reruns_per_second": reruns / wall,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "steps": {name: summarize(samples) for name, samples in sorted(steps.items())},
+        "rss_after_cold_start_bytes": max(worker["rss_after_cold_start_bytes"] for worker in workers),
+        "peak_rss_bytes": max(worker["peak_rss_bytes"] for worker in workers),
+        "total_peak_rss_bytes": sum(worker["peak_rss_bytes"] for worker in workers),
+    }
+
+
+# --- DRIVER ---
+def run_flow(flow, args, data_dir, cache_dir):
+    """Runs the flow in `args.processes` worker processes at once and merges their results."""
+    env = dict(os.environ, SMART_CLAIMS_DATA_DIR=data_dir, SMART_CLAIMS_CACHE_DIR=cache_dir)
+    shares = [len(share) for share in np.array_split(np.arange(args.sessions), args.processes)]
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_test", "--worker", flow, "--sessions", str(share),
+             "--iterations", str(args.iterations), "--seed", str(args.seed + 1000 * i)],
+            cwd=REPO_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for i, share in enumerate(shares)
+    ]
+    results = []
+    for worker in workers:
+        stdout, stderr = worker.communicate()
+        if worker.returncode != 0:
+            raise RuntimeError(f"{flow} worker failed:\n{stderr[-4000:]}")
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+    return merge_workers(results, args.iterations)
+
+
+def regressions(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """[(metric, baseline value, current value, relative change)] for metrics worse by more than `tolerance`."""
+    found = []
+
+    def check(metric, old, new, higher_is_better=False):
+        if old is None or new is None or old <= 0:
+            return
+        change = new / old - 1
+        if (-change if higher_is_better else change) > tolerance:
+            found.append((metric, old, new, change))
+
+    for flow, current in results["flows"].items():
+        previous = baseline.get("flows", {}).get(flow)
+        if previous is None:
+            continue
+        check(f"{flow}.flows_per_second", previous["flows_per_second"], current["flows_per_second"], True)
+        check(f"{flow}.cold_start_seconds", previous["cold_start_seconds"], current["cold_start_seconds"])
+        check(f"{flow}.peak_rss_bytes", previous["peak_rss_bytes"], current["peak_rss_bytes"])
+        for step, stats in current["steps"].items():
+            old = previous["steps"].get(step)
+            for p in PERCENTILES:
+                check(f"{flow}.{step}.p{p}", old and old[f"p{p}"], stats[f"p{p}"])
+    return found
+
+
+def print_report(results):
+    for flow, r in results["flows"].items():
+        print(f"{flow}: {r['processes']} processes, {r['sessions']} sessions x {r['iterations']} flows -> "
+              f"{r['flows_completed']} flows in "
+              f"{r['wall_seconds']:.1f}s ({r['flows_per_second']:.2f} flows/s, {r['reruns_per_second']:.1f} reruns/s), "
+              f"{r['errors']} errors")
+        print(f"  cold start {r['cold_start_seconds']:.1f}s, RSS {r['rss_after_cold_start_bytes'] / 2**20:.0f} MB after it, "
+              f"peak {r['peak_rss_bytes'] / 2**20:.0f} MB per process ({r['total_peak_rss_bytes'] / 2**20:.0f} MB in all)")
+        for step, s in r["steps"].items():
+            print(f"  {step:18} n={s['count']:4}  " + "  ".join(f"p{p} {s[f'p{p}'] * 1000:8.1f} ms" for p in PERCENTILES))
+        for error in r["error_samples"]:
+            print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=2, help="tiling factor for the shipped dataset")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions per flow")
+    parser.add_argument("--iterations", type=int, default=3, help="flows per session")
+    parser.add_argument("--processes", type=int, default=1, help="server processes per flow")
+    parser.add_argument("--flows", nargs="+", choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="use an already generated dataset instead of a temporary one")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--worker", choices=list(FLOWS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.sessions, args.iterations, args.seed)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or os.path.join(tmp, "data")
+        started = time.perf_counter()
+        dataset = None if args.data_dir else write_scaled_dataset(data_dir, args.scale, args.seed)
+        if dataset:
+            print(f"Dataset x{args.scale} in {time.perf_counter() - started:.1f}s: "
+                  + ", ".join(f"{count:,} {name}" for name, count in dataset.items()))
+        results = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "config": {"scale": args.scale, "sessions": args.sessions, "iterations": args.iterations,
+                       "processes": args.processes, "seed": args.seed},
+            "dataset": dataset,
+            "flows": {flow: run_flow(flow, args, data_dir, os.path.join(tmp, f"cache-{flow}")) for flow in args.flows},
+        }
+    print_report(results)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as out:
+        json.dump(results, out, indent=2)
+    print(f"Results written to {args.output}")
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print(f"Baseline {args.baseline} was run with {baseline.get('config')}; comparing anyway")
+        found = regressions(results, baseline)
+        print(f"Against baseline from {baseline.get('created')}: " + (f"{len(found)} regressions" if found else "no regressions"))
+        for metric, old, new, change in found:
+            print(f"  {metric}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Synthetic scale-ups of the shipped dataset for benchmarks: the claims table is
+tiled `factor` times with fresh claim numbers, policies and customers are kept.
+`write_scaled_dataset` instead tiles every table, keeping the joins intact, into
+a directory the apps can run on (via SMART_CLAIMS_DATA_DIR). For volumes beyond
+a few copies see benchmarks.datagen, which generates new rows instead.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from claims_store import DATA_DIR, ClaimsStore
+
+
+def random_claim_numbers(n, seed=0):
+    """UUID-shaped lowercase hex claim numbers, generated vectorized."""
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(0, 16, size=(n, 32), dtype=np.uint8)
+    hex_digits = np.frombuffer(b"0123456789abcdef", dtype="S1")[raw].view("S32").ravel().astype(str)
+    s = pd.Series(hex_digits)
+    return (s.str[:8] + "-" + s.str[8:12] + "-" + s.str[12:16] + "-" + s.str[16:20] + "-" + s.str[20:]).to_numpy(dtype=object)
+
+
+def scale_claims(claims, target_rows, seed=0):
+    """Tiles the claims table up to `target_rows` rows with unique claim numbers."""
+    factor = -(-target_rows // len(claims))
+    scaled = pd.concat([claims] * factor, ignore_index=True).iloc[:target_rows].copy()
+    scaled["claim_no"] = random_claim_numbers(len(scaled), seed)
+    # Spread claim dates so keyset pages are not all ties
+    rng = np.random.default_rng(seed + 1)
+    scaled["claim_date"] = scaled["claim_date"] + pd.to_timedelta(rng.integers(-180, 180, len(scaled)), unit="D")
+    return scaled
+
+
+def scale_store(store, target_rows, seed=0):
+    """Returns a new ClaimsStore whose claims table has `target_rows` rows."""
+    return ClaimsStore(scale_claims(store.claims, target_rows, seed), store.policies, store.customers)
+
+
+def synthetic_policy_terms(n_policies, seed=0):
+    """
+    Policy terms for a synthetic fleet: each vehicle (an int64 chassis id) holds
+    1-4 consecutive roughly yearly policies, sometimes with a lapse before a
+    renewal and sometimes overlapping the previous term.
+    Returns (chassis ids, effective dates, expiry dates) in shuffled order.
+    """
+    rng = np.random.default_rng(seed)
+    terms = rng.choice([1, 2, 3, 4], size=n_policies, p=[0.7, 0.2, 0.07, 0.03])
+    terms = terms[: np.searchsorted(np.cumsum(terms), n_policies) + 1]
+    terms[-1] -= terms.sum() - n_policies
+    chassis = np.repeat(np.arange(len(terms), dtype=np.int64), terms)
+    first = np.datetime64("2014-01-01") + rng.integers(0, 3 * 365, len(terms)).astype("timedelta64[D]")
+    # Term number within the vehicle: 0, 1, ... (offset from the vehicle's first policy)
+    term = np.arange(n_policies) - np.repeat(np.cumsum(terms) - terms, terms)
+    lapse = rng.integers(0, 60, n_policies) * (rng.random(n_policies) < 0.2)
+    eff = np.repeat(first, terms) + (term * 365 + lapse).astype("timedelta64[D]")
+    expiry = eff + rng.integers(330, 400, n_policies).astype("timedelta64[D]")
+    shuffle = rng.permutation(n_policies)
+    return chassis[shuffle], eff[shuffle], expiry[shuffle]
+
+
+def _offset_ids(values, copy, offset, fmt):
+    """Numeric id text shifted into the id range of tile `copy`; blanks stay blank."""
+    if copy == 0:
+        return values
+    numbers = pd.to_numeric(values, errors="coerce") + copy * offset
+    return numbers.map(lambda v: "" if pd.isna(v) else fmt.format(v))
+
+
+def _copy_chassis(chassis, copy):
+    return chassis if copy == 0 else chassis.where(chassis == "", chassis + f".{copy}")
+
+
+def write_scaled_dataset(out_dir, factor, seed=0, source_dir=DATA_DIR):
+    """
+    Writes the shipped dataset tiled `factor` times to `out_dir`, laid out like
+    data/. Every copy gets its own customer ids, policy numbers, chassis numbers
+    and claim numbers, and its claims, policies, image metadata and telematics
+    point at that copy's rows, so every join behaves as in the original. Images
+    and training data are linked, not copied. Returns the row count per table.
+    """
+    sql_dir = os.path.join(source_dir, "sql_server")
+    read = lambda name: pd.read_csv(os.path.join(sql_dir, name), dtype=str, keep_default_na=False)
+    claims, policies, customers = read("claims.csv"), read("policies.csv"), read("customers.csv")
+    metadata_path = os.path.join(source_dir, "claims", "metadata", "image_metadata.csv")
+    metadata = pd.read_csv(metadata_path, dtype=str, keep_default_na=False)
+    telematics = [pd.read_parquet(path) for path in sorted(glob.glob(os.path.join(source_dir, "telematics", "*.parquet")))]
+
+    customer_offset = int(pd.to_numeric(customers["customer_id"], errors="coerce").max()) + 1
+    policy_offset = int(pd.to_numeric(policies["POLICY_NO"], errors="coerce").max()) + 1
+    claim_nos = random_claim_numbers(len(claims) * factor, seed)
+    tiles = {"claims": [], "policies": [], "customers": [], "image_metadata": []}
+    for copy in range(factor):
+        new_claim_nos = claims["claim_no"] if copy == 0 else pd.Series(claim_nos[copy * len(claims):(copy + 1) * len(claims)])
+        renumber = dict(zip(claims["claim_no"], new_claim_nos))
+        tiles["customers"].append(customers.assign(
+            customer_id=_offset_ids(customers["customer_id"], copy, customer_offset, "{:.1f}")))
+        tiles["policies"].append(policies.assign(
+            POLICY_NO=_offset_ids(policies["POLICY_NO"], copy, policy_offset, "{:.0f}"),
+            CUST_ID=_offset_ids(policies["CUST_ID"], copy, customer_offset, "{:.1f}"),
+            CHASSIS_NO=_copy_chassis(policies["CHASSIS_NO"], copy)))
+        tiles["claims"].append(claims.assign(
+            claim_no=new_claim_nos.to_numpy(),
+            policy_no=_offset_ids(claims["policy_no"], copy, policy_offset, "{:.0f}")))
+        tiles["image_metadata"].append(metadata.assign(
+            claim_no=metadata["claim_no"].map(renumber).fillna(metadata["claim_no"]),
+            chassis_no=_copy_chassis(metadata["chassis_no"], copy)))
+
+    os.makedirs(os.path.join(out_dir, "sql_server"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "claims", "metadata"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "telematics"), exist_ok=True)
+    counts = {}
+    for name in ["claims", "policies", "customers"]:
+        table = pd.concat(tiles[name], ignore_index=True)
+        table.to_csv(os.path.join(out_dir, "sql_server", f"{name}.csv"), index=False)
+        counts[name] = len(table)
+    pd.concat(tiles["image_metadata"], ignore_index=True).to_csv(
+        os.path.join(out_dir, "claims", "metadata", "image_metadata.csv"), index=False)
+    counts["image_metadata"] = len(metadata) * factor
+    counts["telematics"] = 0
+    for part, frame in enumerate(telematics):
+        tiled = pd.concat([frame.assign(chassis_no=_copy_chassis(frame["chassis_no"], copy)) for copy in range(factor)],
+                          ignore_index=True)
+        tiled.to_parquet(os.path.join(out_dir, "telematics", f"part-{part:05d}.parquet"), index=False)
+        counts["telematics"] += len(tiled)
+    link_media(out_dir, source_dir)
+    return counts
+
+
+def link_media(out_dir, source_dir=DATA_DIR):
+    """Symlinks the evidence images and severity training images of `source_dir` into `out_dir`."""
+    for linked in [os.path.join("claims", "images"), "training_imgs"]:
+        target = os.path.join(out_dir, linked)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if not os.path.lexists(target):
+            os.symlink(os.path.abspath(os.path.join(source_dir, linked)), target)
@@ -0,0 +1,214 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from claims_store import CACHE_DIR
+
+JOBS_DB_PATH = os.path.join(CACHE_DIR, "claim_jobs.sqlite")
+
+# Job lifecycle
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# A running job whose worker has not renewed its lease for this long is re-queued
+LEASE_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    image BLOB,
+    result TEXT,
+    error TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker_id TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at);
+"""
+
+
+class JobQueue:
+    """
+    Persistent claim-analysis queue served by a bounded pool of worker threads.
+
+    Jobs live in SQLite, so a restart resumes queued work. `submit` only inserts a
+    row and wakes a worker, so the Streamlit script thread never waits on the
+    analysis itself; sessions poll `status` instead.
+
+    Several processes can share one queue: a claimed job records the claiming
+    queue's `worker_id` and a lease that a heartbeat thread renews. Only running
+    jobs whose lease expired (their process died) are re-queued, so a replica
+    starting up never takes over work a live process is still running.
+    """
+
+    def __init__(self, handler, db_path=JOBS_DB_PATH, workers=4, latency_window=1000, lease_seconds=LEASE_SECONDS):
+        self.handler = handler
+        self.db_path = db_path
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+        self._latencies = deque(maxlen=latency_window)
+
+        db = self._connect()
+        db.executescript(_SCHEMA)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("worker_id", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:  # queue created before leases
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self.requeue_expired()
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f"claim-job-{i}", daemon=True) for i in range(workers)
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="claim-job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _connect(self):
+        """One connection per thread; WAL lets readers poll while workers write."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    # --- PRODUCER SIDE ---
+    def submit(self, payload, image=None, job_id=None):
+        """Enqueues an analysis and returns its claim id immediately."""
+        job_id = job_id or str(uuid.uuid4())
+        self._connect().execute(
+            "INSERT INTO jobs (id, status, payload, image, submitted_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(payload, default=str), image, time.time()),
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def status(self, job_id):
+        """Returns the job as a dict (status, result, error, timings), or None."""
+        row = self._connect().execute(
+            "SELECT id, status, payload, result, error, submitted_at, started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        if job["status"] == QUEUED:
+            job["position"] = self._connect().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND submitted_at <= ?", (QUEUED, job["submitted_at"])
+            ).fetchone()[0]
+        return job
+
+    # --- WORKER SIDE ---
+    def _next_job(self):
+        """Atomically moves the oldest queued job to running under this queue's lease and returns it."""
+        # A single UPDATE ... RETURNING is atomic across threads and processes
+        now = time.time()
+        return self._connect().execute(
+            "UPDATE jobs SET status = ?, started_at = ?, worker_id = ?, heartbeat_at = ? WHERE id = "
+            "(SELECT id FROM jobs WHERE status = ? ORDER BY submitted_at LIMIT 1) "
+            "RETURNING id, payload, image",
+            (RUNNING, now, self.worker_id, now, QUEUED),
+        ).fetchone()
+
+    def requeue_expired(self):
+        """Re-queues running jobs whose lease expired (their process died); returns how many."""
+        return self._connect().execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, worker_id = NULL, heartbeat_at = NULL "
+            "WHERE status = ? AND COALESCE(heartbeat_at, 0) < ?",
+            (QUEUED, RUNNING, time.time() - self.lease_seconds),
+        ).rowcount
+
+    def _heartbeat(self):
+        """Renews the lease of this queue's running jobs, and recovers the jobs of dead processes."""
+        while not self._stopped.wait(self.lease_seconds / 3):
+            self._connect().execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND worker_id = ?",
+                (time.time(), RUNNING, self.worker_id),
+            )
+            if self.requeue_expired():
+                with self._wakeup:
+                    self._wakeup.notify_all()
+
+    def _work(self):
+        while not self._stopping:
+            job = self._next_job()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=1.0)
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        with self._wakeup:
+            self._busy += 1
+        started = time.monotonic()
+        try:
+            result = self.handler(job["id"], json.loads(job["payload"]), job["image"])
+            status, result, error = DONE, json.dumps(result, default=str), None
+        except Exception as exc:  # a failed analysis must not kill the worker
+            status, result, error = FAILED, None, f"{type(exc).__name__}: {exc}"
+        finished = time.time()
+        db = self._connect()
+        # A job whose lease was lost (e.g. the process stalled past it) now belongs to another worker
+        db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, image = NULL "
+            "WHERE id = ? AND worker_id = ?",
+            (status, result, error, finished, job["id"], self.worker_id),
+        )
+        submitted = db.execute("SELECT submitted_at FROM jobs WHERE id = ?", (job["id"],)).fetchone()[0]
+        with self._wakeup:
+            self._busy -= 1
+            self._busy_seconds += time.monotonic() - started
+            self._latencies.append(finished - submitted)
+
+    def close(self, timeout=5.0):
+        self._stopping = True
+        self._stopped.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    # --- OBSERVABILITY ---
+    def metrics(self):
+        """Queue depth, worker utilization and end-to-end latency percentiles."""
+        counts = dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        with self._wakeup:
+            busy, busy_seconds = self._busy, self._busy_seconds
+            latencies = np.array(self._latencies)
+        uptime = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "queue_depth": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "workers": self.workers,
+            "workers_busy": busy,
+            "utilization": busy_seconds / (uptime * self.workers),
+            "latency_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
@@ -0,0 +1,154 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Page sizes offered in the admin grid
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+
+# Filters applied to the grid; None means "no filter" for that field.
+ClaimFilter = namedtuple("ClaimFilter", ["search", "status", "severity", "checks"], defaults=[None, None, None, None])
+
+# One page of results. `cursor` is the keyset of the last row, used to fetch the next page.
+Page = namedtuple("Page", ["rows", "cursor", "has_more"])
+
+# Rows inspected per step when scanning forward for filtered matches
+_SCAN_CHUNK = 512
+
+
+class PrefixIndex:
+    """
+    Sorted copy of a string key column. All keys starting with a prefix form one
+    contiguous range, found with two binary searches.
+    """
+
+    def __init__(self, values):
+        values = pd.Series(np.asarray(values, dtype=object))
+        self._order = values.sort_values(kind="stable").index.to_numpy(dtype=np.int64)
+        self._keys = values.to_numpy()[self._order]
+
+    def rows(self, prefix):
+        """Returns the row positions of every key starting with `prefix`."""
+        lo = np.searchsorted(self._keys, prefix, "left")
+        hi = np.searchsorted(self._keys, prefix + "\U0010ffff", "left")
+        return self._order[lo:hi]
+
+
+class ClaimsGrid:
+    """
+    Search, filtering and keyset pagination for the admin claims grid.
+
+    Claims are listed newest first (claim_date desc, then claim_no) unless another
+    `sort_key` is given, e.g. RiskScores.sort_key for riskiest first. Each page is
+    addressed by the sort key of the previous page's last row, so fetching a page
+    costs a binary search plus work proportional to the page (or, for a search, to
+    the number of matching keys) rather than to the size of the table.
+    """
+
+    def __init__(self, store, sort_key=None):
+        self.store = store
+        claims = store.claims
+        if sort_key is None:
+            sort_key = -claims["claim_date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        keys = pd.DataFrame({
+            "key": np.asarray(sort_key, dtype=np.int64),
+            "claim_no": claims["claim_no"].to_numpy(),
+        })
+        self.order = keys.sort_values(["key", "claim_no"], kind="stable").index.to_numpy(dtype=np.int64)
+        self.rank_of_row = np.empty_like(self.order)
+        self.rank_of_row[self.order] = np.arange(len(self.order))
+        self._keys = keys["key"].to_numpy()[self.order]
+        self._claim_nos = keys["claim_no"].to_numpy()[self.order]
+
+        self.claim_prefix_index = PrefixIndex(claims["claim_no"].to_numpy())
+        self.policy_prefix_index = PrefixIndex(claims["policy_no"].to_numpy())
+
+    def __len__(self):
+        return len(self.order)
+
+    def cursor_for_rank(self, rank):
+        return (int(self._keys[rank]), self._claim_nos[rank])
+
+    def seek(self, cursor):
+        """Returns the first rank strictly after the keyset `cursor` (0 when None)."""
+        if cursor is None:
+            return 0
+        key, claim_no = cursor
+        lo = np.searchsorted(self._keys, key, "left")
+        hi = np.searchsorted(self._keys, key, "right")
+        return int(lo + np.searchsorted(self._claim_nos[lo:hi], claim_no, "right"))
+
+    def search_rows(self, text):
+        """Rows whose claim_no or policy_no starts with `text` (case-insensitive)."""
+        text = text.strip().lower()
+        claim_rows = self.claim_prefix_index.rows(text)
+        policy_rows = self.policy_prefix_index.rows(text.upper())
+        if len(claim_rows) and len(policy_rows):
+            return np.unique(np.concatenate([claim_rows, policy_rows]))
+        return claim_rows if len(claim_rows) else policy_rows
+
+    def _matches(self, rows, filters, outcomes):
+        claims = self.store.claims
+        keep = np.ones(len(rows), dtype=bool)
+        if filters.status:
+            keep &= _category_mask(claims["status"], filters.status, rows)
+        if filters.severity:
+            keep &= _category_mask(claims["severity"], filters.severity, rows)
+        if filters.checks and outcomes is not None:
+            # Negative outcomes (claims not adjudicated) match neither filter
+            worst = outcomes[rows]
+            keep &= (worst == 0) if filters.checks == "passed" else (worst > 0)
+        return keep
+
+    def page(self, filters=ClaimFilter(), cursor=None, page_size=DEFAULT_PAGE_SIZE, outcomes=None):
+        """
+        Returns the page of claim rows following `cursor` that match `filters`.
+        `outcomes` is the per-claim worst rule outcome (needed for the checks filter).
+        """
+        start = self.seek(cursor)
+        if filters.search:
+            ranks = self.rank_of_row[self.search_rows(filters.search)]
+            ranks = ranks[ranks >= start]
+            ranks = ranks[self._matches(self.order[ranks], filters, outcomes)]
+            has_more = len(ranks) > page_size
+            if has_more:
+                # Only the first page of matches needs ordering
+                ranks = np.partition(ranks, page_size - 1)[:page_size]
+            taken = np.sort(ranks)
+        else:
+            taken, has_more = self._scan(start, filters, page_size, outcomes)
+        if len(taken) == 0:
+            return Page(np.empty(0, dtype=np.int64), cursor, False)
+        return Page(self.order[taken], self.cursor_for_rank(taken[-1]), has_more)
+
+    def matching_rows(self, filters=ClaimFilter(), outcomes=None):
+        """Every claim row matching `filters`, in grid order (for exports)."""
+        if filters.search:
+            ranks = np.sort(self.rank_of_row[self.search_rows(filters.search)])
+        else:
+            ranks = np.arange(len(self.order))
+        rows = self.order[ranks]
+        return rows[self._matches(rows, filters, outcomes)]
+
+    def _scan(self, start, filters, page_size, outcomes):
+        """Walks the sort order from `start` in growing chunks until a page is full."""
+        found = []
+        needed = page_size + 1  # one extra row tells whether another page exists
+        position, chunk = start, max(_SCAN_CHUNK, needed)
+        while position < len(self.order) and needed > 0:
+            ranks = np.arange(position, min(position + chunk, len(self.order)))
+            ranks = ranks[self._matches(self.order[ranks], filters, outcomes)][:needed]
+            found.append(ranks)
+            needed -= len(ranks)
+            position += chunk
+            chunk *= 2
+        taken = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        return taken[:page_size], len(taken) > page_size
+
+
+def _category_mask(column, value, rows):
+    categories = column.cat.categories
+    if value not in categories:
+        return np.zeros(len(rows), dtype=bool)
+    return column.cat.codes.to_numpy()[rows] == categories.get_loc(value)
@@ -0,0 +1,423 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from policy_intervals import PolicyIntervalIndex
+
+# --- DATA LOCATIONS ---
+# Shipped dataset; point elsewhere (e.g. a scaled-up copy) for load tests
+DATA_DIR = os.environ.get("SMART_CLAIMS_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+SQL_SERVER_DIR = os.path.join(DATA_DIR, "sql_server")
+# Local state written by the apps (job queue, derived indexes); safe to delete
+CACHE_DIR = os.environ.get("SMART_CLAIMS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# Workflow statuses shown in the admin grid. Every claim starts under review.
+STATUSES = ["Under Review", "Processed"]
+DEFAULT_STATUS = "Under Review"
+
+# Low-cardinality text columns kept as pandas categoricals
+CLAIM_CATEGORIES = ["collision_type", "insured_relationship", "type", "severity"]
+POLICY_CATEGORIES = ["POLICYTYPE", "MAKE", "MODEL", "USE_OF_VEHICLE", "PRODUCT"]
+CUSTOMER_CATEGORIES = ["borough", "neighborhood", "zip_code"]
+
+_EMPTY_ROWS = np.empty(0, dtype=np.int32)
+
+
+class HashIndex:
+    """
+    Hash index from a key column to the row positions holding each key.
+
+    Keys are factorized once; the dict maps a key to a slot and the row positions
+    of every slot are stored contiguously (CSR layout), so a lookup is one dict probe
+    plus an array slice, and non-unique keys cost no extra Python objects.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        codes = codes.astype(np.int32, copy=False)
+        valid = codes >= 0
+        self._slots = dict(zip(uniques.tolist(), range(len(uniques))))
+        self._order = np.flatnonzero(valid)[np.argsort(codes[valid], kind="stable")].astype(np.int32)
+        self._offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes[valid], minlength=len(uniques)), out=self._offsets[1:])
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def rows(self, key):
+        """Returns the row positions for `key` (empty array when absent)."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return _EMPTY_ROWS
+        return self._order[self._offsets[slot]:self._offsets[slot + 1]]
+
+    def last(self, key):
+        """Returns the last row position for `key`, or -1 when absent."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return -1
+        return int(self._order[self._offsets[slot + 1] - 1])
+
+    def nbytes(self):
+        """Approximate memory held by the index (dict, keys and position arrays)."""
+        keys = sum(sys.getsizeof(k) for k in self._slots)
+        return sys.getsizeof(self._slots) + keys + self._order.nbytes + self._offsets.nbytes
+
+
+class _RowReader:
+    """
+    Materializes single rows of a DataFrame as plain dicts without going through
+    `DataFrame.iloc`, which costs tens of microseconds per call.
+    """
+
+    def __init__(self, df):
+        self._plain = []
+        self._scalars = []
+        self._categories = []
+        for name in df.columns:
+            col = df[name]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                self._categories.append((name, col.cat.codes.to_numpy(), col.cat.categories.tolist() + [None]))
+            elif pd.api.types.is_datetime64_any_dtype(col.dtype):
+                # datetime64[us].item() yields datetime.datetime (or None for NaT)
+                self._scalars.append((name, col.to_numpy().astype("datetime64[us]", copy=False)))
+            elif col.dtype == object or pd.api.types.is_string_dtype(col.dtype):
+                self._plain.append((name, col.to_numpy(dtype=object)))
+            else:
+                self._scalars.append((name, col.to_numpy()))
+
+    def refresh_category(self, df, name):
+        """Re-reads the codes of one categorical column after an in-place update."""
+        col = df[name]
+        for i, entry in enumerate(self._categories):
+            if entry[0] == name:
+                self._categories[i] = (name, col.cat.codes.to_numpy(), col.cat.categories.tolist() + [None])
+
+    def read(self, row):
+        record = {name: values[row] for name, values in self._plain}
+        for name, values in self._scalars:
+            record[name] = values[row].item()
+        for name, codes, categories in self._categories:
+            record[name] = categories[codes[row]]
+        return record
+
+
+# --- PARSING ---
+def _to_category(series):
+    return series.astype("category")
+
+
+def _to_object(series):
+    # Plain object arrays keep string columns zero-copy for the row reader
+    # regardless of the pandas string backend in use.
+    return series.astype(object)
+
+
+def parse_claims(path):
+    df = pd.read_csv(
+        path,
+        dtype={"claim_no": str, "policy_no": str, "hour": np.int8,
+               "number_of_witnesses": np.int8, "number_of_vehicles_involved": np.int8,
+               "age": np.float32, "months_as_customer": np.int16,
+               "injury": np.int32, "property": np.int32, "vehicle": np.int32, "total": np.int32},
+        na_values=["null"],
+        keep_default_na=False,
+    )
+    df["claim_no"] = _to_object(df["claim_no"])
+    df["policy_no"] = _to_object(df["policy_no"])
+    df["claim_date"] = pd.to_datetime(df["claim_date"], format="%Y-%m-%d")
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+    df["license_issue_date"] = pd.to_datetime(df["license_issue_date"], format="%d-%m-%Y", errors="coerce")
+    for name in CLAIM_CATEGORIES:
+        df[name] = _to_category(df[name])
+    df["suspicious_activity"] = df["suspicious_activity"].astype(str).str.lower().eq("true")
+    df["status"] = initial_status(len(df))
+    return df
+
+
+def initial_status(count):
+    """Workflow status column for freshly loaded claims."""
+    return pd.Categorical([DEFAULT_STATUS] * count, categories=STATUSES)
+
+
+def parse_policies(path):
+    df = pd.read_csv(
+        path,
+        dtype={"POLICY_NO": str, "CUST_ID": np.float64, "MODEL_YEAR": np.float32,
+               "SUM_INSURED": np.float32, "PREMIUM": np.float32, "DEDUCTABLE": np.int32,
+               "CHASSIS_NO": str, "MODEL": str},
+        na_values=["null"],
+        keep_default_na=False,
+    )
+    df["CUST_ID"] = df["CUST_ID"].astype(np.int64)
+    for name in ["POL_ISSUE_DATE", "POL_EFF_DATE", "POL_EXPIRY_DATE"]:
+        df[name] = pd.to_datetime(df[name], format="%Y-%m-%d")
+    for name in POLICY_CATEGORIES:
+        df[name] = _to_category(df[name])
+    df["POLICY_NO"] = _to_object(df["POLICY_NO"])
+    df["CHASSIS_NO"] = _to_object(df["CHASSIS_NO"])
+    return df
+
+
+def parse_customers(path):
+    df = pd.read_csv(
+        path,
+        dtype={"customer_id": np.float64, "zip_code": str, "name": str},
+        na_values=["null"],
+        keep_default_na=False,
+    )
+    df["customer_id"] = df["customer_id"].astype(np.int64)
+    df["date_of_birth"] = pd.to_datetime(df["date_of_birth"], format="%d-%m-%Y", errors="coerce")
+    for name in CUSTOMER_CATEGORIES:
+        df[name] = _to_category(df[name])
+    df["name"] = _to_object(df["name"])
+    return df
+
+
+def append_rows(df, records):
+    """
+    Returns `df` with `records` (dicts keyed by column) appended, coerced to the
+    existing column dtypes. Categorical columns keep their categories and gain any
+    new values at the end.
+    """
+    new = pd.DataFrame.from_records(records, columns=df.columns)
+    combined = {}
+    for name, dtype in df.dtypes.items():
+        values = new[name]
+        if isinstance(dtype, pd.CategoricalDtype):
+            extra = pd.Categorical(values.dropna().unique())
+            categories = dtype.categories.append(extra.categories.difference(dtype.categories))
+            combined[name] = pd.Categorical(
+                np.concatenate([df[name].astype(object).to_numpy(), values.to_numpy(dtype=object)]),
+                categories=categories,
+            )
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            combined[name] = np.concatenate([df[name].to_numpy(), pd.to_datetime(values).to_numpy().astype(dtype)])
+        elif dtype == bool:
+            combined[name] = np.concatenate([df[name].to_numpy(), values.fillna(False).to_numpy(dtype=bool)])
+        elif pd.api.types.is_numeric_dtype(dtype):
+            fill = np.nan if pd.api.types.is_float_dtype(dtype) else 0
+            combined[name] = np.concatenate([df[name].to_numpy(), pd.to_numeric(values).fillna(fill).to_numpy().astype(dtype)])
+        else:
+            combined[name] = pd.Series(np.concatenate([df[name].to_numpy(dtype=object), values.to_numpy(dtype=object)]), dtype=object)
+    return pd.DataFrame(combined)
+
+
+def join_rows(left_keys, right_keys):
+    """
+    Vectorized many-to-one join: for every left key returns the row position of the
+    matching right key (last occurrence wins on duplicates), or -1 when unmatched.
+    """
+    right = pd.Index(right_keys)
+    keep = ~right.duplicated(keep="last")
+    lookup = pd.Index(right[keep])
+    positions = np.flatnonzero(keep).astype(np.int32)
+    hits = lookup.get_indexer(left_keys)
+    return np.where(hits >= 0, positions[hits], -1).astype(np.int32)
+
+
+# --- STORE ---
+class ClaimsStore:
+    """
+    In-memory columnar view of the SQL Server extracts (claims, policies, customers).
+
+    Tables are parsed once into typed pandas columns. Hash indexes on claim_no, policy_no,
+    CUST_ID and CHASSIS_NO serve point lookups, and claim→policy→customer joins are
+    precomputed as row-position arrays so batch consumers never merge at request time.
+    """
+
+    def __init__(self, claims, policies, customers):
+        self.claims = claims.reset_index(drop=True)
+        self.policies = policies.reset_index(drop=True)
+        self.customers = customers.reset_index(drop=True)
+        # Bumped whenever rows are added or columns set, so derived structures know to rebuild
+        self.version = 0
+        # Columns added by `set_columns` (the rest come from the sources)
+        self.derived_columns = set()
+        self._listeners = []
+        self.build_indexes()
+
+    def build_indexes(self):
+        self.claim_index = HashIndex(self.claims["claim_no"].to_numpy())
+        self.claim_policy_index = HashIndex(self.claims["policy_no"].to_numpy())
+        self.policy_index = HashIndex(self.policies["POLICY_NO"].to_numpy())
+        self.customer_policy_index = HashIndex(self.policies["CUST_ID"].to_numpy())
+        self.chassis_index = HashIndex(self.policies["CHASSIS_NO"].to_numpy())
+        self.customer_index = HashIndex(self.customers["customer_id"].to_numpy())
+        # Which policy covered a chassis on a date (Policy Active check)
+        self.policy_intervals = PolicyIntervalIndex.from_policies(self.policies)
+
+        # Precomputed joins (row positions, -1 when the parent row is missing)
+        self.claim_policy_row = join_rows(self.claims["policy_no"].to_numpy(), self.policies["POLICY_NO"].to_numpy())
+        self.policy_customer_row = join_rows(self.policies["CUST_ID"].to_numpy(), self.customers["customer_id"].to_numpy())
+
+        self._claim_reader = _RowReader(self.claims)
+        self._policy_reader = _RowReader(self.policies)
+        self._customer_reader = _RowReader(self.customers)
+
+    def __len__(self):
+        return len(self.claims)
+
+    # --- POINT LOOKUPS ---
+    def claim_row(self, claim_no):
+        return self.claim_index.last(claim_no)
+
+    def claim_at(self, row):
+        return self._claim_reader.read(row)
+
+    def claim(self, claim_no):
+        row = self.claim_index.last(claim_no)
+        return self._claim_reader.read(row) if row >= 0 else None
+
+    def policy(self, policy_no):
+        row = self.policy_index.last(_as_key(policy_no))
+        return self._policy_reader.read(row) if row >= 0 else None
+
+    def customer(self, customer_id):
+        row = self.customer_index.last(_as_int(customer_id))
+        return self._customer_reader.read(row) if row >= 0 else None
+
+    def claims_for_policy(self, policy_no):
+        return [self._claim_reader.read(r) for r in self.claim_policy_index.rows(_as_key(policy_no))]
+
+    def policies_for_customer(self, customer_id):
+        return [self._policy_reader.read(r) for r in self.customer_policy_index.rows(_as_int(customer_id))]
+
+    def policies_for_chassis(self, chassis_no):
+        return [self._policy_reader.read(r) for r in self.chassis_index.rows(chassis_no)]
+
+    def claim_detail(self, claim_no):
+        """
+        Returns the claim together with its policy and customer records, or None if
+        the claim number is unknown.
+        """
+        row = self.claim_index.last(claim_no)
+        if row < 0:
+            return None
+        policy_row = self.claim_policy_row[row]
+        customer_row = self.policy_customer_row[policy_row] if policy_row >= 0 else -1
+        return {
+            "claim": self._claim_reader.read(row),
+            "policy": self._policy_reader.read(policy_row) if policy_row >= 0 else None,
+            "customer": self._customer_reader.read(customer_row) if customer_row >= 0 else None,
+        }
+
+    # --- MUTATIONS ---
+    def add_listener(self, listener):
+        """
+        Registers an object notified of changes through `claims_added(records)`,
+        `status_changed(record, old_status)` and `columns_changed(names)`.
+        """
+        self._listeners.append(listener)
+
+    def set_status(self, claim_no, status):
+        """Updates a claim's workflow status in place."""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status {status!r}")
+        row = self.claim_index.last(claim_no)
+        if row < 0:
+            raise KeyError(claim_no)
+        old_status = self.claims["status"].iat[row]
+        if old_status == status:
+            return
+        self.claims.loc[row, "status"] = status
+        self._claim_reader.refresh_category(self.claims, "status")
+        record = self._claim_reader.read(row)
+        for listener in self._listeners:
+            listener.status_changed(record, old_status)
+
+    def add_claims(self, records):
+        """
+        Appends new claims (dicts keyed by claims.csv column) and rebuilds the indexes.
+        Claims without a status start as DEFAULT_STATUS.
+        """
+        records = [dict(record) for record in records]
+        for record in records:
+            if record.get("claim_no") in self.claim_index:
+                raise ValueError(f"Claim {record['claim_no']} already exists")
+            record.setdefault("status", DEFAULT_STATUS)
+        first = len(self.claims)
+        self.claims = append_rows(self.claims, records)
+        self.build_indexes()
+        self.version += 1
+        added = [self._claim_reader.read(row) for row in range(first, len(self.claims))]
+        for listener in self._listeners:
+            listener.claims_added(added)
+        return added
+
+    def set_columns(self, columns):
+        """
+        Adds or replaces whole derived claim columns ({name: values aligned with
+        the claims}), e.g. the results of a re-adjudication run. Source columns,
+        which the indexes and listeners are built on, cannot be replaced.
+        """
+        for name, values in columns.items():
+            if name in self.claims and name not in self.derived_columns:
+                raise ValueError(f"Column {name!r} is a source column")
+            if len(values) != len(self.claims):
+                raise ValueError(f"Column {name!r} has {len(values)} values for {len(self.claims)} claims")
+        for name, values in columns.items():
+            self.claims[name] = values
+        self.derived_columns.update(columns)
+        self._claim_reader = _RowReader(self.claims)
+        self.version += 1
+        for listener in self._listeners:
+            listener.columns_changed(list(columns))
+
+    # --- DIAGNOSTICS ---
+    def memory_report(self):
+        """
+        Measures resident bytes per table (deep, including string payloads) and per
+        index, and reports them per row.
+        """
+        report = {}
+        tables = {
+            "claims": (self.claims, [self.claim_index, self.claim_policy_index]),
+            "policies": (self.policies, [self.policy_index, self.customer_policy_index, self.chassis_index, self.policy_intervals]),
+            "customers": (self.customers, [self.customer_index]),
+        }
+        for name, (df, indexes) in tables.items():
+            data_bytes = int(df.memory_usage(deep=True).sum())
+            index_bytes = sum(ix.nbytes() for ix in indexes)
+            rows = max(len(df), 1)
+            report[name] = {
+                "rows": len(df),
+                "data_bytes": data_bytes,
+                "index_bytes": index_bytes,
+                "bytes_per_row": round((data_bytes + index_bytes) / rows, 1),
+            }
+        report["joins"] = {"bytes": int(self.claim_policy_row.nbytes + self.policy_customer_row.nbytes)}
+        return report
+
+
+def _as_key(value):
+    # Policy numbers are strings: some carry endorsement suffixes ("102151006/1").
+    return str(value).strip()
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def load_claims_store(data_dir=SQL_SERVER_DIR):
+    """
+    Parses claims.csv, policies.csv and customers.csv into a ClaimsStore.
+    Callers are expected to hold on to the result (e.g. via st.cache_resource).
+    """
+    started = time.perf_counter()
+    store = ClaimsStore(
+        parse_claims(os.path.join(data_dir, "claims.csv")),
+        parse_policies(os.path.join(data_dir, "policies.csv")),
+        parse_customers(os.path.join(data_dir, "customers.csv")),
+    )
+    store.load_seconds = time.perf_counter() - started
+    return store
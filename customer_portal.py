@@ -1,7 +1,116 @@
+import functools
+import uuid
 import streamlit as st
-import time
-from utils import load_design_system, render_header
+from utils import load_design_system, persisted_session, render_header
+from claim_jobs import DONE, FAILED, JobQueue
+from decision_log import DecisionLog, claim_record
+from rule_engine import PASS, RULES, SEVERITY_LEVEL_NAMES, evaluate_submission, evidence_images
+from duplicate_index import (
+    PERCEPTUAL_HASH_ANALYSIS, DuplicateIndex, check_submission, claim_digests, fingerprint_images, perceptual_hash,
+)
+from evidence_index import load_evidence_index
+from image_store import ImageStore
+from session_store import open_session_backend
+from instrumentation import span, timed
+from severity_model import SEVERITY_ANALYSIS, SeverityClassifier, load_severity_model
+from telematics import load_telematics
+from telematics_stream import start_live_telematics
+from warehouse import load_claims_store_from_warehouse
 
+# Background analysis workers shared by every session of this server process
+ANALYSIS_WORKERS = 4
+# Seconds between status polls while an analysis is pending
+POLL_INTERVAL = 1.0
+
+# --- SHARED RESOURCES (one per server process) ---
+@timed("data.get_claims_store")
+@st.cache_resource(show_spinner="Loading policy data...")
+def get_claims_store():
+    return load_claims_store_from_warehouse()
+
+@timed("data.get_telematics")
+@st.cache_resource(show_spinner="Loading telematics...")
+def get_telematics():
+    # Static partitions plus the live feed, ingested in the background
+    return start_live_telematics(load_telematics())
+
+@timed("data.get_severity_classifier")
+@st.cache_resource(show_spinner="Loading severity model...")
+def get_severity_classifier():
+    # Shared by the analysis workers, so concurrent claims are scored in one batch
+    return SeverityClassifier(load_severity_model())
+
+@timed("data.get_image_store")
+@st.cache_resource
+def get_image_store():
+    return ImageStore()
+
+@timed("data.get_decision_log")
+@st.cache_resource
+def get_decision_log():
+    return DecisionLog()
+
+@timed("data.get_duplicate_index")
+@st.cache_resource(show_spinner="Indexing duplicate evidence...")
+def get_duplicate_index():
+    # Built once from the imported claims; submissions are added as they are checked
+    store, image_store = get_claims_store(), get_image_store()
+    digests = claim_digests(evidence_images(store, load_evidence_index()), image_store.import_directory())
+    return DuplicateIndex.from_store(store, digests, fingerprint_images(image_store, digests))
+
+@timed("data.get_session_backend")
+@st.cache_resource
+def get_session_backend():
+    return open_session_backend()
+
+# Session-state keys that follow a user across replicas and restarts (ids and digests only)
+PERSISTED_KEYS = ('page', 'claim_id', 'uploaded_image')
+
+@timed("rules.analyze_submission")
+def analyze_submission(store, telematics, classifier, image_store, duplicates, job_id, payload, image):
+    """
+    Runs on a worker thread: classifies the damage image, matches it and the claim
+    against earlier claims, and evaluates the automated checks. Identical images
+    (same content digest) are classified and hashed only once.
+    """
+    digest = payload.get("image_digest") or (image_store.put(image) if image else None)
+    level, confidence = image_store.analyze(SEVERITY_ANALYSIS, digest, classifier.classify) if digest else (-1, 0.0)
+    fingerprint = image_store.analyze(PERCEPTUAL_HASH_ANALYSIS, digest, perceptual_hash) if digest else None
+    matches = check_submission(duplicates, store, job_id, dict(payload, image_digest=digest), fingerprint)
+    results = evaluate_submission(store, payload, model_level=level, telematics=telematics, duplicates=matches)
+    return {
+        "checks": {key: check for (key, _), check in zip(RULES, results.for_row(0))},
+        "model": {"severity": SEVERITY_LEVEL_NAMES[level] if level >= 0 else None, "confidence": confidence},
+        "approved": bool(results.worst[0] == PASS),
+    }
+
+@timed("data.get_job_queue")
+@st.cache_resource
+def get_job_queue():
+    handler = functools.partial(
+        analyze_submission, get_claims_store(), get_telematics(), get_severity_classifier(), get_image_store(),
+        get_duplicate_index(),
+    )
+    return JobQueue(handler, workers=ANALYSIS_WORKERS)
+
+def render_queue_metrics():
+    """
+    Small footer with the health of the shared analysis queue.
+    """
+    m = get_job_queue().metrics()
+    p50 = f"{m['latency_p50']:.2f}s" if m['latency_p50'] is not None else "—"
+    p99 = f"{m['latency_p99']:.2f}s" if m['latency_p99'] is not None else "—"
+    st.caption(
+        f"Analysis queue: {m['queue_depth']} waiting • {m['workers_busy']}/{m['workers']} workers busy "
+        f"({m['utilization']:.0%} utilization) • latency p50 {p50} / p99 {p99}"
+    )
+
+def forget_upload():
+    """Drops the stored upload when the customer removes the file from the uploader."""
+    if st.session_state.get('upload_widget') is None:
+        st.session_state.pop('uploaded_image', None)
+
+@timed("view.render_submission_form")
 def render_submission_form():
     """
     Renders the 'Submit Your Claim' input form (Image 4).
@@ -17,13 +126,32 @@ def render_submission_form():
             st.markdown('<div class="css-card">', unsafe_allow_html=True)
             st.markdown("### 📤 Upload a car damage image")
             
-            uploaded_file = st.file_uploader("Drop your crash photo here", type=['png', 'jpg'], label_visibility="collapsed")
+            uploaded_file = st.file_uploader(
+                "Drop your crash photo here", type=['png', 'jpg'], label_visibility="collapsed",
+                key='upload_widget', on_change=forget_upload,
+            )
             
+            # Keep only the content digest in the session; the bytes live in the image store
+            upload = st.session_state.get('uploaded_image')
             if uploaded_file:
-                st.image(uploaded_file, caption="41-major (2).png", use_container_width=True)
-                st.markdown(f"<div style='text-align:center; color: #64748B; font-size: 0.8rem; margin-top: 5px;'>{uploaded_file.name} (1.7 MB)</div>", unsafe_allow_html=True)
-                # Store in session state for the next page
-                st.session_state['uploaded_image'] = uploaded_file
+                if not upload or upload['file_id'] != uploaded_file.file_id:
+                    with span("data.image_store_put"):
+                        upload = {
+                            "file_id": uploaded_file.file_id,
+                            "digest": get_image_store().put(uploaded_file.getvalue()),
+                            "name": uploaded_file.name,
+                            "size": uploaded_file.size,
+                        }
+                    st.session_state['uploaded_image'] = upload
+            elif upload and upload['digest'] not in get_image_store():
+                # Restored on a replica that cannot see the image: ask for it again
+                st.session_state.pop('uploaded_image')
+                upload = None
+
+            if upload:
+                # Also shown when restored on another replica or after a restart, with an empty uploader
+                st.image(get_image_store().thumbnail(upload['digest']), caption=upload['name'], use_container_width=True)
+                st.markdown(f"<div style='text-align:center; color: #64748B; font-size: 0.8rem; margin-top: 5px;'>{upload['name']} ({upload['size'] / 2**20:.1f} MB)</div>", unsafe_allow_html=True)
             else:
                 st.markdown("""
                     <div style='height: 200px; border: 2px dashed #CBD5E1; border-radius: 8px; display: flex; align-items: center; justify-content: center; color: #94A3B8; flex-direction: column; gap: 10px;'>
@@ -41,85 +169,158 @@ def render_submission_form():
             
             # Form Inputs
             c1, c2 = st.columns(2)
-            with c1: st.text_input("Policy Number *", value="12345")
-            with c2: st.text_input("Accident Location *", value="Munich")
+            with c1: policy_no = st.text_input("Policy Number *", value="12345")
+            with c2: location = st.text_input("Accident Location *", value="Munich")
             
             c3, c4 = st.columns(2)
-            with c3: st.text_input("Claim Amount ($) *", value="20000")
-            with c4: st.date_input("Accident Date *")
+            with c3: amount = st.text_input("Claim Amount ($) *", value="20000")
+            with c4: accident_date = st.date_input("Accident Date *")
             
             c5, c6 = st.columns(2)
-            with c5: st.selectbox("Self-Assessed Severity *", ["Major", "Minor", "Moderate"])
-            with c6: st.selectbox("Collision Type *", ["Rollover", "Front-end", "Rear-end", "Side-impact"])
+            with c5: severity = st.selectbox("Self-Assessed Severity *", ["Major", "Minor", "Moderate"])
+            with c6: collision_type = st.selectbox("Collision Type *", ["Rollover", "Front-end", "Rear-end", "Side-impact"])
             
-            st.selectbox("Vehicles Involved *", ["1 Vehicle", "2 Vehicles", "3+ Vehicles"])
-            st.text_area("Additional Notes", placeholder="Provide any additional details...")
+            vehicles = st.selectbox("Vehicles Involved *", ["1 Vehicle", "2 Vehicles", "3+ Vehicles"])
+            notes = st.text_area("Additional Notes", placeholder="Provide any additional details...")
             
             st.markdown("<br>", unsafe_allow_html=True)
             
             # SUBMIT ACTION
             if st.button("Submit Claim"):
-                if not uploaded_file:
+                if not upload:
                     st.error("Please upload an image first.")
+                elif not amount.replace(",", "").strip().isdigit():
+                    st.error("Please enter the claim amount as a whole number.")
                 else:
-                    with st.spinner("Analyzing image with Computer Vision..."):
-                        time.sleep(1.5) # Simulate API call
-                        st.session_state['page'] = 'results'
-                        st.rerun()
+                    # Queue the analysis and move on; the results page polls for it
+                    payload = {
+                        "policy_no": policy_no.strip(),
+                        "location": location.strip(),
+                        "total": int(amount.replace(",", "")),
+                        "claim_date": accident_date.isoformat(),
+                        "severity": severity,
+                        "collision_type": collision_type,
+                        "vehicles": vehicles,
+                        "notes": notes,
+                        "image_name": upload['name'],
+                        "image_digest": upload['digest'],
+                    }
+                    # The claim is durable before its analysis is queued
+                    claim_id = str(uuid.uuid4())
+                    session = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+                    with span("data.record_claim"):
+                        get_decision_log().record_claim(claim_record(claim_id, payload), session=session, form=payload)
+                    with span("data.submit_job"):
+                        st.session_state['claim_id'] = get_job_queue().submit(payload, job_id=claim_id)
+                    st.session_state['page'] = 'results'
+                    st.rerun()
             
             st.markdown('</div>', unsafe_allow_html=True)
 
+# Circles on the results page: (rule key, label, icon)
+RESULT_CIRCLES = [
+    ("severity", "Image Severity", "✓"),
+    ("amount", "Policy Amount", "🛡️"),
+    ("policy_active", "Policy Data", "📊"),
+    ("speed", "Speed Check", "📄"),
+    ("location", "Location", "📍"),
+    ("duplicate", "Duplicates", "🔁"),
+]
+OUTCOME_COLORS = {"PASS": "#10B981", "WARN": "#F59E0B", "FAIL": "#EF4444"}
+
+@st.fragment(run_every=POLL_INTERVAL)
+@timed("view.render_pending_status")
+def render_pending_status(claim_id):
+    """
+    Polls the analysis job without blocking; reruns the page once it has finished.
+    """
+    job = get_job_queue().status(claim_id)
+    if job is None or job['status'] in (DONE, FAILED):
+        st.rerun()
+    if job['status'] == 'queued':
+        st.info(f"⏳ Your claim {claim_id} is queued for analysis (position {job['position']})...")
+    else:
+        st.info("🔎 Analyzing image with Computer Vision...")
+    render_queue_metrics()
+
+@timed("view.render_results_page")
 def render_results_page():
     """
     Renders the 'Claim Analysis Results' page (Image 6).
     """
     st.markdown("<h1 style='text-align: center; margin-bottom: 40px;'>Claim Analysis Results</h1>", unsafe_allow_html=True)
+
+    claim_id = st.session_state.get('claim_id')
+    job = get_job_queue().status(claim_id) if claim_id else None
+    if job is not None and job['status'] not in (DONE, FAILED):
+        render_pending_status(claim_id)
+        return
+
     st.markdown("<p style='text-align: center; color: #64748B; margin-top: -30px; margin-bottom: 40px;'>Your claim has been analyzed using AI-powered image recognition</p>", unsafe_allow_html=True)
 
-    # --- SUCCESS BANNER ---
-    st.markdown("""
-        <div style="background-color: #ECFDF5; border: 1px solid #10B981; border-radius: 12px; padding: 2rem; text-align: center; margin-bottom: 2rem; max-width: 800px; margin-left: auto; margin-right: auto;">
-            <div style="font-size: 1.5rem; font-weight: 700; color: #065F46; margin-bottom: 10px;">
-                🎉 Congratulations! Your claim has been approved.
-            </div>
-            <div style="color: #047857; margin-bottom: 20px;">
-                You will receive your refund within 3-5 business days.
+    result = job['result'] if job and job['status'] == DONE else None
+    if result and result['approved']:
+        # --- SUCCESS BANNER ---
+        st.markdown(f"""
+            <div style="background-color: #ECFDF5; border: 1px solid #10B981; border-radius: 12px; padding: 2rem; text-align: center; margin-bottom: 2rem; max-width: 800px; margin-left: auto; margin-right: auto;">
+                <div style="font-size: 1.5rem; font-weight: 700; color: #065F46; margin-bottom: 10px;">
+                    🎉 Congratulations! Your claim has been approved.
+                </div>
+                <div style="color: #047857; margin-bottom: 20px;">
+                    You will receive your refund within 3-5 business days.
+                </div>
+                <div style="font-size: 0.875rem; color: #064E3B; background: rgba(255,255,255,0.5); display: inline-block; padding: 5px 15px; border-radius: 20px;">
+                    Claim Number: <strong>{claim_id}</strong> &nbsp; • &nbsp; Status: <strong>Approved</strong>
+                </div>
             </div>
-            <div style="font-size: 0.875rem; color: #064E3B; background: rgba(255,255,255,0.5); display: inline-block; padding: 5px 15px; border-radius: 20px;">
-                Claim Number: <strong>235284a4-b650-496e</strong> &nbsp; • &nbsp; Status: <strong>Approved</strong>
+        """, unsafe_allow_html=True)
+    else:
+        # --- REVIEW BANNER (failed checks or analysis error) ---
+        reason = "Some automated checks need a closer look." if result else "We could not analyze your claim automatically."
+        st.markdown(f"""
+            <div style="background-color: #FFFBEB; border: 1px solid #F59E0B; border-radius: 12px; padding: 2rem; text-align: center; margin-bottom: 2rem; max-width: 800px; margin-left: auto; margin-right: auto;">
+                <div style="font-size: 1.5rem; font-weight: 700; color: #92400E; margin-bottom: 10px;">
+                    Your claim has been sent for review.
+                </div>
+                <div style="color: #B45309; margin-bottom: 20px;">
+                    {reason} An adjuster will contact you within 2 business days.
+                </div>
+                <div style="font-size: 0.875rem; color: #78350F; background: rgba(255,255,255,0.5); display: inline-block; padding: 5px 15px; border-radius: 20px;">
+                    Claim Number: <strong>{claim_id or '—'}</strong> &nbsp; • &nbsp; Status: <strong>Under Review</strong>
+                </div>
             </div>
-        </div>
-    """, unsafe_allow_html=True)
+        """, unsafe_allow_html=True)
 
     # --- CIRCULAR CHECKS (Image 6 Bottom) ---
     st.markdown('<div class="css-card" style="max-width: 800px; margin: 0 auto;">', unsafe_allow_html=True)
     st.markdown("<h3 style='text-align: center; margin-bottom: 30px;'>Policy Form Analysis Results</h3>", unsafe_allow_html=True)
     
-    c1, c2, c3, c4 = st.columns(4)
-    
-    def render_circle(label, icon, color="#10B981"):
+    def render_circle(label, icon, color="#10B981", subtext=""):
         return f"""
             <div style="text-align: center;">
                 <div style="width: 60px; height: 60px; background-color: {color}; color: white; border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 1.5rem; margin: 0 auto 15px auto; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
                     {icon}
                 </div>
                 <div style="font-weight: 600; color: #334155;">{label}</div>
+                <div style="font-size: 0.75rem; color: #94A3B8;">{subtext}</div>
             </div>
         """
 
-    c1.markdown(render_circle("Image Severity", "✓"), unsafe_allow_html=True)
-    c2.markdown(render_circle("Policy Amount", "🛡️"), unsafe_allow_html=True)
-    c3.markdown(render_circle("Policy Data", "📊"), unsafe_allow_html=True)
-    c4.markdown(render_circle("Speed Check", "📄"), unsafe_allow_html=True)
+    checks = result['checks'] if result else {}
+    for col, (key, label, icon) in zip(st.columns(len(RESULT_CIRCLES)), RESULT_CIRCLES):
+        _, outcome, subtext = checks.get(key, (label, "WARN", "Not analyzed"))
+        col.markdown(render_circle(label, icon, OUTCOME_COLORS[outcome], subtext), unsafe_allow_html=True)
 
     st.markdown("<br><br>", unsafe_allow_html=True)
     
     # Reset Button
     if st.button("Submit Another Claim"):
         st.session_state['page'] = 'form'
+        st.session_state.pop('claim_id', None)
         st.rerun()
         
     st.markdown('</div>', unsafe_allow_html=True)
+    render_queue_metrics()
 
 
 # --- MAIN APP LOOP ---
@@ -127,13 +328,14 @@ def main():
     load_design_system()
     render_header()
     
-    if 'page' not in st.session_state:
-        st.session_state['page'] = 'form'
-        
-    if st.session_state['page'] == 'form':
-        render_submission_form()
-    else:
-        render_results_page()
+    with persisted_session(get_session_backend(), PERSISTED_KEYS):
+        if 'page' not in st.session_state:
+            st.session_state['page'] = 'form'
+
+        if st.session_state['page'] == 'form':
+            render_submission_form()
+        else:
+            render_results_page()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,496 @@
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import numpy as np
+
+from claims_store import CACHE_DIR
+
+DECISION_LOG_PATH = os.path.join(CACHE_DIR, "decisions.log")
+
+# Record kinds
+CLAIM, DECISION = "claim", "decision"
+# Adjuster decisions and the workflow status each one leaves the claim in
+DECISION_STATUSES = {"approved": "Processed", "rejected": "Processed"}
+
+# --- GROUP COMMIT DEFAULTS ---
+# Records written (and fsynced) together at most
+MAX_COMMIT_BATCH = 512
+# Optional wait for more writers before a commit; 0 commits as soon as the previous fsync is done
+MAX_COMMIT_DELAY = 0.0
+
+# --- COMPACTION DEFAULTS ---
+COMPACT_INTERVAL_SECONDS = 30.0
+COMPACT_LOG_BYTES = 4 * 2**20
+# How often the background compactor checks `compaction_due`
+COMPACT_POLL_SECONDS = 1.0
+# The snapshot is rewritten as one segment once it holds this many segments, or
+# once the segments after the first outgrow it (and this many bytes)
+SNAPSHOT_MAX_SEGMENTS = 64
+SNAPSHOT_REWRITE_BYTES = 2**20
+
+# Customer form labels -> claims.csv values (same scale as rule_engine.REPORTED_SEVERITY_LEVELS)
+FORM_SEVERITIES = {
+    "Minor": "Trivial Damage", "Moderate": "Minor Damage", "Major": "Major Damage",
+    "Minor Scratch": "Trivial Damage", "Moderate Dent": "Minor Damage",
+    "Major Damage": "Major Damage", "Total Loss": "Total Loss",
+}
+FORM_COLLISION_TYPES = {"Front-end": "Front Collision", "Rear-end": "Rear Collision", "Side-impact": "Side Collision"}
+FORM_INCIDENT_TYPES = {
+    "Single Vehicle": "Single Vehicle Collision", "Multi-Vehicle": "Multi-vehicle Collision",
+    "Stationary Object": "Single Vehicle Collision",
+}
+FORM_VEHICLE_COUNTS = {"1 Vehicle": 1, "2 Vehicles": 2, "3+ Vehicles": 3}
+
+_MAGIC = b"DLOG0001"
+_SNAPSHOT_MAGIC = b"DSNP0001"
+_FILE_HEADER = struct.Struct("<8sQ")   # magic, generation
+_FRAME = struct.Struct("<II")          # payload length, crc32
+
+
+def _read_frames(data):
+    """Decoded records of `data` up to the first torn or corrupt frame, and the bytes they span."""
+    records, position = [], 0
+    while position + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, position)
+        payload = data[position + _FRAME.size:position + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break  # torn tail of a crashed write: ignored, overwritten by the next write
+        records.append(json.loads(payload))
+        position += _FRAME.size + length
+    return records, position
+
+
+def _frame(record):
+    payload = json.dumps(record, default=_json_default).encode()
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def claim_record(claim_no, payload):
+    """A claims.csv-shaped record for a customer submission (unknown columns are left out)."""
+    incident = str(payload["claim_date"])
+    record = {
+        "claim_no": claim_no,
+        "policy_no": str(payload["policy_no"]).strip(),
+        "claim_date": incident,
+        "date": incident,
+        "total": int(payload.get("total") or 0),
+        "severity": FORM_SEVERITIES.get(payload.get("severity"), payload.get("severity")),
+        "collision_type": FORM_COLLISION_TYPES.get(payload.get("collision_type")),
+        "number_of_vehicles_involved": FORM_VEHICLE_COUNTS.get(payload.get("vehicles"), 1),
+    }
+    if payload.get("incident_type") in FORM_INCIDENT_TYPES:
+        record["type"] = FORM_INCIDENT_TYPES[payload["incident_type"]]
+    elif record["number_of_vehicles_involved"] > 1:
+        record["type"] = "Multi-vehicle Collision"
+    return record
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class DecisionLog:
+    """
+    Durable, append-only log of claim submissions and adjuster decisions.
+
+    Writers hand records to one committer thread, which writes everything queued
+    since its last commit and makes it durable with a single fsync (group
+    commit), so concurrent adjusters share the cost of each flush. `append`
+    returns the record's log sequence number (LSN) only once it is on disk and
+    visible in the in-memory view, which gives every session read-your-writes.
+
+    Several processes (the admin and portal servers) may share one log: commits
+    take an exclusive file lock and first read whatever other processes
+    appended, so LSNs stay totally ordered. `compact` appends the entries
+    changed since the previous compaction to the snapshot file as one segment,
+    then starts a new, empty log generation; `start_compaction` runs it on a
+    background thread. `apply_to` folds what was logged into a ClaimsStore (new
+    claims, statuses) on the caller's thread, which owns the store.
+    """
+
+    def __init__(self, path=DECISION_LOG_PATH, max_batch_size=MAX_COMMIT_BATCH, max_delay=MAX_COMMIT_DELAY,
+                 latency_window=10000):
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock_file = open(path + ".lock", "a+b")
+        self._file_mutex = threading.Lock()
+
+        # In-memory view: latest decision per claim and submitted claims
+        self.decisions = {}
+        self.claims = {}
+        self.lsn = 0
+        self._generation = None
+        self._offset = 0
+        self._state = threading.RLock()
+        self._last_compaction = time.monotonic()
+        # LSN covered by the snapshot file and where its last intact segment ends
+        # (None: missing or in the old whole-view format, rewritten on the next compaction)
+        self._snapshot_lsn = 0
+        self._snapshot_offset = None
+        self._snapshot_segments = 0
+        self._snapshot_base_bytes = 0
+        self._compactor = None
+        self._closed = threading.Event()
+
+        self._pending = deque()
+        self._ready = threading.Condition()
+        self._stopping = False
+        self.commits = 0
+        self.records = 0
+        self._latencies = deque(maxlen=latency_window)
+
+        with self._file_lock():
+            self._reload()
+        self._thread = threading.Thread(target=self._commit_loop, name="decision-log", daemon=True)
+        self._thread.start()
+
+    # --- FILES ---
+    @contextmanager
+    def _file_lock(self):
+        """
+        Exclusive across threads (the mutex) and processes (flock, which does not
+        exclude threads sharing one file description). The lock file outlives log
+        generations.
+        """
+        with self._file_mutex:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _new_generation(self, generation):
+        """Atomically replaces the log with an empty one of the given generation."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(fd, "wb") as out:
+            out.write(_FILE_HEADER.pack(_MAGIC, generation))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+
+    def _reload(self):
+        """Rebuilds the view from the snapshot plus the current log generation."""
+        with self._state:
+            self.decisions, self.claims, self.lsn = {}, {}, 0
+            self._snapshot_lsn, self._snapshot_offset = 0, None
+            self._snapshot_segments, self._snapshot_base_bytes = 0, 0
+            generation = self._read_snapshot() if os.path.exists(self.snapshot_path) else 0
+            if not os.path.exists(self.path):
+                self._new_generation(generation)
+            self._generation, self._offset = None, 0
+            self._catch_up()
+
+    def _read_snapshot(self):
+        """Applies the snapshot segments in order; returns the log generation they lead up to."""
+        with open(self.snapshot_path, "rb") as source:
+            data = source.read()
+        if data.startswith(_SNAPSHOT_MAGIC):
+            segments, consumed = _read_frames(data[len(_SNAPSHOT_MAGIC):])
+            self._snapshot_offset = len(_SNAPSHOT_MAGIC) + consumed
+            if segments:
+                self._snapshot_segments = len(segments)
+                self._snapshot_base_bytes = _FRAME.size + _FRAME.unpack_from(data, len(_SNAPSHOT_MAGIC))[0]
+        else:
+            segments = [json.loads(data)]  # one whole-view snapshot from before segments
+        generation = 0
+        for segment in segments:
+            self.decisions.update(segment["decisions"])
+            self.claims.update(segment["claims"])
+            self.lsn, generation = segment["lsn"], segment["generation"]
+        self._snapshot_lsn = self.lsn
+        return generation
+
+    def _snapshot_rewrite_due(self):
+        if self._snapshot_offset is None or self._snapshot_segments >= SNAPSHOT_MAX_SEGMENTS:
+            return True
+        appended = self._snapshot_offset - len(_SNAPSHOT_MAGIC) - self._snapshot_base_bytes
+        return appended > max(self._snapshot_base_bytes, SNAPSHOT_REWRITE_BYTES)
+
+    def _write_snapshot(self, segment, rewrite):
+        """Durably appends one segment to the snapshot file, or replaces the file with it."""
+        frame = _frame(segment)
+        if rewrite:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.snapshot_path)))
+            with os.fdopen(fd, "wb") as out:
+                out.write(_SNAPSHOT_MAGIC + frame)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, self.snapshot_path)
+            self._snapshot_offset = len(_SNAPSHOT_MAGIC) + len(frame)
+            self._snapshot_segments, self._snapshot_base_bytes = 1, len(frame)
+        else:
+            with open(self.snapshot_path, "r+b") as out:
+                # Overwrite any torn tail left by a crash rather than appending after it
+                out.seek(self._snapshot_offset)
+                out.write(frame)
+                out.truncate()
+                out.flush()
+                os.fsync(out.fileno())
+            self._snapshot_offset += len(frame)
+            self._snapshot_segments += 1
+        self._snapshot_lsn = segment["lsn"]
+
+    def _catch_up(self):
+        """Applies records appended (by any process) since the last read. Call under the file lock."""
+        with open(self.path, "rb") as source:
+            magic, generation = _FILE_HEADER.unpack(source.read(_FILE_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{self.path} is not a decision log")
+            if generation != self._generation:
+                if self._generation is not None:
+                    # Another process compacted: start again from its snapshot
+                    self._generation = None
+                    return self._reload()
+                self._generation, self._offset = generation, _FILE_HEADER.size
+            source.seek(self._offset)
+            data = source.read()
+        records, consumed = _read_frames(data)
+        for record in records:
+            self._apply(record)
+        self._offset += consumed
+
+    def _apply(self, record):
+        with self._state:
+            if record["lsn"] <= self.lsn:
+                return
+            self.lsn = record["lsn"]
+            entry = dict(record["data"], lsn=record["lsn"], session=record.get("session"), at=record["at"])
+            if record["kind"] == CLAIM:
+                self.claims[entry["claim_no"]] = entry
+            else:
+                self.decisions[entry["claim_no"]] = entry
+
+    # --- WRITE SIDE ---
+    def append(self, kind, data, session=None):
+        """Durably appends one record and returns its LSN (blocks until fsynced)."""
+        return self.submit(kind, data, session).result()
+
+    def submit(self, kind, data, session=None):
+        """Queues one record for the next group commit; returns a Future of its LSN."""
+        future = Future()
+        with self._ready:
+            if self._stopping:
+                raise RuntimeError("DecisionLog is closed")
+            self._pending.append((time.perf_counter(), kind, data, session, future))
+            self._ready.notify()
+        return future
+
+    def record_decision(self, claim_no, decision, session=None, note=None):
+        if decision not in DECISION_STATUSES:
+            raise ValueError(f"Unknown decision {decision!r}")
+        data = {"claim_no": claim_no, "decision": decision, "status": DECISION_STATUSES[decision]}
+        if note:
+            data["note"] = note
+        return self.append(DECISION, data, session)
+
+    def record_claim(self, record, session=None, form=None):
+        """Logs a submitted claim (a `claim_record`) and, optionally, the raw form it came from."""
+        data = {"claim_no": record["claim_no"], "record": record}
+        if form:
+            data["form"] = form
+        return self.append(CLAIM, data, session)
+
+    def _next_batch(self):
+        with self._ready:
+            while not self._pending and not self._stopping:
+                self._ready.wait()
+            if not self._pending:
+                return None
+            if self.max_delay:
+                deadline = self._pending[0][0] + self.max_delay
+                while len(self._pending) < self.max_batch_size and not self._stopping:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch_size))]
+
+    def _commit_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                lsns = self._commit(batch)
+            except Exception as exc:  # fail the writers, keep serving
+                for *_, future in batch:
+                    future.set_exception(exc)
+                continue
+            finished = time.perf_counter()
+            self.commits += 1
+            self.records += len(batch)
+            for (submitted, *_, future), lsn in zip(batch, lsns):
+                self._latencies.append(finished - submitted)
+                future.set_result(lsn)
+
+    def _commit(self, batch):
+        """Writes a batch with one write and one fsync, then applies it to the view."""
+        with self._file_lock():
+            self._catch_up()
+            now = datetime.now().isoformat(timespec="seconds")
+            records, frames = [], []
+            for i, (_, kind, data, session, _) in enumerate(batch, start=1):
+                record = {"lsn": self.lsn + i, "kind": kind, "data": data, "session": session, "at": now}
+                frames.append(_frame(record))
+                records.append(record)
+            with open(self.path, "r+b") as out:
+                # Overwrite any torn tail left by a crash rather than appending after it
+                out.seek(self._offset)
+                out.write(b"".join(frames))
+                out.truncate()
+                out.flush()
+                os.fsync(out.fileno())
+            self._offset += sum(len(frame) for frame in frames)
+            for record in records:
+                self._apply(record)
+        return [record["lsn"] for record in records]
+
+    def close(self):
+        self._closed.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._ready:
+            self._stopping = True
+            self._ready.notify_all()
+        self._thread.join()
+        self._lock_file.close()
+
+    # --- READ SIDE ---
+    def refresh(self):
+        """Picks up records other processes appended."""
+        with self._file_lock():
+            self._catch_up()
+
+    def decision(self, claim_no, min_lsn=0):
+        """
+        Latest decision for the claim, or None. Passing the LSN a session got from
+        its own write guarantees the view includes it (read-your-writes).
+        """
+        if min_lsn > self.lsn:
+            self.refresh()
+        with self._state:
+            return self.decisions.get(claim_no)
+
+    def status(self, claim_no, min_lsn=0):
+        decision = self.decision(claim_no, min_lsn)
+        return decision["status"] if decision else None
+
+    def form_values(self, field):
+        """{claim_no: value} of one form field (e.g. "location") over the logged claims that filled it in."""
+        with self._state:
+            return {
+                claim_no: entry["form"][field]
+                for claim_no, entry in self.claims.items() if (entry.get("form") or {}).get(field)
+            }
+
+    def stats(self):
+        latencies = np.array(self._latencies)
+        return {
+            "lsn": self.lsn,
+            "commits": self.commits,
+            "records": self.records,
+            "mean_batch_size": self.records / self.commits if self.commits else 0.0,
+            "commit_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "commit_p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            "log_bytes": self._offset,
+            "decisions": len(self.decisions),
+            "claims": len(self.claims),
+        }
+
+    # --- COMPACTION ---
+    def compaction_due(self, interval=COMPACT_INTERVAL_SECONDS, max_bytes=COMPACT_LOG_BYTES):
+        return time.monotonic() - self._last_compaction >= interval or self._offset >= max_bytes
+
+    def compact(self, store=None):
+        """
+        Applies everything logged since the store's last compaction to it (see
+        `apply_to`), appends the entries logged since the previous snapshot
+        segment to the snapshot and starts an empty log generation. Nothing is
+        written when nothing was logged since. Returns the number of records applied.
+        """
+        with self._file_lock():
+            self._catch_up()
+            with self._state:
+                applied = self._apply_to(store) if store is not None else 0
+                idle = self.lsn == self._snapshot_lsn and self._offset == _FILE_HEADER.size
+                if idle:
+                    self._last_compaction = time.monotonic()
+                    return applied
+                # A rewrite folds every segment (and entries they repeat) into one
+                rewrite = self._snapshot_rewrite_due()
+                since = 0 if rewrite else self._snapshot_lsn
+                segment = {
+                    "lsn": self.lsn,
+                    "generation": (self._generation or 0) + 1,
+                    "decisions": {k: e for k, e in self.decisions.items() if e["lsn"] > since},
+                    "claims": {k: e for k, e in self.claims.items() if e["lsn"] > since},
+                }
+            # Entries are replaced, never mutated, so the segment is written outside the view lock
+            self._write_snapshot(segment, rewrite)
+            # The old generation only holds records now in the snapshot
+            self._new_generation(segment["generation"])
+            self._generation, self._offset = segment["generation"], _FILE_HEADER.size
+        self._last_compaction = time.monotonic()
+        return applied
+
+    def start_compaction(self, interval=COMPACT_INTERVAL_SECONDS, poll_interval=COMPACT_POLL_SECONDS):
+        """
+        Compacts the log files from a background thread whenever `compaction_due`.
+        It never touches a ClaimsStore: the store's owner calls `apply_to`.
+        """
+        if self._compactor is not None:
+            return
+        self.compaction_errors = 0
+
+        def loop():
+            while not self._closed.wait(poll_interval):
+                if self.compaction_due(interval):
+                    try:
+                        self.compact()
+                    except Exception:  # a failed compaction is retried after the next interval
+                        self.compaction_errors += 1
+                        self._last_compaction = time.monotonic()
+
+        self._compactor = threading.Thread(target=loop, name="decision-log-compact", daemon=True)
+        self._compactor.start()
+
+    def apply_to(self, store):
+        """
+        Applies the claims and decisions logged (by any process, as of the last
+        compaction or commit seen) since the store's watermark to it. Costs one
+        comparison when there is nothing new; returns the number of records applied.
+        """
+        if getattr(store, "log_lsn", 0) >= self.lsn:
+            return 0
+        with self._state:
+            return self._apply_to(store)
+
+    def _apply_to(self, store):
+        watermark = getattr(store, "log_lsn", 0)
+        claims = sorted((e for e in self.claims.values() if e["lsn"] > watermark), key=lambda e: e["lsn"])
+        new = [e["record"] for e in claims if e["claim_no"] not in store.claim_index]
+        if new:
+            store.add_claims(new)
+        decisions = sorted((e for e in self.decisions.values() if e["lsn"] > watermark), key=lambda e: e["lsn"])
+        for entry in decisions:
+            if store.claim_row(entry["claim_no"]) >= 0:
+                store.set_status(entry["claim_no"], entry["status"])
+        store.log_lsn = self.lsn
+        return len(claims) + len(decisions)
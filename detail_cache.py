@@ -0,0 +1,157 @@
+import pickle
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from image_store import ByteLRU
+
+# Bound on the assembled payloads kept per server process
+DETAIL_CACHE_BYTES = 32 * 2**20
+# Safety net for changes no listener reports (e.g. another process re-deciding a claim)
+DETAIL_TTL_SECONDS = 300.0
+PREFETCH_WORKERS = 1
+
+
+def assemble_detail(claim_no, store, rules, risk, evidence_index, digests, assessments, telematics, image_store=None):
+    """
+    Everything the claim detail view shows, gathered into one plain dict, or None
+    for an unknown claim. The evidence image is referenced by digest; passing the
+    image store also decodes its thumbnail into the store's own LRU.
+    """
+    detail = store.claim_detail(claim_no)
+    if detail is None:
+        return None
+    row = store.claim_row(claim_no)
+    evidence = evidence_index.image_for_claim(claim_no)
+    image_name = evidence[0] if evidence else None
+    digest = digests.get(image_name)
+    if digest and image_store is not None:
+        image_store.thumbnail(digest)
+    chassis = detail["policy"]["CHASSIS_NO"] if detail["policy"] else None
+    return dict(
+        detail,
+        risk_percent=risk.percent(row),
+        checks=rules.for_row(row),
+        image_name=image_name,
+        image_digest=digest,
+        assessment=assessments.get(image_name),
+        chassis=chassis,
+        live=telematics.vehicle(chassis) if chassis else None,
+    )
+
+
+def _payload_bytes(payload):
+    return len(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class DetailCache:
+    """
+    Process-wide cache of assembled claim detail payloads, keyed by claim_no.
+
+    Entries live in a byte-bounded LRU with a TTL. Registered as a ClaimsStore
+    and telematics listener it drops a claim's payload when its status changes or
+    new readings arrive for its vehicle, and every payload when claims are added
+    or claim columns replaced; `invalidate` covers writes made elsewhere, such as
+    a logged decision. Concurrent requests for the same claim
+    share one build, and `prefetch` assembles claims on a background thread
+    before anyone asks for them. Builders are passed per call so they can close
+    over the caller's current data versions.
+    """
+
+    def __init__(self, max_bytes=DETAIL_CACHE_BYTES, ttl=DETAIL_TTL_SECONDS, prefetch_workers=PREFETCH_WORKERS):
+        self.entries = ByteLRU(max_bytes, ttl)
+        self.invalidations = 0
+        self.prefetched = 0
+        self._by_chassis = {}
+        self._building = {}
+        self._stale = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(prefetch_workers, thread_name_prefix="detail-prefetch")
+
+    def __len__(self):
+        return len(self.entries)
+
+    # --- READ SIDE ---
+    def get(self, claim_no, build):
+        """The cached payload, or `build(claim_no)` stored for the next reader."""
+        payload = self.entries.get(claim_no)
+        if payload is not None:
+            return payload
+        return self._load(claim_no, build).result()
+
+    def prefetch(self, claim_nos, build):
+        """Queues background builds for the claims not cached or being built; returns how many."""
+        queued = 0
+        for claim_no in claim_nos:
+            with self._lock:
+                if claim_no in self._building or claim_no in self.entries:
+                    continue
+            self._executor.submit(self._load, claim_no, build, True)
+            queued += 1
+        return queued
+
+    def _load(self, claim_no, build, prefetch=False):
+        with self._lock:
+            future = self._building.get(claim_no)
+            if future is not None:
+                return future
+            future = self._building[claim_no] = Future()
+        try:
+            payload = build(claim_no)
+        except BaseException as error:
+            with self._lock:
+                del self._building[claim_no]
+                self._stale.discard(claim_no)
+            future.set_exception(error)
+            return future
+        with self._lock:
+            del self._building[claim_no]
+            # An invalidation during the build means the payload may predate the change
+            if payload is not None and claim_no not in self._stale:
+                self.entries.put(claim_no, payload, _payload_bytes(payload))
+                if payload["chassis"]:
+                    self._by_chassis.setdefault(payload["chassis"], set()).add(claim_no)
+                self.prefetched += prefetch
+            self._stale.discard(claim_no)
+        future.set_result(payload)
+        return future
+
+    # --- INVALIDATION ---
+    def invalidate(self, claim_no):
+        with self._lock:
+            if claim_no in self._building:
+                self._stale.add(claim_no)
+            self.invalidations += self.entries.discard(claim_no)
+
+    def invalidate_chassis(self, chassis_nos):
+        with self._lock:
+            claim_nos = [c for chassis in chassis_nos for c in self._by_chassis.pop(chassis, ())]
+        for claim_no in claim_nos:
+            self.invalidate(claim_no)
+
+    def clear(self):
+        with self._lock:
+            self._stale.update(self._building)
+            self._by_chassis.clear()
+            self.invalidations += self.entries.clear()
+
+    # --- ClaimsStore listener interface ---
+    def claims_added(self, records):
+        # A new claim changes the duplicate signals of every claim sharing its
+        # policy, vehicle or (near-identical) image, which can be most of them
+        self.clear()
+
+    def status_changed(self, record, old_status):
+        self.invalidate(record["claim_no"])
+
+    def columns_changed(self, names):
+        self.clear()
+
+    # --- Telematics listener interface ---
+    def readings_ingested(self, chassis_nos):
+        self.invalidate_chassis(chassis_nos)
+
+    def stats(self):
+        return dict(self.entries.stats(), invalidations=self.invalidations, prefetched=self.prefetched)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,445 @@
+import os
+import threading
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+# Key of the perceptual hash in ImageStore.analyze
+PERCEPTUAL_HASH_ANALYSIS = "perceptual_hash"
+# dHash grid: HASH_SIZE x HASH_SIZE brightness gradients -> a 64-bit hash
+HASH_SIZE = 8
+# Images this many bits apart or fewer count as near-duplicates. Re-encoded or
+# resized copies land within a few bits; distinct photos are 20+ bits apart.
+MAX_HAMMING_DISTANCE = 6
+# Content digests (comma-separated SHA-256) of known sample or placeholder pictures:
+# finding one on other vehicles' claims warns instead of failing
+COMMON_IMAGE_DIGESTS = frozenset(
+    digest.strip() for digest in os.environ.get("SMART_CLAIMS_COMMON_IMAGES", "").split(",") if digest.strip()
+)
+# Totals this close (relative) count as the same amount
+AMOUNT_TOLERANCE = 0.01
+# Entries added after a build are scanned linearly until there are this many
+TAIL_LIMIT = 1024
+# From this many hashes on, bands are looked up through a bucket offset table
+# (4 bytes per possible band value) instead of binary searches
+OFFSET_TABLE_MIN = 2**16
+# Bulk queries are probed this many at a time (bounds the memory of a bulk pass)
+_QUERY_BATCH = 4096
+
+_NAT_DAY = np.iinfo(np.int64).min
+
+
+def perceptual_hash(source):
+    """
+    64-bit difference hash (dHash) of an image file: whether brightness rises
+    left to right between neighbouring cells of a 9x8 grayscale thumbnail. It
+    survives re-encoding, resizing and small edits, unlike the content digest.
+    """
+    image = Image.open(source)
+    image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))  # JPEGs decode straight to a small scale
+    image = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(image, dtype=np.int16)
+    return int(np.packbits((pixels[:, 1:] > pixels[:, :-1]).ravel()).view(">u8")[0])
+
+
+def fingerprint_images(image_store, digests):
+    """{digest: perceptual hash} of the stored images among `digests`, each hashed once per store."""
+    digests = [d for d in dict.fromkeys(digests) if d and d in image_store]
+    hashes = image_store.analyze_many(
+        PERCEPTUAL_HASH_ANALYSIS, digests, lambda files: [perceptual_hash(source) for source in files]
+    )
+    return dict(zip(digests, hashes))
+
+
+def claim_digests(image_names, evidence_digests, uploaded=None):
+    """
+    Content digest of every claim's evidence (object array, None without one):
+    image names mapped through {name: digest}, with the digests of uploads
+    (aligned with the claims, None where there was none) taking precedence.
+    """
+    digests = pd.Series(image_names, dtype=object).map(evidence_digests).to_numpy(dtype=object)
+    digests = np.where(pd.isna(digests), None, digests)
+    if uploaded is not None:
+        digests = np.where(pd.notna(uploaded), uploaded, digests)
+    return digests
+
+
+def _bands(max_distance, bits=HASH_SIZE * HASH_SIZE):
+    """
+    (shift, mask, probes) of the near-equal bit bands a hash is split into:
+    max_distance // 2 of them (at least three, so a band value fits an offset
+    table), each searched within max_distance // count bits, `probes` being the
+    XOR masks that cover that.
+    """
+    count = max(max_distance // 2, 3)
+    radius = max_distance // count
+    widths = [bits // count + (i < bits % count) for i in range(count)]
+    bands = []
+    for i, width in enumerate(widths):
+        probes = [sum(1 << b for b in flipped) for r in range(radius + 1) for flipped in combinations(range(width), r)]
+        bands.append((sum(widths[:i]), (1 << width) - 1, np.array(probes, dtype=np.uint32)))
+    return bands
+
+
+def _ranges(lo, hi):
+    """Concatenation of arange(lo[i], hi[i]) plus the owner i of every element."""
+    counts = np.maximum(hi - lo, 0)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + lo[owner], owner
+
+
+def _offsets(values, mask):
+    """Offset table of band values: starts[v]:starts[v + 1] are the sorted positions with value v."""
+    starts = np.zeros(mask + 2, dtype=np.int32)
+    np.cumsum(np.bincount(values, minlength=mask + 1), out=starts[1:])
+    return starts
+
+
+class HammingIndex:
+    """
+    Near-duplicate search over 64-bit perceptual hashes.
+
+    Hashes are kept bit-packed, one uint64 per entry. Multi-index hashing splits
+    each hash into m bands: two hashes within max_distance bits differ by at most
+    max_distance // m bits in at least one band (pigeonhole), so a query visits
+    only the entries whose band value is that close to its own, found by binary
+    searches for every such value over the band's sorted values, and confirms
+    them with a popcount. A few wide bands keep the candidates few; large
+    indexes map each band value straight to its rows through an offset table
+    (CSR) rather than binary searching for each of the probed values. Entries
+    added after the build sit in a tail that is scanned linearly and folded into
+    the bands once it reaches TAIL_LIMIT.
+    """
+
+    def __init__(self, hashes=(), max_distance=MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self._bands = _bands(max_distance)
+        self._lock = threading.Lock()
+        self._build(np.asarray(hashes, dtype=np.uint64))
+
+    def _build(self, hashes):
+        band_values, band_rows = [], []
+        for shift, mask, _ in self._bands:
+            values = ((hashes >> np.uint64(shift)) & np.uint64(mask)).astype(np.uint32)
+            order = np.argsort(values, kind="stable")
+            band_values.append(_offsets(values, mask) if len(hashes) >= OFFSET_TABLE_MIN else values[order])
+            band_rows.append(order.astype(np.int32))
+        self.hashes, self._tail = hashes, np.zeros(0, dtype=np.uint64)
+        self._band_values, self._band_rows = band_values, band_rows
+
+    def __len__(self):
+        return len(self.hashes) + len(self._tail)
+
+    def nbytes(self):
+        return self.hashes.nbytes + sum(v.nbytes + r.nbytes for v, r in zip(self._band_values, self._band_rows))
+
+    def add(self, fingerprint):
+        """Appends one hash; returns its entry position."""
+        with self._lock:
+            self._tail = np.append(self._tail, np.uint64(fingerprint))
+            position = len(self.hashes) + len(self._tail) - 1
+            if len(self._tail) >= TAIL_LIMIT:
+                self._build(np.concatenate([self.hashes, self._tail]))
+            return position
+
+    def bulk_query(self, fingerprints):
+        """
+        Every entry within max_distance bits of each fingerprint: flat arrays
+        (query position, entry position, distance), by query then distance.
+        """
+        queries = np.atleast_1d(np.asarray(fingerprints, dtype=np.uint64))
+        with self._lock:
+            hashes, tail, band_values, band_rows = self.hashes, self._tail, self._band_values, self._band_rows
+        tabled = len(hashes) >= OFFSET_TABLE_MIN
+        if not tabled and len(queries) * len(self._bands[0][2]) > self._bands[0][1] // 4:
+            # A bulk pass probing most band values builds the tables on the fly
+            band_values = [_offsets(values, mask) for (_, mask, _), values in zip(self._bands, band_values)]
+            tabled = True
+        results = [
+            self._query_batch(queries[first:first + _QUERY_BATCH], hashes, tail, band_values, band_rows, tabled)
+            for first in range(0, len(queries), _QUERY_BATCH)
+        ]
+        if not results:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        query, entry, distance = (np.concatenate(column) for column in zip(*results))
+        offsets = np.repeat(np.arange(0, len(queries), _QUERY_BATCH), [len(r[0]) for r in results])
+        return query + offsets, entry, distance
+
+    def _query_batch(self, queries, hashes, tail, band_values, band_rows, tabled):
+        owners, entries = [], []
+        for (shift, mask, probes), values, rows in zip(self._bands, band_values, band_rows):
+            probe = (((queries >> np.uint64(shift)) & np.uint64(mask)).astype(np.uint32)[:, None] ^ probes).ravel()
+            if tabled:
+                lo, hi = values[probe], values[probe + 1]
+            else:
+                lo, hi = np.searchsorted(values, probe, "left"), np.searchsorted(values, probe, "right")
+            positions, owner = _ranges(lo.astype(np.int64), hi.astype(np.int64))
+            owners.append(owner // len(probes))
+            entries.append(rows[positions])
+        query, entry = np.concatenate(owners), np.concatenate(entries).astype(np.int64)
+        distance = np.bitwise_count(queries[query] ^ hashes[entry])
+        # An entry close to the query in several bands is one match
+        near = distance <= self.max_distance
+        _, first = np.unique(query[near] * max(len(hashes), 1) + entry[near], return_index=True)
+        query, entry, distance = query[near][first], entry[near][first], distance[near][first]
+        if len(tail):
+            tail_distance = np.bitwise_count(queries[:, None] ^ tail[None, :])
+            tail_query, tail_entry = np.nonzero(tail_distance <= self.max_distance)
+            query = np.concatenate([query, tail_query])
+            entry = np.concatenate([entry, tail_entry + len(hashes)])
+            distance = np.concatenate([distance, tail_distance[tail_query, tail_entry]])
+        order = np.lexsort((distance, query))
+        return query[order], entry[order], distance[order].astype(np.int64)
+
+    def query(self, fingerprint):
+        """(entry positions, distances) within max_distance bits of one hash, closest first."""
+        _, entry, distance = self.bulk_query([fingerprint])
+        return entry, distance
+
+
+class _SortedKeys:
+    """
+    Sorted int64 keys with a row (and optional value) per key, plus an unsorted
+    tail of recent additions merged in at TAIL_LIMIT. Counting or listing the
+    entries of a key range is one binary search per bound.
+    """
+
+    def __init__(self, keys, rows, values=None):
+        order = np.lexsort((values, keys)) if values is not None else np.argsort(keys, kind="stable")
+        self.keys, self.rows = keys[order], rows[order]
+        self.values = values[order] if values is not None else None
+        self.tail = []
+
+    def add(self, key, row, value=None):
+        self.tail.append((key, row, value))
+        if len(self.tail) >= TAIL_LIMIT:
+            keys, rows, values = (np.array(column) for column in zip(*self.tail))
+            merged = _SortedKeys(
+                np.concatenate([self.keys, keys.astype(np.int64)]), np.concatenate([self.rows, rows.astype(np.int64)]),
+                np.concatenate([self.values, values.astype(np.float64)]) if self.values is not None else None,
+            )
+            self.keys, self.rows, self.values, self.tail = merged.keys, merged.rows, merged.values, []
+
+    def count(self, lo_keys, hi_keys):
+        """Number of entries with lo <= key < hi, per (lo, hi) pair."""
+        counts = np.searchsorted(self.keys, hi_keys, "left") - np.searchsorted(self.keys, lo_keys, "left")
+        if self.tail:
+            tail = np.array([key for key, _, _ in self.tail], dtype=np.int64)
+            counts += ((tail >= np.asarray(lo_keys)[..., None]) & (tail < np.asarray(hi_keys)[..., None])).sum(-1)
+        return counts
+
+    def entries(self, key):
+        """(rows, values) of every entry with exactly `key`."""
+        lo, hi = np.searchsorted(self.keys, key, "left"), np.searchsorted(self.keys, key, "right")
+        rows = [int(r) for r in self.rows[lo:hi]] + [row for k, row, _ in self.tail if k == key]
+        values = [] if self.values is None else [float(v) for v in self.values[lo:hi]]
+        return rows, values + [value for k, _, value in self.tail if k == key]
+
+
+class DuplicateIndex:
+    """
+    Shared-evidence and repeated-claim detection over every known claim.
+
+    Each claim's evidence is fingerprinted twice: the SHA-256 content digest
+    (the same file, whatever it is called) and a perceptual hash (re-encoded,
+    resized or lightly edited copies), kept in a HammingIndex over the distinct
+    images. Claims are looked up through two composite int64 keys: (digest,
+    chassis) counts how many claims, and how many other vehicles, used an image;
+    (policy, incident day) finds earlier claims for the same incident, whose
+    totals are then compared within AMOUNT_TOLERANCE. Codes are assigned as
+    values are first seen, so claims submitted later are added as they arrive.
+    Images whose digest is in `common_images` are flagged as such.
+    """
+
+    def __init__(self, claim_no, policy_no, chassis_no, incident_date, total, digests, fingerprints,
+                 max_distance=MAX_HAMMING_DISTANCE, common_images=COMMON_IMAGE_DIGESTS):
+        self._lock = threading.Lock()
+        self.common_images = frozenset(common_images)
+        self.claim_nos = list(claim_no)
+        self.indexed = len(self.claim_nos)
+        self._policies, policy = self._factorize(policy_no)
+        self._chassis, chassis = self._factorize(chassis_no)
+        self._digests, digest = self._factorize(digests)
+        rows = np.arange(self.indexed, dtype=np.int64)
+
+        # Chassis codes are shifted by one so an unknown vehicle (0) matches nobody
+        self.claim_digest, self.claim_chassis = digest, chassis + 1
+        has_image = digest >= 0
+        self._images = _SortedKeys((digest[has_image] << 32) | self.claim_chassis[has_image], rows[has_image])
+        day = np.asarray(incident_date, dtype="datetime64[D]").astype(np.int64)
+        dated = (policy >= 0) & (day != _NAT_DAY)
+        total = np.asarray(total, dtype=np.float64)
+        self._records = _SortedKeys((policy[dated] << 32) | (day[dated] & 0xFFFFFFFF), rows[dated], total[dated])
+
+        # Perceptual hashes of the distinct images, and the digest code of each entry
+        known = [code for digest, code in self._digests.items() if digest in fingerprints]
+        self.hamming = HammingIndex([fingerprints[d] for d in self._digests if d in fingerprints], max_distance)
+        self._hamming_digest = np.array(known, dtype=np.int64)
+
+    @staticmethod
+    def _factorize(values):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        return dict(zip(uniques.tolist(), range(len(uniques)))), codes.astype(np.int64)
+
+    @classmethod
+    def from_store(cls, store, digests, fingerprints, max_distance=MAX_HAMMING_DISTANCE,
+                   common_images=COMMON_IMAGE_DIGESTS):
+        """Index over the store's claims; `digests` is each claim's evidence digest (see `claim_digests`)."""
+        claims, policy_row = store.claims, store.claim_policy_row.astype(np.int64)
+        chassis = store.policies["CHASSIS_NO"].to_numpy(dtype=object)[np.clip(policy_row, 0, None)]
+        return cls(
+            claims["claim_no"].to_numpy(dtype=object), claims["policy_no"].to_numpy(dtype=object),
+            np.where(policy_row >= 0, chassis, None), claims["date"].to_numpy(), claims["total"].to_numpy(),
+            digests, fingerprints, max_distance, common_images,
+        )
+
+    def __len__(self):
+        return len(self.claim_nos)
+
+    def _image_claims(self, digest, chassis=None):
+        """Claims that used each digest code (on each chassis code, when given)."""
+        digest = np.asarray(digest, dtype=np.int64)
+        if chassis is None:
+            counts = self._images.count(digest << 32, (digest + 1) << 32)
+        else:
+            key = (digest << 32) | np.asarray(chassis, dtype=np.int64)
+            counts = self._images.count(key, key + 1)
+        return np.where(digest >= 0, counts, 0)
+
+    def _similar_claims(self, entries):
+        """Claims whose image is a near-duplicate (not an exact copy) of each hamming entry's image."""
+        query, entry, _ = self.hamming.bulk_query(self.hamming.hashes[entries] if len(entries) else [])
+        other = entry != entries[query]
+        digests = self._hamming_digest[entry[other]]
+        return np.bincount(query[other], weights=self._image_claims(digests), minlength=len(entries)).astype(np.int64)
+
+    # --- BULK ---
+    def matches(self, record_rows=False):
+        """
+        Duplicate signals of every claim the index was built with (arrays aligned
+        with its input rows): claims and other vehicles' claims that filed the same
+        image, claims with a near-duplicate image, and the claim number of the
+        earliest-filed (lowest row) claim with the same policy, incident date and
+        amount, None for that first claim itself and for claims without one. With
+        `record_rows` that claim is given as its input row instead (-1 for none).
+        """
+        with self._lock:
+            digest, chassis = self.claim_digest, self.claim_chassis
+            common = np.array([d in self.common_images for d in self._digests] + [False])  # code -1 -> last
+            same_image = self._image_claims(digest)
+            same_vehicle = np.where(chassis > 0, self._image_claims(digest, chassis), np.minimum(same_image, 1))
+            # Near-duplicates are searched once per distinct image, then spread to its claims
+            entries = np.arange(len(self.hamming.hashes), dtype=np.int64)
+            similar = np.zeros(len(self._digests) + 1, dtype=np.int64)  # code -1 (no image) -> last slot
+            similar[self._hamming_digest[:len(entries)]] = self._similar_claims(entries)
+            return {
+                "duplicate_image_claims": np.maximum(same_image - 1, 0),
+                "duplicate_image_vehicles": same_image - same_vehicle,
+                "similar_image_claims": similar[digest],
+                "common_image": common[digest].astype(np.int64),
+                "duplicate_record": self._record_matches(record_rows),
+            }
+
+    def _record_matches(self, rows_only=False):
+        """Claim number (or row) of the first claim this one repeats, per indexed claim."""
+        records = self._records
+        keys = np.concatenate([records.keys, np.array([k for k, _, _ in records.tail], dtype=np.int64)])
+        rows = np.concatenate([records.rows, np.array([r for _, r, _ in records.tail], dtype=np.int64)])
+        totals = np.concatenate([records.values, np.array([v for _, _, v in records.tail], dtype=np.float64)])
+        order = np.lexsort((rows, keys))
+        keys, rows, totals = keys[order], rows[order], totals[order]
+        # Each claim is compared with every earlier-filed claim of its incident, pairwise
+        # as in `_record_match`, and points to the first one within AMOUNT_TOLERANCE
+        first_of_incident = np.r_[True, keys[1:] != keys[:-1]][:len(keys)]
+        starts, group = np.flatnonzero(first_of_incident), np.cumsum(first_of_incident) - 1
+        later = np.flatnonzero(~first_of_incident)
+        earlier, owner = _ranges(starts[group[later]], later)
+        a, b = totals[later[owner]], totals[earlier]
+        close = np.abs(a - b) <= AMOUNT_TOLERANCE * np.maximum(np.abs(a), np.abs(b))
+        # Pairs run in filing order per claim, so its first close pair is the earliest repeat
+        repeats, first = np.unique(owner[close], return_index=True)
+        match = np.full(len(self.claim_nos), -1, dtype=np.int64)
+        match[rows[later[repeats]]] = rows[earlier[close][first]]
+        if rows_only:
+            return match[:self.indexed]
+        claim_nos = np.asarray(self.claim_nos + [None], dtype=object)
+        return claim_nos[match[:self.indexed]]
+
+    # --- ONE CLAIM ---
+    def match(self, policy_no, chassis_no, incident_date, total, digest=None, fingerprint=None):
+        """Duplicate signals of one claim not in the index yet, as one-element arrays like `matches`."""
+        with self._lock:
+            return self._match(policy_no, chassis_no, incident_date, total, digest, fingerprint)
+
+    def match_and_add(self, claim_no, policy_no, chassis_no, incident_date, total, digest=None, fingerprint=None):
+        """
+        `match` then `add` under one lock, so of two duplicate submissions analyzed
+        at the same time the second is always matched against the first.
+        """
+        with self._lock:
+            matches = self._match(policy_no, chassis_no, incident_date, total, digest, fingerprint)
+            self._add(claim_no, policy_no, chassis_no, incident_date, total, digest, fingerprint)
+        return matches
+
+    def _match(self, policy_no, chassis_no, incident_date, total, digest, fingerprint):
+        code = self._digests.get(digest, -1) if digest else -1
+        chassis = self._chassis.get(chassis_no, -1) + 1 if chassis_no else 0
+        same_image = int(self._image_claims([code])[0])
+        same_vehicle = int(self._image_claims([code], [chassis])[0]) if chassis else 0
+        similar = 0
+        if fingerprint is not None:
+            entry, _ = self.hamming.query(fingerprint)
+            digests = self._hamming_digest[entry]
+            similar = int(self._image_claims(digests[digests != code]).sum())
+        record = self._record_match(policy_no, incident_date, total)
+        return {
+            "duplicate_image_claims": np.array([same_image]),
+            "duplicate_image_vehicles": np.array([same_image - same_vehicle]),
+            "similar_image_claims": np.array([similar]),
+            "common_image": np.array([int(bool(digest) and digest in self.common_images)]),
+            "duplicate_record": np.array([record], dtype=object),
+        }
+
+    def _record_match(self, policy_no, incident_date, total):
+        policy = self._policies.get(policy_no)
+        day = np.datetime64(pd.Timestamp(incident_date).date(), "D").astype(np.int64)
+        if policy is None:
+            return None
+        rows, totals = self._records.entries((policy << 32) | (day & 0xFFFFFFFF))
+        repeated = [row for row, other in zip(rows, totals)
+                    if abs(other - float(total)) <= AMOUNT_TOLERANCE * max(abs(other), abs(float(total)))]
+        return self.claim_nos[min(repeated)] if repeated else None
+
+    def add(self, claim_no, policy_no, chassis_no, incident_date, total, digest=None, fingerprint=None):
+        """Indexes a newly submitted claim so later submissions are matched against it."""
+        with self._lock:
+            self._add(claim_no, policy_no, chassis_no, incident_date, total, digest, fingerprint)
+
+    def _add(self, claim_no, policy_no, chassis_no, incident_date, total, digest, fingerprint):
+        row = len(self.claim_nos)
+        self.claim_nos.append(claim_no)
+        policy = self._policies.setdefault(policy_no, len(self._policies))
+        chassis = self._chassis.setdefault(chassis_no, len(self._chassis)) + 1 if chassis_no else 0
+        if digest:
+            new = digest not in self._digests
+            code = self._digests.setdefault(digest, len(self._digests))
+            self._images.add((code << 32) | chassis, row)
+            if new and fingerprint is not None:
+                self.hamming.add(fingerprint)
+                self._hamming_digest = np.append(self._hamming_digest, code)
+        day = np.datetime64(pd.Timestamp(incident_date).date(), "D").astype(np.int64)
+        self._records.add((policy << 32) | (int(day) & 0xFFFFFFFF), row, float(total))
+
+
+def check_submission(index, store, claim_no, submission, fingerprint=None):
+    """
+    Matches a submitted claim (policy_no, claim_date, total, image_digest) against
+    the index and adds it, atomically; returns the `match` signals for the rule engine.
+    """
+    policy_row = store.policy_index.last(str(submission["policy_no"]).strip())
+    chassis = store.policies["CHASSIS_NO"].iat[policy_row] if policy_row >= 0 else None
+    fields = (str(submission["policy_no"]).strip(), chassis, submission["claim_date"], float(submission["total"]),
+              submission.get("image_digest"), fingerprint)
+    return index.match_and_add(claim_no, *fields)
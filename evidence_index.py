@@ -0,0 +1,207 @@
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from claims_store import CACHE_DIR, DATA_DIR
+
+IMAGE_METADATA_PATH = os.path.join(DATA_DIR, "claims", "metadata", "image_metadata.csv")
+EVIDENCE_INDEX_PATH = os.path.join(CACHE_DIR, "evidence_index.bin")
+
+_MAGIC = b"EVIDX001"
+_ALIGN = 64
+
+
+def _sorted_keys(values):
+    """Factorizes strings into sorted fixed-width byte keys; returns (keys, code of each value)."""
+    uniques, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return np.char.encode(uniques, "ascii"), codes.astype(np.int32)
+
+
+def _csr(codes, count):
+    """Groups row positions by code: returns (offsets, rows) with rows sorted within each group."""
+    rows = np.argsort(codes, kind="stable").astype(np.int32)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=count), out=offsets[1:])
+    return offsets, rows
+
+
+def _find(keys, key):
+    """Position of `key` in the sorted byte-key array, or -1."""
+    key = key.encode("ascii", "replace") if isinstance(key, str) else key
+    position = int(np.searchsorted(keys, key))
+    return position if position < len(keys) and keys[position] == key else -1
+
+
+def _decode(keys):
+    # Per-item bytes.decode beats np.char.decode for the small lists lookups return
+    return [key.decode() for key in keys.tolist()]
+
+
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class EvidenceIndex:
+    """
+    Claim ↔ evidence image ↔ chassis join index over image_metadata.csv.
+
+    Claim numbers, image names and chassis numbers are stored once as sorted
+    fixed-width byte arrays and referenced by int32 codes. The one-to-many
+    directions (image→claims, chassis→claims) are CSR offset/row arrays, so every
+    lookup is a binary search plus a slice. All arrays live in one flat file that
+    `open` memory-maps, so a new process only pays for the pages it touches.
+    """
+
+    ARRAYS = [
+        "claim_keys", "claim_image", "claim_chassis",
+        "image_keys", "image_ids", "image_offsets", "image_claims",
+        "chassis_keys", "chassis_offsets", "chassis_claims",
+    ]
+
+    def __init__(self, arrays, source=None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.source = source or {}
+
+    @classmethod
+    def build(cls, path=IMAGE_METADATA_PATH):
+        """Parses the CSV and builds every array (the only step that touches pandas)."""
+        metadata = pd.read_csv(path, usecols=["image_name", "image_id", "claim_no", "chassis_no"], dtype=str)
+        # A claim listed twice keeps its last row, matching the other claim joins
+        metadata = metadata.drop_duplicates("claim_no", keep="last")
+        claim_keys, claim_codes = _sorted_keys(metadata["claim_no"])
+        image_keys, image_codes = _sorted_keys(metadata["image_name"])
+        chassis_keys, chassis_codes = _sorted_keys(metadata["chassis_no"])
+
+        # Re-order the per-claim columns by claim key
+        by_claim = np.empty(len(claim_codes), dtype=np.int64)
+        by_claim[claim_codes] = np.arange(len(claim_codes))
+        claim_image, claim_chassis = image_codes[by_claim], chassis_codes[by_claim]
+
+        image_ids = np.zeros(len(image_keys), dtype=np.int64)
+        image_ids[image_codes] = pd.to_numeric(metadata["image_id"]).to_numpy(dtype=np.int64)
+        image_offsets, image_claims = _csr(claim_image, len(image_keys))
+        chassis_offsets, chassis_claims = _csr(claim_chassis, len(chassis_keys))
+        return cls({
+            "claim_keys": claim_keys, "claim_image": claim_image, "claim_chassis": claim_chassis,
+            "image_keys": image_keys, "image_ids": image_ids,
+            "image_offsets": image_offsets, "image_claims": image_claims,
+            "chassis_keys": chassis_keys, "chassis_offsets": chassis_offsets, "chassis_claims": chassis_claims,
+        }, _source_fingerprint(path))
+
+    # --- PERSISTENCE ---
+    def save(self, path=EVIDENCE_INDEX_PATH):
+        """
+        Writes the arrays to one file: magic, header length, JSON header (dtype,
+        shape and offset of each array, source fingerprint), then the raw arrays
+        aligned to 64 bytes. Written to a temp file and renamed into place.
+        """
+        header, offset, arrays = {"source": self.source, "arrays": {}}, 0, []
+        for name in self.ARRAYS:
+            array = np.ascontiguousarray(getattr(self, name))
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            arrays.append(array)
+            offset += -(-array.nbytes // _ALIGN) * _ALIGN
+        encoded = json.dumps(header).encode()
+        data_start = -(-(len(_MAGIC) + 8 + len(encoded)) // _ALIGN) * _ALIGN
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, "wb") as out:
+            out.write(_MAGIC + len(encoded).to_bytes(8, "little") + encoded)
+            for name, array in zip(self.ARRAYS, arrays):
+                out.seek(data_start + header["arrays"][name]["offset"])
+                out.write(array.tobytes())
+            out.truncate(data_start + offset)
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path=EVIDENCE_INDEX_PATH):
+        """Memory-maps a saved index; arrays are read-only views into the file."""
+        with open(path, "rb") as source:
+            if source.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not an evidence index file")
+            length = int.from_bytes(source.read(8), "little")
+            header = json.loads(source.read(length))
+        data_start = -(-(len(_MAGIC) + 8 + length) // _ALIGN) * _ALIGN
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = data_start + spec["offset"]
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            arrays[name] = mapped[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return cls(arrays, header["source"])
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    # --- LOOKUPS ---
+    def __len__(self):
+        return len(self.claim_keys)
+
+    def image_for_claim(self, claim_no):
+        """Returns (image_name, image_id) of the claim's evidence image, or None."""
+        position = _find(self.claim_keys, claim_no)
+        if position < 0:
+            return None
+        image = self.claim_image[position]
+        return self.image_keys[image].decode(), int(self.image_ids[image])
+
+    def chassis_for_claim(self, claim_no):
+        position = _find(self.claim_keys, claim_no)
+        return self.chassis_keys[self.claim_chassis[position]].decode() if position >= 0 else None
+
+    def claim_positions_for_image(self, image_name):
+        """Positions in `claim_keys` of the claims using `image_name` (a zero-copy slice)."""
+        image = _find(self.image_keys, image_name)
+        if image < 0:
+            return self.image_claims[:0]
+        return self.image_claims[self.image_offsets[image]:self.image_offsets[image + 1]]
+
+    def claims_for_image(self, image_name):
+        """Claim numbers whose evidence is `image_name` (sorted)."""
+        return _decode(self.claim_keys[self.claim_positions_for_image(image_name)])
+
+    def claims_for_chassis(self, chassis_no):
+        chassis = _find(self.chassis_keys, chassis_no)
+        if chassis < 0:
+            return []
+        rows = self.chassis_claims[self.chassis_offsets[chassis]:self.chassis_offsets[chassis + 1]]
+        return _decode(self.claim_keys[rows])
+
+    def images_for_claims(self, claim_nos):
+        """Vectorized claim→image: object array of image names, None where a claim has none."""
+        keys = np.char.encode(np.asarray(claim_nos, dtype=object).astype(str), "ascii")
+        positions = np.searchsorted(self.claim_keys, keys).clip(max=max(len(self.claim_keys) - 1, 0))
+        found = self.claim_keys[positions] == keys if len(self.claim_keys) else np.zeros(len(keys), bool)
+        names = np.full(len(keys), None, dtype=object)
+        images = self.claim_image[positions[found]]
+        names[found] = np.char.decode(self.image_keys, "ascii").astype(object)[images]
+        return names
+
+
+def load_evidence_index(path=IMAGE_METADATA_PATH, index_path=EVIDENCE_INDEX_PATH):
+    """
+    Opens the persisted index, rebuilding it first when it is missing or was
+    built from a different version of the CSV. Sets `.load_seconds` and `.rebuilt`.
+    """
+    started = time.perf_counter()
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = EvidenceIndex.open(index_path)
+        except (ValueError, OSError):
+            index = None
+    rebuilt = index is None or index.source != _source_fingerprint(path)
+    if rebuilt:
+        EvidenceIndex.build(path).save(index_path)
+        index = EvidenceIndex.open(index_path)
+    index.load_seconds = time.perf_counter() - started
+    index.rebuilt = rebuilt
+    return index
@@ -0,0 +1,233 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+# --- LOCATION CHECK DEFAULTS ---
+# A GPS fix this close to the stated location around the incident verifies it
+LOCATION_RADIUS_KM = 10.0
+GRID_CELL_KM = 1.0
+# Bulk area queries are probed this many at a time, and their candidate readings
+# gathered in slices of about this many (bounds the memory of a bulk pass)
+_QUERY_BATCH = 1024
+_CANDIDATE_BATCH = 4_000_000
+# Keys are built this many points at a time to keep the float temporaries small
+_BUILD_CHUNK = 8_000_000
+
+# Place names the forms may carry -> (latitude, longitude). The fleet's
+# telematics are recorded in New York City; the rest are common form entries.
+PLACES = {
+    "new york": (40.7128, -74.0060),
+    "new york city": (40.7128, -74.0060),
+    "nyc": (40.7128, -74.0060),
+    "manhattan": (40.7831, -73.9712),
+    "brooklyn": (40.6782, -73.9442),
+    "queens": (40.7282, -73.7949),
+    "bronx": (40.8448, -73.8648),
+    "the bronx": (40.8448, -73.8648),
+    "staten island": (40.5795, -74.1502),
+    "jersey city": (40.7178, -74.0431),
+    "newark": (40.7357, -74.1724),
+    "munich": (48.1351, 11.5820),
+    "berlin": (52.5200, 13.4050),
+    "hamburg": (53.5511, 9.9937),
+    "frankfurt": (50.1109, 8.6821),
+    "london": (51.5074, -0.1278),
+    "paris": (48.8566, 2.3522),
+}
+_COORDINATES = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*[,;\s]\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+
+def resolve_location(text):
+    """
+    (latitude, longitude) of a stated location: literal "lat, lon" text or a
+    PLACES name (case-insensitive). None when it cannot be placed.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+    match = _COORDINATES.match(text)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+    return PLACES.get(" ".join(text.lower().replace(",", " ").split()))
+
+
+def resolve_locations(texts):
+    """Vectorized `resolve_location`: (latitudes, longitudes), NaN where unplaced. Each distinct text is resolved once."""
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object))
+    places = [resolve_location(text) or (np.nan, np.nan) for text in uniques]
+    coordinates = np.array(places + [(np.nan, np.nan)], dtype=np.float64)  # code -1 (None) -> last row
+    return coordinates[codes, 0], coordinates[codes, 1]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance in km; broadcasts over arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _ranges(lo, hi):
+    """Concatenation of arange(lo[i], hi[i]) plus the owner i of every element."""
+    counts = np.maximum(hi - lo, 0)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - starts[owner] + lo[owner], owner
+
+
+class GeoIndex:
+    """
+    Which vehicles passed an area in a time window.
+
+    GPS points are bucketed into a grid of roughly `cell_km` square cells (the
+    longitude step is scaled at the data's median latitude) and sorted by one
+    composite int64 key (cell << time_bits | seconds since the first reading),
+    so the readings of one cell inside a window are a single binary search per
+    bound. A radius query probes every cell overlapping the circle's bounding box
+    and keeps the candidates within the exact great-circle distance.
+
+    The index holds the sorted keys and an int32 permutation (12 bytes a point);
+    coordinates and vehicles are read from the caller's arrays, which it keeps
+    references to. Per-chassis questions ("was this vehicle near X") are cheaper
+    on the TelematicsIndex's own (chassis, time) order; see bulk_location_check.
+    """
+
+    def __init__(self, latitude, longitude, event_ts, vehicle, names, cell_km=GRID_CELL_KM):
+        self.latitude = np.asarray(latitude)
+        self.longitude = np.asarray(longitude)
+        self.vehicle = np.asarray(vehicle)
+        self.names = np.asarray(names, dtype=object)
+        self.cell_km = cell_km
+        event_ts = np.asarray(event_ts, dtype=np.int64)
+        n = len(event_ts)
+
+        self.epoch = int(event_ts.min()) if n else 0
+        self.time_bits = max(int(event_ts.max() - self.epoch).bit_length(), 1) if n else 1
+        self.lat_min = float(np.nanmin(self.latitude)) if n else 0.0
+        self.lon_min = float(np.nanmin(self.longitude)) if n else 0.0
+        reference = float(np.nanmedian(self.latitude[::max(n // 100_000, 1)])) if n else 0.0
+        self.lat_step = cell_km / KM_PER_DEGREE
+        self.lon_step = self.lat_step / max(np.cos(np.radians(reference)), 0.05)
+        self.rows = int((np.nanmax(self.latitude) - self.lat_min) // self.lat_step) + 1 if n else 1
+        self.cols = int((np.nanmax(self.longitude) - self.lon_min) // self.lon_step) + 1 if n else 1
+        if (self.rows * self.cols).bit_length() + self.time_bits > 63:
+            raise ValueError(f"{self.rows} x {self.cols} cells over {self.time_bits}-bit times overflow the key; "
+                             f"use a coarser cell_km")
+
+        keys = np.empty(n, dtype=np.int64)
+        for lo in range(0, n, _BUILD_CHUNK):
+            hi = min(lo + _BUILD_CHUNK, n)
+            cells = self._cell(self.latitude[lo:hi], self.longitude[lo:hi])
+            keys[lo:hi] = (cells << self.time_bits) | (event_ts[lo:hi] - self.epoch)
+        order = np.argsort(keys)
+        # Sorting the keys in place rather than gathering them saves a copy at 100M points
+        keys.sort()
+        self.keys = keys
+        self.order = order.astype(np.int32 if n < 2**31 else np.int64)
+
+    @classmethod
+    def from_telematics(cls, index, cell_km=GRID_CELL_KM):
+        """Index over a TelematicsIndex's readings (sharing its coordinate arrays)."""
+        vehicle = np.repeat(np.arange(index.vehicle_count, dtype=np.int32), np.diff(index.offsets))
+        return cls(index.latitude, index.longitude, index.event_ts, vehicle, index.chassis, cell_km)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nbytes(self):
+        return self.keys.nbytes + self.order.nbytes
+
+    def _cell(self, latitude, longitude):
+        row = ((np.asarray(latitude, dtype=np.float64) - self.lat_min) // self.lat_step).astype(np.int64)
+        col = ((np.asarray(longitude, dtype=np.float64) - self.lon_min) // self.lon_step).astype(np.int64)
+        return row * self.cols + col
+
+    def _probes(self, latitude, longitude, radius_km, start, end):
+        """
+        (lo, hi) key ranges of every grid cell overlapping each query circle's
+        bounding box, restricted to the query's window, plus the owning query.
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        radius_km = np.broadcast_to(np.asarray(radius_km, dtype=np.float64), latitude.shape)
+        lat_reach = radius_km / KM_PER_DEGREE
+        # The circle is widest in longitude at its pole-ward edge
+        edge = np.minimum(np.abs(latitude) + lat_reach, 89.9)
+        lon_reach = lat_reach / np.cos(np.radians(edge))
+        r0 = np.clip((latitude - lat_reach - self.lat_min) // self.lat_step, 0, None)
+        r1 = np.clip((latitude + lat_reach - self.lat_min) // self.lat_step, None, self.rows - 1)
+        c0 = np.clip((longitude - lon_reach - self.lon_min) // self.lon_step, 0, None)
+        c1 = np.clip((longitude + lon_reach - self.lon_min) // self.lon_step, None, self.cols - 1)
+        # Unplaced queries (NaN) and circles off the grid probe no cells
+        r0, r1, c0, c1 = (np.nan_to_num(v, nan=-1).astype(np.int64) for v in (r0, r1, c0, c1))
+        width = np.maximum(c1 - c0 + 1, 0)
+        height = np.where(np.isnan(latitude) | np.isnan(longitude), 0, np.maximum(r1 - r0 + 1, 0))
+        k, query = _ranges(np.zeros(len(latitude), dtype=np.int64), height * width)
+        step = width[query]
+        cells = (r0[query] + k // step) * self.cols + c0[query] + k % step
+
+        limit = 2**self.time_bits - 1
+        start = np.clip(np.asarray(start, dtype=np.int64) - self.epoch, 0, limit)[query]
+        end = np.clip(np.asarray(end, dtype=np.int64) - self.epoch, -1, limit)[query]
+        cells = cells << self.time_bits
+        lo = np.searchsorted(self.keys, cells | start, "left")
+        hi = np.where(end >= 0, np.searchsorted(self.keys, cells | np.maximum(end, 0), "right"), lo)
+        return lo, hi, query
+
+    def _nearest(self, latitude, longitude, radius_km, lo, hi, query):
+        """
+        Candidates of the probed key ranges within each query's radius, reduced to
+        the closest reading per (query, vehicle): (query, vehicle slot, km) arrays.
+        """
+        positions, owner = _ranges(lo, hi)
+        query = query[owner]
+        points = self.order[positions]
+        distance = distance_km(latitude[query], longitude[query], self.latitude[points], self.longitude[points])
+        near = distance <= radius_km[query]
+        # One int64 sort of the (query, vehicle) pairs, then a segmented minimum
+        pair = query[near] * len(self.names) + self.vehicle[points[near]]
+        order = np.argsort(pair)
+        pair, distance = pair[order], distance[near][order]
+        if not len(pair):
+            return pair, pair, distance
+        starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]])
+        pair, distance = pair[starts], np.minimum.reduceat(distance, starts)
+        return pair // len(self.names), pair % len(self.names), distance
+
+    def bulk_vehicles_near(self, latitude, longitude, radius_km, start, end):
+        """
+        Vehicles with a reading within `radius_km` of each query point inside its
+        [start, end] window (epoch seconds). Returns flat arrays (query position,
+        chassis number, closest distance in km), one entry per query and vehicle,
+        ordered by query and then distance.
+        """
+        latitude = np.atleast_1d(np.asarray(latitude, dtype=np.float64))
+        longitude = np.atleast_1d(np.asarray(longitude, dtype=np.float64))
+        radius_km = np.broadcast_to(np.asarray(radius_km, dtype=np.float64), latitude.shape)
+        start = np.broadcast_to(np.asarray(start, dtype=np.int64), latitude.shape)
+        end = np.broadcast_to(np.asarray(end, dtype=np.int64), latitude.shape)
+        parts = []
+        for first in range(0, len(latitude), _QUERY_BATCH):
+            batch = slice(first, first + _QUERY_BATCH)
+            lo, hi, probe_query = self._probes(latitude[batch], longitude[batch], radius_km[batch], start[batch], end[batch])
+            # Consecutive queries are grouped so a group gathers about the candidate budget
+            per_query = np.bincount(probe_query, weights=hi - lo, minlength=len(latitude[batch]))
+            group = ((np.cumsum(per_query) - per_query) // _CANDIDATE_BATCH).astype(np.int64)
+            cuts = np.searchsorted(probe_query, np.flatnonzero(np.diff(group)) + 1)
+            for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(probe_query)]):
+                query, vehicle, distance = self._nearest(latitude[batch], longitude[batch], radius_km[batch],
+                                                         lo[a:b], hi[a:b], probe_query[a:b])
+                parts.append((query + first, vehicle, distance))
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=object), np.zeros(0)
+        query, vehicle, distance = (np.concatenate(columns) for columns in zip(*parts))
+        order = np.lexsort((distance, query))
+        return query[order], self.names[vehicle[order]], distance[order]
+
+    def vehicles_near(self, latitude, longitude, radius_km, start, end):
+        """DataFrame of the vehicles that passed within `radius_km` of a point in [start, end], closest first."""
+        _, chassis, distance = self.bulk_vehicles_near([latitude], [longitude], radius_km, [start], [end])
+        return pd.DataFrame({"chassis_no": chassis, "distance_km": distance})
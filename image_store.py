@@ -0,0 +1,242 @@
+import glob
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+from PIL import Image
+
+from claims_store import CACHE_DIR, DATA_DIR
+
+IMAGE_STORE_DIR = os.path.join(CACHE_DIR, "images")
+EVIDENCE_DIR = os.path.join(DATA_DIR, "claims", "images")
+IMAGE_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png")
+
+# Longest side of the decoded thumbnails kept in memory for display
+THUMBNAIL_SIZE = 640
+THUMBNAIL_CACHE_BYTES = 64 * 2**20
+# Analysis results (or pending futures) remembered per (kind, digest), least recently used first out
+ANALYSIS_CACHE_ENTRIES = 100_000
+
+
+def content_digest(data):
+    """SHA-256 of the image bytes; identical files share one digest."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ByteLRU:
+    """
+    Least-recently-used cache bounded by the total size of its values rather
+    than their count, with an optional time-to-live per entry. Thread-safe.
+    """
+
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Membership without touching recency or the hit counters (expiry is checked by `get`)."""
+        return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self.nbytes -= self._entries.pop(key)[1]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, size, expires)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def discard(self, key):
+        """Drops the entry if present; returns whether it was."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[1]
+            return entry is not None
+
+    def clear(self):
+        """Drops every entry; returns how many there were."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.nbytes = 0
+            return dropped
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class ImageStore:
+    """
+    Content-addressed image store for uploads and evidence images.
+
+    Full-resolution files are written once per distinct content under
+    `<root>/<digest[:2]>/<digest>` and read back through read-only memory maps,
+    so decoding never copies the file into Python memory first. Downscaled,
+    already-decoded thumbnails live in a byte-bounded LRU, and `analyze` runs each
+    kind of analysis at most once per digest, however many claims share the image,
+    while its result is among the `analysis_entries` most recently used.
+    """
+
+    def __init__(self, root=IMAGE_STORE_DIR, thumbnail_size=THUMBNAIL_SIZE, cache_bytes=THUMBNAIL_CACHE_BYTES,
+                 analysis_entries=ANALYSIS_CACHE_ENTRIES):
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+        self.thumbnails = ByteLRU(cache_bytes)
+        self.analysis_entries = analysis_entries
+        self.analysis_evictions = 0
+        self._analyses = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    # --- WRITE SIDE ---
+    def put(self, data):
+        """Stores the bytes (once per distinct content) and returns their digest."""
+        digest = content_digest(data)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a reader never maps a half-written file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def put_file(self, path):
+        with open(path, "rb") as source:
+            return self.put(source.read())
+
+    def import_directory(self, directory=EVIDENCE_DIR):
+        """Stores every image of a directory; returns {file name: digest}."""
+        paths = sorted(p for pattern in IMAGE_EXTENSIONS for p in glob.glob(os.path.join(directory, pattern)))
+        return {os.path.basename(path): self.put_file(path) for path in paths}
+
+    # --- READ SIDE ---
+    @contextmanager
+    def open(self, digest):
+        """Read-only memory map of the stored file (file-like, accepted by PIL)."""
+        with open(self.path(digest), "rb") as source:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+    def read(self, digest):
+        with self.open(digest) as mapped:
+            return mapped[:]
+
+    def thumbnail(self, digest):
+        """Decoded RGB thumbnail (uint8 array) for display, served from the LRU."""
+        pixels = self.thumbnails.get(digest)
+        if pixels is None:
+            with self.open(digest) as mapped:
+                image = Image.open(mapped)
+                image.draft("RGB", (self.thumbnail_size, self.thumbnail_size))
+                image = image.convert("RGB")
+                image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                pixels = np.asarray(image)
+            self.thumbnails.put(digest, pixels, pixels.nbytes)
+        return pixels
+
+    def analyze(self, kind, digest, fn):
+        """
+        Returns `fn(mapped_file)` for the image, computing it only once per
+        (kind, digest); concurrent callers for the same image wait for the first one.
+        """
+        return self.analyze_many(kind, [digest], lambda mapped: [fn(mapped[0])])[0]
+
+    def analyze_many(self, kind, digests, fn):
+        """
+        Batch form of `analyze`: `fn(list of mapped files)` returns one result per
+        file and is called only with the digests that were never analyzed.
+        """
+        with self._lock:
+            futures, owned = [], {}
+            for digest in digests:
+                future = self._analyses.get((kind, digest))
+                if future is None:
+                    future = self._analyses[(kind, digest)] = owned[digest] = Future()
+                else:
+                    self._analyses.move_to_end((kind, digest))
+                futures.append(future)
+            # Callers already holding an evicted future still get its result
+            while len(self._analyses) > self.analysis_entries:
+                self._analyses.popitem(last=False)
+                self.analysis_evictions += 1
+        if owned:
+            try:
+                with ExitStack() as stack:
+                    mapped = [stack.enter_context(self.open(digest)) for digest in owned]
+                    results = fn(mapped)
+                for future, result in zip(owned.values(), results):
+                    future.set_result(result)
+            except Exception as exc:
+                with self._lock:
+                    for digest in owned:
+                        self._analyses.pop((kind, digest), None)  # let a later call retry
+                for future in owned.values():
+                    future.set_exception(exc)
+        return [future.result() for future in futures]
+
+    def stats(self):
+        return {
+            "thumbnails": len(self.thumbnails),
+            "thumbnail_bytes": self.thumbnails.nbytes,
+            "thumbnail_hits": self.thumbnails.hits,
+            "thumbnail_misses": self.thumbnails.misses,
+            "analyses": len(self._analyses),
+            "analysis_evictions": self.analysis_evictions,
+        }
@@ -0,0 +1,166 @@
+import functools
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from time import perf_counter
+
+import numpy as np
+
+# Off unless set; when off, `timed` returns functions untouched and `span` is a no-op
+INSTRUMENTATION_ENABLED = os.environ.get("SMART_CLAIMS_INSTRUMENTATION", "") not in ("", "0")
+# Recent durations kept per span name for the percentiles
+SPAN_SAMPLES = 1024
+SLOWEST_SPANS = 20
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = "smart_claims_span_seconds"
+
+
+class SpanStats:
+    """Running totals of one span name plus a ring of its most recent durations."""
+
+    __slots__ = ("samples", "count", "total", "max")
+
+    def __init__(self, capacity):
+        self.samples = [0.0] * capacity
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def summary(self):
+        recent = np.array(self.samples[:min(self.count, len(self.samples))])
+        quantiles = np.quantile(recent, QUANTILES) if len(recent) else [float("nan")] * len(QUANTILES)
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            **{f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, quantiles)},
+        }
+
+
+class _Span:
+    """Times one `with` block; a plain class, cheaper than a generator-based context manager."""
+
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.record(self.name, perf_counter() - self.started)
+
+
+_NO_SPAN = nullcontext()
+
+
+class Recorder:
+    """
+    Times named spans (render functions, data access, rule evaluation) into
+    per-name rings of recent durations, and keeps the slowest spans seen.
+
+    Recording is one `perf_counter` pair, a list store and a few additions;
+    percentiles are only computed when a snapshot is taken. Worker threads may
+    record alongside script runs: the ring and totals are updated without a
+    lock (each store is atomic under the GIL, so a race can at worst drop one
+    count), and the lock is only taken to update the slowest-span heap.
+    """
+
+    def __init__(self, enabled=INSTRUMENTATION_ENABLED, capacity=SPAN_SAMPLES, slowest=SLOWEST_SPANS):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.started = time.time()
+        self._spans = {}
+        self._slowest = []
+        self._slowest_size = slowest
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        stats = self._spans.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._spans.setdefault(name, SpanStats(self.capacity))
+        # Runs on every instrumented call, so kept to plain attribute updates
+        samples = stats.samples
+        samples[stats.count % len(samples)] = seconds
+        stats.count += 1
+        stats.total += seconds
+        if seconds > stats.max:
+            stats.max = seconds
+        slowest = self._slowest
+        if len(slowest) < self._slowest_size or seconds > slowest[0][0]:
+            with self._lock:
+                if len(slowest) < self._slowest_size:
+                    heapq.heappush(slowest, (seconds, time.time(), name))
+                elif seconds > slowest[0][0]:
+                    heapq.heapreplace(slowest, (seconds, time.time(), name))
+
+    def span(self, name):
+        """Context manager timing its block as `name`."""
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    def timed(self, name=None):
+        """Decorator timing every call of the function as `name` (default: its qualified name)."""
+        def decorate(fn):
+            if not self.enabled:
+                return fn
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(label, perf_counter() - started)
+            return wrapper
+        return decorate
+
+    # --- EXPORT ---
+    def snapshot(self):
+        """{span name: count, total, mean, max and percentiles in seconds}, by name."""
+        with self._lock:
+            spans = sorted(self._spans.items())
+        return {name: stats.summary() for name, stats in spans}
+
+    def slowest(self):
+        """The slowest spans recorded, slowest first: [(name, seconds, unix time)]."""
+        with self._lock:
+            return [(name, seconds, at) for seconds, at, name in sorted(self._slowest, reverse=True)]
+
+    def to_json(self):
+        return json.dumps({
+            "started": self.started,
+            "spans": self.snapshot(),
+            "slowest": [{"span": name, "seconds": seconds, "at": at} for name, seconds, at in self.slowest()],
+        })
+
+    def to_prometheus(self):
+        """Prometheus text exposition: one summary metric labelled by span."""
+        lines = [f"# HELP {METRIC_NAME} Duration of instrumented spans.", f"# TYPE {METRIC_NAME} summary"]
+        for name, stats in self.snapshot().items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{METRIC_NAME}{{span="{label}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.9g}')
+            lines.append(f'{METRIC_NAME}_sum{{span="{label}"}} {stats["total"]:.9g}')
+            lines.append(f'{METRIC_NAME}_count{{span="{label}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._spans = {}
+            self._slowest.clear()
+            self.started = time.time()
+
+
+# Process-wide recorder shared by the apps and the library modules
+RECORDER = Recorder()
+span = RECORDER.span
+timed = RECORDER.timed
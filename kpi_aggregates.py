@@ -0,0 +1,76 @@
+import numpy as np
+
+# KPI fields kept per workflow status, in display order
+KPI_FIELDS = ["claims", "total_loss", "major_damage", "amount"]
+
+
+def _contribution(record):
+    """What a single claim adds to its status bucket."""
+    severity = record["severity"]
+    return (1, int(severity == "Total Loss"), int(severity == "Major Damage"), int(record["total"]))
+
+
+class KpiAggregates:
+    """
+    Materialized KPI totals for the admin header row, kept per workflow status.
+
+    Registered as a ClaimsStore listener, it is updated in O(1) when a claim is
+    added or changes status, so rendering the header never rescans the claims
+    table. `from_claims` is the full-recompute path used to build it and to verify it.
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = buckets or {}
+
+    @classmethod
+    def from_claims(cls, claims):
+        """Full recompute over the claims table (vectorized)."""
+        severity = claims["severity"].astype(object).to_numpy()
+        status = claims["status"].astype(object).to_numpy()
+        totals = claims["total"].to_numpy(dtype=np.int64)
+        buckets = {}
+        for name in np.unique(status):
+            rows = status == name
+            buckets[name] = [
+                int(rows.sum()),
+                int((rows & (severity == "Total Loss")).sum()),
+                int((rows & (severity == "Major Damage")).sum()),
+                int(totals[rows].sum()),
+            ]
+        return cls(buckets)
+
+    # --- ClaimsStore listener interface ---
+    def claims_added(self, records):
+        for record in records:
+            self._apply(record["status"], _contribution(record), 1)
+
+    def status_changed(self, record, old_status):
+        contribution = _contribution(record)
+        self._apply(old_status, contribution, -1)
+        self._apply(record["status"], contribution, 1)
+
+    def columns_changed(self, names):
+        pass  # only derived columns change; the KPIs read source columns
+
+    def _apply(self, status, contribution, sign):
+        bucket = self.buckets.setdefault(status, [0] * len(KPI_FIELDS))
+        for i, value in enumerate(contribution):
+            bucket[i] += sign * value
+        if not any(bucket):
+            del self.buckets[status]
+
+    # --- READ SIDE ---
+    def totals(self, status=None):
+        """KPI values summed over all statuses, or for a single status."""
+        buckets = [self.buckets.get(status, [0] * len(KPI_FIELDS))] if status else self.buckets.values()
+        return dict(zip(KPI_FIELDS, (sum(values) for values in zip(*buckets)))) if buckets else dict.fromkeys(KPI_FIELDS, 0)
+
+    def snapshot(self):
+        return {status: dict(zip(KPI_FIELDS, values)) for status, values in sorted(self.buckets.items())}
+
+    def verify(self, claims):
+        """Raises AssertionError if the incremental state disagrees with a full recompute."""
+        expected = KpiAggregates.from_claims(claims).snapshot()
+        actual = self.snapshot()
+        if expected != actual:
+            raise AssertionError(f"KPI aggregates drifted: incremental {actual} != full {expected}")
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+_NAT_DAY = np.iinfo(np.int64).min
+# Batches larger than this are probed in sorted order
+_SORTED_PROBES = 4096
+
+
+def _days(values):
+    """Datetimes as int64 day numbers (NaT stays as the int64 minimum)."""
+    return np.asarray(values).astype("datetime64[D]").astype(np.int64)
+
+
+class PolicyIntervalIndex:
+    """
+    Which policy covered a vehicle on a given date.
+
+    Policies are grouped by chassis and sorted by effective date inside each
+    group. One composite int64 key (chassis code, effective day) turns "latest
+    policy of this chassis starting on or before D" into a single binary search,
+    so a whole batch of (chassis, date) pairs is answered with one `searchsorted`.
+    A running maximum of expiry days per group detects the rare overlapping terms
+    where an earlier, longer policy is the one still in force.
+    """
+
+    def __init__(self, chassis_no, eff_date, expiry_date):
+        keys, codes = np.unique(np.asarray(chassis_no), return_inverse=True)
+        starts, ends = _days(eff_date), _days(expiry_date)
+        order = np.flatnonzero((starts != _NAT_DAY) & (ends != _NAT_DAY))
+        self.base = int(starts[order].min()) if len(order) else 0
+        self.span = int(starts[order].max()) - self.base + 1 if len(order) else 1
+        composite = codes[order].astype(np.int64) * self.span + (starts[order] - self.base)
+        by_key = np.argsort(composite, kind="stable")
+        order = order[by_key]
+        ends = ends[order]
+
+        self.chassis_lookup = pd.Index(keys)
+        self.chassis_lookup.get_indexer(keys[:1])  # build the hash table now, not on the first query
+        # Day numbers and positions fit int32; only the composite key needs int64
+        self.rows = order.astype(np.int32)
+        self.codes = codes[order].astype(np.int32)
+        self.keys = composite[by_key]
+        self.ends = ends.astype(np.int32)
+        # Latest expiry among the group's policies up to each position
+        shift = self.codes.astype(np.int64) * (int(ends.max()) - int(ends.min()) + 1 if len(order) else 1)
+        self.max_ends = (np.maximum.accumulate(ends + shift) - shift).astype(np.int32)
+
+    @classmethod
+    def from_policies(cls, policies):
+        """Index over a policies table; `rows` refer to its row positions."""
+        return cls(policies["CHASSIS_NO"].to_numpy(), policies["POL_EFF_DATE"].to_numpy(), policies["POL_EXPIRY_DATE"].to_numpy())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.rows, self.codes, self.ends, self.keys, self.max_ends))
+
+    def covering_rows(self, chassis_no, dates):
+        """
+        Vectorized: row of the policy in force for each (chassis, date) pair, -1
+        when none was. Effective and expiry dates are both inclusive; when terms
+        overlap, the most recently started policy wins.
+        """
+        codes = self.chassis_lookup.get_indexer(np.asarray(chassis_no))
+        days = _days(dates)
+        usable = (codes >= 0) & (days != _NAT_DAY)
+        offset = np.clip(days - self.base, -1, self.span - 1)
+        probes = np.where(usable, codes, 0) * self.span + offset
+        if len(probes) > _SORTED_PROBES:
+            # Ascending probes let each binary search start from the previous hit,
+            # which keeps large batches cache-friendly on big indexes
+            order = np.argsort(probes, kind="stable")
+            positions = np.empty(len(probes), dtype=np.int64)
+            positions[order] = np.searchsorted(self.keys, probes[order], "right") - 1
+        else:
+            positions = np.searchsorted(self.keys, probes, "right") - 1
+        clipped = np.clip(positions, 0, None)
+        started = usable & (positions >= 0) & (self.codes[clipped] == codes)
+        covered = started & (self.ends[clipped] >= days)
+        result = np.where(covered, self.rows[clipped], -1)
+        # Overlapping terms: an earlier policy of the same chassis may still be in force
+        for i in np.flatnonzero(started & ~covered & (self.max_ends[clipped] >= days)):
+            result[i] = self._walk_back(positions[i], days[i])
+        return result
+
+    def _walk_back(self, position, day):
+        code = self.codes[position]
+        while position >= 0 and self.codes[position] == code:
+            if self.ends[position] >= day:
+                return int(self.rows[position])
+            position -= 1
+        return -1
+
+    def covering_row(self, chassis_no, date):
+        """Row of the policy covering `chassis_no` on `date`, or -1."""
+        try:
+            code = self.chassis_lookup.get_loc(chassis_no)
+        except KeyError:
+            return -1
+        day = int(np.datetime64(date, "D").astype(np.int64))
+        offset = min(max(day - self.base, -1), self.span - 1)
+        position = int(np.searchsorted(self.keys, code * self.span + offset, "right")) - 1
+        if position < 0 or self.codes[position] != code:
+            return -1
+        return self._walk_back(position, day)
+
+    def policy_rows(self, chassis_no):
+        """Rows of every policy of the chassis, ordered by effective date."""
+        code = self.chassis_lookup.get_indexer([chassis_no])[0]
+        if code < 0:
+            return self.rows[:0]
+        lo, hi = np.searchsorted(self.codes, [code, code + 1])
+        return self.rows[lo:hi]
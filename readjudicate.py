@@ -0,0 +1,382 @@
+"""
+Re-adjudicates the whole claims backlog, e.g. after a change to the rules or
+the severity model. Every claim's checks (policy, speed, location, duplicates),
+its evidence image severity and its risk score are recomputed and written back
+to the claims store. They are also written to the warehouse, so the apps load
+them as claim columns on start.
+
+The work runs in a pool of forked worker processes, in two phases:
+  1. images: the distinct evidence images (by content digest) are split into
+     slices. A worker decodes each image for the severity model and the
+     perceptual hash.
+  2. claims: claims are partitioned by policy_no, with all of a policy's claims
+     in one partition. A worker evaluates the rules and the risk of a partition.
+
+One shared-memory block holds the per-claim columns the parent derives between
+the phases (model severity, duplicate signals) and every result column.
+Workers read their rows and write their results in place, so no column array
+is pickled either way. The store and telematics indexes are inherited
+read-only through fork.
+
+Each finished partition is checkpointed under CACHE_DIR/readjudication as an
+atomically written .npz of its rows' results. Starting a killed run again
+resumes from the finished partitions, as long as nothing the results depend on
+changed (see run_fingerprint): rule code, claim and policy data, telematics,
+severity model and partitioning.
+
+    python readjudicate.py [--workers N] [--partitions 64] [--restart] [--dry-run]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import duplicate_index
+import geo_index
+import risk_scoring
+import rule_engine
+import severity_model
+import telematics as telematics_module
+from claims_store import CACHE_DIR
+from decision_log import DecisionLog
+from duplicate_index import DuplicateIndex, claim_digests, perceptual_hash
+from evidence_index import load_evidence_index
+from image_store import ImageStore
+from risk_scoring import risk_features, score_features
+from rule_engine import OUTCOME_LABELS, RULES, SEVERITY_LEVEL_NAMES, claim_values, evaluate_rules, evidence_images
+from severity_model import decode_image, load_severity_model
+from telematics import load_telematics
+from warehouse import Warehouse
+
+READJUDICATION_DIR = os.path.join(CACHE_DIR, "readjudication")
+# More partitions than workers balance the load and make checkpoints frequent
+DEFAULT_PARTITIONS = 64
+# Distinct images analyzed per worker task
+IMAGE_SLICE = 32
+
+CHECK_COLUMNS = [f"check_{key}" for key, _ in RULES]
+# Per-claim columns a partition writes (and checkpoints)
+RESULT_COLUMNS = CHECK_COLUMNS + ["worst", "risk_score"]
+_DUPLICATE_COLUMNS = ["duplicate_image_claims", "duplicate_image_vehicles", "similar_image_claims", "common_image"]
+# Modules whose code decides the results: a change to any of them invalidates a checkpoint
+_LOGIC_MODULES = [rule_engine, risk_scoring, duplicate_index, geo_index, telematics_module, severity_model]
+
+
+class SharedColumns:
+    """
+    Column arrays laid out in one shared-memory block. Processes forked after
+    it was created see the same pages, so rows written by a worker are read by
+    the parent without a copy.
+    """
+
+    def __init__(self, layout):
+        """`layout` is {name: (dtype, length, fill)}."""
+        offsets, size = {}, 0
+        for name, (dtype, length, _) in layout.items():
+            offsets[name] = size
+            size += -(-np.dtype(dtype).itemsize * length // 64) * 64
+        self.block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.arrays = {}
+        for name, (dtype, length, fill) in layout.items():
+            self.arrays[name] = np.ndarray(length, dtype, buffer=self.block.buf, offset=offsets[name])
+            self.arrays[name][:] = fill
+
+    def copy(self, names):
+        """Private copies of the named columns, which outlive the block."""
+        return {name: self.arrays[name].copy() for name in names}
+
+    def release(self):
+        self.arrays = {}
+        self.block.close()
+        self.block.unlink()
+
+
+def partition_by_policy(policy_no, partitions):
+    """
+    Claim rows split into at most `partitions` groups of about equal size, in
+    policy_no order, with every policy's claims in a single group.
+    """
+    codes, _ = pd.factorize(pd.Series(policy_no, dtype=object).fillna(""), sort=True)
+    order = np.argsort(codes, kind="stable")
+    ordered = codes[order]
+    # Each equal-size split point moves forward to the next policy boundary
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]]) if len(order) else np.zeros(0, np.int64)
+    targets = np.arange(1, partitions) * len(order) // partitions
+    cuts = np.unique(np.append(starts, len(order))[np.searchsorted(starts, targets)])
+    return [rows for rows in np.split(order, cuts) if len(rows)]
+
+
+def _write_atomic(write, path):
+    """Writes through a temp file + rename so a killed run leaves no partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        write(out)
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """
+    Finished work of one re-adjudication run: an .npz per partition (and one for
+    the image phase), plus run.json with the fingerprint of the inputs they were
+    computed from. A different fingerprint discards them.
+    """
+
+    def __init__(self, directory, fingerprint, restart=False):
+        self.directory = directory
+        path = os.path.join(directory, "run.json")
+        existing = None
+        if os.path.exists(path):
+            with open(path) as source:
+                existing = json.load(source)
+        if restart or existing != fingerprint:
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+            _write_atomic(lambda out: out.write(json.dumps(fingerprint).encode()), path)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def load(self, name):
+        if not os.path.exists(self._path(name)):
+            return None
+        with np.load(self._path(name)) as saved:
+            return {key: saved[key] for key in saved.files}
+
+    def save(self, name, arrays):
+        _write_atomic(lambda out: np.savez(out, **arrays), self._path(name))
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _crc(values):
+    return zlib.crc32("\n".join(map(str, np.asarray(values, dtype=object))).encode())
+
+
+def _crc_arrays(*arrays):
+    crc = 0
+    for values in arrays:
+        crc = zlib.crc32(np.ascontiguousarray(values).view(np.uint8), crc)
+    return crc
+
+
+def run_fingerprint(store, telematics, model, digests, locations, partitions):
+    """
+    What a run's results depend on: the rule, risk and duplicate code, the claim
+    and policy source columns, the telematics readings, the severity model and
+    each claim's evidence digest and stated location, plus the partitioning.
+    """
+    source = store.claims.drop(columns=["status", *store.derived_columns])
+    code = zlib.crc32(b"".join(open(module.__file__, "rb").read() for module in _LOGIC_MODULES))
+    readings = 0
+    if telematics is not None:
+        readings = _crc_arrays(telematics.offsets, telematics.event_ts, telematics.speed, telematics.latitude,
+                               telematics.longitude) ^ _crc(telematics.chassis)
+    return {
+        "claims": len(store.claims), "code": code, "rules": [key for key, _ in RULES],
+        "claim_data": _crc_arrays(pd.util.hash_pandas_object(source, index=False).to_numpy()),
+        "policy_data": _crc_arrays(pd.util.hash_pandas_object(store.policies, index=False).to_numpy()),
+        "telematics": readings, "model": [model.fingerprint, _crc_arrays(model.weights)],
+        "digests": _crc(digests), "common_images": sorted(duplicate_index.COMMON_IMAGE_DIGESTS),
+        "locations": _crc(locations), "partitions": partitions,
+    }
+
+
+# --- WORKERS ---
+_WORKER = {}
+
+
+def _init_worker(job):
+    # Forked: `job` (store, indexes, shared columns) is inherited, not pickled
+    _WORKER.update(job)
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+
+
+def _exit_with_parent(parent):
+    """Ends a worker whose run was killed, so the shared block is released rather than kept mapped."""
+    while os.getppid() == parent:
+        time.sleep(1)
+    os._exit(1)
+
+
+def _analyze_images(task):
+    """Phase 1: severity level and perceptual hash of a slice of the distinct images."""
+    first, last = task
+    columns, paths = _WORKER["columns"].arrays, _WORKER["image_paths"][first:last]
+    columns["image_level"][first:last], _ = _WORKER["model"].predict(np.stack([decode_image(path) for path in paths]))
+    columns["image_hash"][first:last] = [perceptual_hash(path) for path in paths]
+    return task
+
+
+def _adjudicate_partition(part):
+    """Phase 2: rule outcomes and risk score of one partition's claims, written in place."""
+    columns, store, telematics = _WORKER["columns"].arrays, _WORKER["store"], _WORKER["telematics"]
+    rows = _WORKER["partitions"][part]
+    if "duplicate_record" not in _WORKER:
+        # Final before any partition is queued, so looked up once per worker
+        _WORKER["duplicate_record"] = _WORKER["claim_nos"][columns["duplicate_record_row"]]
+    duplicates = {name: columns[name] for name in _DUPLICATE_COLUMNS}
+    duplicates["duplicate_record"] = _WORKER["duplicate_record"]
+
+    results = evaluate_rules(store, columns["model_level"], telematics, _WORKER["locations"], duplicates, rows)
+    for (key, _), name in zip(RULES, CHECK_COLUMNS):
+        columns[name][rows] = results.outcomes[key]
+    columns["worst"][rows] = results.worst
+    speed = (results.inputs["speed_readings"], results.inputs["max_speed"])
+    columns["risk_score"][rows] = score_features(risk_features(store, rows, telematics, speed))
+    return part
+
+
+# --- DRIVER ---
+def readjudicate(store, telematics, image_store, digests, locations=None, workers=None,
+                 partitions=DEFAULT_PARTITIONS, model=None, directory=READJUDICATION_DIR, restart=False,
+                 progress=None):
+    """
+    Re-evaluates every claim of the store. `digests` is each claim's evidence
+    digest (see duplicate_index.claim_digests), `locations` its stated location.
+    Returns {column: array aligned with the claims}: RESULT_COLUMNS plus
+    model_level. `progress(phase, done, total)` is called as tasks finish.
+    """
+    model = model or load_severity_model()
+    n = len(store.claims)
+    claim_nos = store.claims["claim_no"].to_numpy(dtype=object)
+    locations = np.full(n, None, dtype=object) if locations is None else np.asarray(locations, dtype=object)
+    images = sorted(digest for digest in set(digests) if digest and digest in image_store)
+    parts = partition_by_policy(store.claims["policy_no"].to_numpy(), partitions)
+    fingerprint = run_fingerprint(store, telematics, model, digests, locations, partitions)
+    checkpoint = Checkpoint(directory, fingerprint, restart)
+
+    columns = SharedColumns({
+        "image_level": (np.int8, len(images), -1),
+        "image_hash": (np.uint64, len(images), 0),
+        "model_level": (np.int8, n, -1),
+        **{name: (np.int64, n, 0) for name in _DUPLICATE_COLUMNS},
+        "duplicate_record_row": (np.int64, n, -1),
+        **{name: (np.int8, n, 0) for name in CHECK_COLUMNS},
+        "worst": (np.int8, n, 0),
+        "risk_score": (np.float32, n, 0),
+    })
+    arrays = columns.arrays
+    job = {
+        "store": store, "telematics": telematics, "model": model, "locations": locations, "partitions": parts,
+        "claim_nos": np.append(claim_nos, None),
+        "image_paths": [image_store.path(digest) for digest in images], "columns": columns,
+    }
+    # Forked, not spawned: workers need the store and indexes, which fork shares without a copy
+    context = multiprocessing.get_context("fork")
+    try:
+        with ProcessPoolExecutor(workers, context, _init_worker, (job,)) as pool:
+            saved = checkpoint.load("images")
+            if saved is None:
+                tasks = [(first, min(first + IMAGE_SLICE, len(images))) for first in range(0, len(images), IMAGE_SLICE)]
+                for done, future in enumerate(as_completed(pool.submit(_analyze_images, task) for task in tasks), 1):
+                    future.result()
+                    if progress:
+                        progress("images", done, len(tasks))
+                saved = columns.copy(["image_level", "image_hash"])
+                checkpoint.save("images", saved)
+            for name, values in saved.items():
+                arrays[name][:] = values
+
+            # Between the phases: per-claim inputs that need every image, into the shared block
+            level = dict(zip(images, arrays["image_level"].tolist()))
+            arrays["model_level"][:] = [level.get(digest, -1) for digest in digests]
+            fingerprints = dict(zip(images, arrays["image_hash"].tolist()))
+            matches = DuplicateIndex.from_store(store, digests, fingerprints).matches(record_rows=True)
+            for name in _DUPLICATE_COLUMNS:
+                arrays[name][:] = matches[name]
+            arrays["duplicate_record_row"][:] = matches["duplicate_record"]
+
+            pending = []
+            for part, rows in enumerate(parts):
+                saved = checkpoint.load(f"part-{part:05d}")
+                if saved is None:
+                    pending.append(part)
+                    continue
+                for name in RESULT_COLUMNS:
+                    arrays[name][rows] = saved[name]
+            done = len(parts) - len(pending)
+            for future in as_completed(pool.submit(_adjudicate_partition, part) for part in pending):
+                part = future.result()
+                rows = parts[part]
+                checkpoint.save(f"part-{part:05d}", {name: arrays[name][rows] for name in RESULT_COLUMNS})
+                done += 1
+                if progress:
+                    progress("claims", done, len(parts))
+        results = columns.copy(RESULT_COLUMNS + ["model_level"])
+    finally:
+        columns.release()
+    checkpoint.clear()
+    return results
+
+
+def result_columns(results):
+    """The claim columns written back: outcome labels overall and per rule, model severity and risk score."""
+    columns = {"adjudication": pd.Categorical.from_codes(results["worst"], OUTCOME_LABELS)}
+    for name in CHECK_COLUMNS:
+        columns[name] = pd.Categorical.from_codes(results[name], OUTCOME_LABELS)
+    columns["model_severity"] = pd.Categorical.from_codes(results["model_level"], SEVERITY_LEVEL_NAMES)
+    columns["risk_score"] = results["risk_score"]
+    columns["adjudicated_at"] = np.full(len(results["worst"]), np.datetime64("now", "s")).astype("datetime64[us]")
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an unfinished run")
+    parser.add_argument("--dry-run", action="store_true", help="report the results without writing them back")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    warehouse = Warehouse()
+    warehouse.refresh()
+    store = warehouse.load_store()
+    # Claims and decisions logged since the last warehouse refresh, and the forms they came from
+    log = DecisionLog()
+    log.compact(store)
+    locations = claim_values(store, log.form_values("location"))
+    uploaded = claim_values(store, log.form_values("image_digest"))
+    log.close()
+    image_store = ImageStore()
+    digests = claim_digests(evidence_images(store, load_evidence_index()), image_store.import_directory(), uploaded)
+    telematics = load_telematics()
+    print(f"Loaded {len(store.claims):,} claims and {len(telematics):,} telematics readings "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    def progress(phase, done, total):
+        print(f"\r{phase}: {done}/{total} in {time.perf_counter() - started:.0f}s", end="", file=sys.stderr, flush=True)
+
+    adjudicating = time.perf_counter()
+    results = readjudicate(store, telematics, image_store, digests, locations, args.workers, args.partitions,
+                           restart=args.restart, progress=progress)
+    print(file=sys.stderr)
+    print(f"Re-adjudicated {len(store.claims):,} claims with {args.workers} workers "
+          f"in {time.perf_counter() - adjudicating:.1f}s")
+    for (_, label), name in zip(RULES, CHECK_COLUMNS):
+        counts = np.bincount(results[name], minlength=len(OUTCOME_LABELS))
+        print(f"  {label:<16} " + "  ".join(f"{o} {c:>8,}" for o, c in zip(OUTCOME_LABELS, counts)))
+    passed = int((results["worst"] == 0).sum())
+    print(f"  {passed:,} claims pass every check; mean risk {results['risk_score'].mean():.1%}")
+
+    if not args.dry_run:
+        columns = result_columns(results)
+        store.set_columns(columns)
+        warehouse.write_adjudications(pd.DataFrame({"claim_no": store.claims["claim_no"].to_numpy(), **columns}))
+        print(f"Wrote the results to {warehouse.layer_dir('gold', 'claim_adjudications')}")
+
+
+if __name__ == "__main__":
+    main()
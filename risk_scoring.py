@@ -0,0 +1,109 @@
+import numpy as np
+
+from rule_engine import speed_inputs
+from telematics import SPEED_LIMIT_MPH
+
+# --- RISK MODEL ---
+# Feature columns, each scaled to [0, 1] with 1 the riskiest value, and the
+# weight each adds to the log-odds of a claim needing investigation.
+RISK_FEATURES = [
+    ("suspicious_activity", 2.0),   # flagged by the adjuster at intake
+    ("no_witnesses", 0.8),
+    ("new_customer", 1.0),          # few months on the book
+    ("new_driver", 0.8),            # licence held briefly at incident time
+    ("claim_to_limit", 1.5),        # claimed total relative to the sum insured
+    ("night_incident", 0.6),
+    ("speeding", 1.2),              # telematics over the limit around the incident
+    ("no_policy", 2.0),
+]
+RISK_BIAS = -3.5
+
+NEW_CUSTOMER_MONTHS = 24
+NEW_DRIVER_YEARS = 3
+CLAIM_TO_LIMIT_CAP = 3.0
+NIGHT_HOURS = (22, 6)  # [22:00, 06:00)
+
+
+def risk_features(store, rows=None, telematics=None, speed=None):
+    """
+    Feature matrix (len(rows), len(RISK_FEATURES)) in float32 for the claim rows
+    (all claims by default), gathered with the precomputed claim→policy join.
+    `speed` is (reading counts, max speeds) aligned with `rows` when already
+    computed, e.g. by the rule engine; otherwise it is looked up in `telematics`.
+    """
+    claims = store.claims
+    rows = np.arange(len(claims)) if rows is None else np.asarray(rows, dtype=np.int64)
+    policy_row = store.claim_policy_row[rows].astype(np.int64)
+    has_policy = policy_row >= 0
+    sum_insured = store.policies["SUM_INSURED"].to_numpy(dtype=np.float64)[np.clip(policy_row, 0, None)]
+    if speed is None:
+        speed = speed_inputs(store, telematics, rows)
+    readings, max_speed = speed
+
+    incident = claims["date"].to_numpy()[rows]
+    licensed_days = (incident - claims["license_issue_date"].to_numpy()[rows]) / np.timedelta64(1, "D")
+    hour = claims["hour"].to_numpy()[rows]
+    ratio = claims["total"].to_numpy(dtype=np.float64)[rows] / np.where(has_policy & (sum_insured > 0), sum_insured, np.nan)
+
+    features = np.empty((len(rows), len(RISK_FEATURES)), dtype=np.float32)
+    features[:, 0] = claims["suspicious_activity"].to_numpy()[rows]
+    features[:, 1] = claims["number_of_witnesses"].to_numpy()[rows] == 0
+    features[:, 2] = np.clip(1 - claims["months_as_customer"].to_numpy()[rows] / NEW_CUSTOMER_MONTHS, 0, 1)
+    # Unknown licence dates score as experienced drivers
+    features[:, 3] = np.nan_to_num(np.clip(1 - licensed_days / (365.25 * NEW_DRIVER_YEARS), 0, 1), nan=0)
+    features[:, 4] = np.nan_to_num(np.clip(ratio / CLAIM_TO_LIMIT_CAP, 0, 1), nan=1)
+    features[:, 5] = (hour >= NIGHT_HOURS[0]) | (hour < NIGHT_HOURS[1])
+    features[:, 6] = np.where(readings > 0, np.clip(np.nan_to_num(max_speed) / SPEED_LIMIT_MPH - 1, 0, 1), 0)
+    features[:, 7] = ~has_policy
+    return features
+
+
+def score_features(features):
+    """Risk in [0, 1] for each feature row: logistic of the weighted sum."""
+    weights = np.array([weight for _, weight in RISK_FEATURES], dtype=np.float32)
+    return (1 / (1 + np.exp(-(features @ weights + RISK_BIAS)))).astype(np.float32)
+
+
+class RiskScores:
+    """
+    Materialized risk score of every claim, aligned with `store.claims`.
+
+    Built by one vectorized pass over the whole table; registered as a ClaimsStore
+    listener it then scores only the newly added rows, so submissions never
+    trigger a rescore. `sort_key` gives the admin grid its ordering without any
+    work at render time.
+    """
+
+    def __init__(self, store, scores, telematics=None):
+        self.store = store
+        self.scores = scores
+        self.telematics = telematics
+
+    @classmethod
+    def score_all(cls, store, telematics=None, speed=None):
+        """Batch mode: scores the entire claims table."""
+        return cls(store, score_features(risk_features(store, telematics=telematics, speed=speed)), telematics)
+
+    def __len__(self):
+        return len(self.scores)
+
+    # --- ClaimsStore listener interface ---
+    def claims_added(self, records):
+        """Incremental mode: scores the rows appended since the last update."""
+        rows = np.arange(len(self.scores), len(self.store.claims))
+        features = risk_features(self.store, rows, self.telematics)
+        self.scores = np.concatenate([self.scores, score_features(features)])
+
+    def status_changed(self, record, old_status):
+        pass
+
+    def columns_changed(self, names):
+        pass  # only derived columns change; the features read source columns
+
+    # --- READ SIDE ---
+    def percent(self, row):
+        return int(round(float(self.scores[row]) * 100))
+
+    def sort_key(self):
+        """Ascending int64 key that lists the riskiest claims first (basis points)."""
+        return -np.round(self.scores.astype(np.float64) * 10000).astype(np.int64)
@@ -0,0 +1,432 @@
+import numpy as np
+import pandas as pd
+
+from evidence_index import load_evidence_index
+from geo_index import LOCATION_RADIUS_KM, resolve_locations
+from instrumentation import timed
+from telematics import SPEED_LIMIT_MPH, incident_window
+
+# --- CHECK OUTCOMES ---
+# Stored as int8 codes so the worst outcome of a claim is a plain `max` over rules.
+PASS, WARN, FAIL = 0, 1, 2
+OUTCOME_LABELS = ["PASS", "WARN", "FAIL"]
+
+# Rule keys in the order they are shown in the admin detail view
+RULES = [
+    ("severity", "Severity Check"),
+    ("amount", "Policy Amount"),
+    ("policy_active", "Policy Active"),
+    ("speed", "Speed Check"),
+    ("location", "Location Check"),
+    ("duplicate", "Duplicate Check"),
+]
+
+# --- SEVERITY SCALE ---
+# Self-reported severities and model outputs are compared on one three-level scale.
+SEVERITY_LEVEL_NAMES = ["Low", "Medium", "High"]
+REPORTED_SEVERITY_LEVELS = {
+    "Trivial Damage": 0,
+    "Minor Damage": 1,
+    "Major Damage": 2,
+    "Total Loss": 2,
+    # Labels offered by the customer-facing forms
+    "Minor": 0,
+    "Moderate": 1,
+    "Major": 2,
+    "Minor Scratch": 0,
+    "Moderate Dent": 1,
+}
+MODEL_SEVERITY_LEVELS = {"Low": 0, "Medium": 1, "High": 2}
+
+def evidence_images(store, index=None):
+    """
+    Name of each claim's evidence image (object array aligned with `store.claims`,
+    None if absent), looked up in the persisted EvidenceIndex.
+    """
+    index = index if index is not None else load_evidence_index()
+    return index.images_for_claims(store.claims["claim_no"].to_numpy())
+
+
+def model_severity(images, assessments=None):
+    """
+    Model severity level of each claim's evidence image (int8, -1 when the claim
+    has no assessed image). `assessments` maps image name to (level, confidence),
+    as returned by severity_model.assess_evidence; without it the label recorded
+    in the image name is used, e.g. "4_High.jpg".
+    """
+    names = pd.Series(images, dtype=object)
+    if assessments is None:
+        labels = names.str.extract(r"_(\w+)\.", expand=False).map(MODEL_SEVERITY_LEVELS)
+    else:
+        labels = names.map({name: level for name, (level, _) in assessments.items()})
+    return labels.astype("float").fillna(-1).to_numpy().astype(np.int8)
+
+
+def load_model_severity(store, index=None, assessments=None):
+    """Returns `model_severity` of every claim's evidence image, aligned with `store.claims`."""
+    return model_severity(evidence_images(store, index), assessments)
+
+
+def _gather(values, rows, fill):
+    """Picks `values[rows]`, substituting `fill` wherever `rows` is -1."""
+    picked = values[np.clip(rows, 0, None)] if len(values) else np.full(len(rows), fill)
+    return np.where(rows >= 0, picked, fill)
+
+
+def _speed_readings(store, policy_row, start, end, telematics):
+    """Telematics reading counts and max speeds of each policy's chassis in [start, end]."""
+    if telematics is None:
+        return np.zeros(len(policy_row), dtype=np.int64), np.full(len(policy_row), np.nan, dtype=np.float32)
+    chassis = _gather(store.policies["CHASSIS_NO"].to_numpy(), policy_row, None)
+    return telematics.bulk_speed_check(chassis, start, end)
+
+
+def _location_readings(store, policy_row, locations, start, end, telematics):
+    """
+    Places each stated location (None when the claim has none) and finds how close
+    the policy's chassis came to it in [start, end]. Returns (latitudes, longitudes,
+    reading counts, nearest distances in km).
+    """
+    latitude, longitude = resolve_locations(locations)
+    counts, nearest = np.zeros(len(policy_row), dtype=np.int64), np.full(len(policy_row), np.nan)
+    rows = np.flatnonzero(~np.isnan(latitude))
+    if telematics is not None and len(rows):
+        chassis = _gather(store.policies["CHASSIS_NO"].to_numpy(), policy_row[rows], None)
+        counts[rows], nearest[rows] = telematics.bulk_location_check(
+            chassis, latitude[rows], longitude[rows], start[rows], end[rows])
+    return latitude, longitude, counts, nearest
+
+
+def _incident_windows(store, rows=None):
+    """Incident windows (start, end epoch seconds) and policy rows of every claim, or of the claim `rows`."""
+    claims = store.claims
+    date, hour, policy_row = claims["date"].to_numpy(), claims["hour"].to_numpy(), store.claim_policy_row
+    if rows is not None:
+        date, hour, policy_row = date[rows], hour[rows], policy_row[rows]
+    start, end = incident_window(date, hour)
+    return start, end, policy_row.astype(np.int64)
+
+
+def speed_inputs(store, telematics, rows=None):
+    """
+    Bulk speed check of every claim (or of the claim `rows`): telematics readings
+    of the policy's chassis around the incident date and hour. Returns
+    (reading counts, max speeds).
+    """
+    start, end, policy_row = _incident_windows(store, rows)
+    return _speed_readings(store, policy_row, start, end, telematics)
+
+
+def claim_values(store, by_claim):
+    """
+    Object array aligned with `store.claims` from a {claim_no: value} mapping such
+    as DecisionLog.form_values("location"), None for the claims it does not name.
+    """
+    values = np.full(len(store.claims), None, dtype=object)
+    for claim_no, value in by_claim.items():
+        row = store.claim_row(claim_no)
+        if row >= 0:
+            values[row] = value
+    return values
+
+
+def _duplicate_signals(duplicates, n):
+    """DuplicateIndex match signals, or empty ones flagged unchecked when there is no index."""
+    if duplicates is not None:
+        return dict(duplicates, duplicates_checked=np.ones(n, dtype=bool))
+    return {
+        "duplicate_image_claims": np.zeros(n, dtype=np.int64),
+        "duplicate_image_vehicles": np.zeros(n, dtype=np.int64),
+        "similar_image_claims": np.zeros(n, dtype=np.int64),
+        "common_image": np.zeros(n, dtype=np.int64),
+        "duplicate_record": np.full(n, None, dtype=object),
+        "duplicates_checked": np.zeros(n, dtype=bool),
+    }
+
+
+def _inputs(store, policy_row, total, claim_date, reported_level, model_level, speed, locations, location, duplicates):
+    policies = store.policies
+    nat = np.datetime64("NaT", "us")
+    speed_readings, max_speed = speed
+    location_latitude, location_longitude, location_readings, location_distance = location
+    claim_date = np.asarray(claim_date).astype("datetime64[us]")
+    # Policy in force for the claimed vehicle on the claim date, whichever it is
+    chassis = _gather(policies["CHASSIS_NO"].to_numpy(), policy_row, None)
+    covering_row = store.policy_intervals.covering_rows(chassis, claim_date)
+    return {
+        "total": np.asarray(total, dtype=np.float64),
+        "claim_date": claim_date,
+        "reported_level": np.asarray(reported_level, dtype=np.int8),
+        "model_level": np.asarray(model_level, dtype=np.int8),
+        "has_policy": policy_row >= 0,
+        "sum_insured": _gather(policies["SUM_INSURED"].to_numpy(dtype=np.float64), policy_row, np.nan),
+        "deductible": _gather(policies["DEDUCTABLE"].to_numpy(dtype=np.float64), policy_row, np.nan),
+        "eff_date": _gather(policies["POL_EFF_DATE"].to_numpy().astype("datetime64[us]"), policy_row, nat),
+        "expiry_date": _gather(policies["POL_EXPIRY_DATE"].to_numpy().astype("datetime64[us]"), policy_row, nat),
+        "covering_row": covering_row,
+        "covering_policy": _gather(policies["POLICY_NO"].to_numpy(), covering_row, None),
+        "covering_expiry": _gather(policies["POL_EXPIRY_DATE"].to_numpy().astype("datetime64[us]"), covering_row, nat),
+        "speed_readings": speed_readings,
+        "max_speed": max_speed,
+        "location": np.asarray(locations, dtype=object),
+        "location_known": ~np.isnan(location_latitude),
+        "location_readings": location_readings,
+        "location_distance": location_distance,
+        **_duplicate_signals(duplicates, len(policy_row)),
+    }
+
+
+def rule_inputs(store, model_severity=None, telematics=None, locations=None, duplicates=None, rows=None):
+    """
+    Builds the flat column arrays the rules run on: claim columns plus the matching
+    policy columns gathered through the precomputed claim→policy join, and the
+    telematics speed readings and GPS fixes around each incident. `locations` is
+    the stated location of each claim (see `claim_values`), None for none;
+    `duplicates` the DuplicateIndex.matches() signals of every claim. With `rows`
+    only those claims are built, the other arguments staying aligned with all claims.
+    """
+    claims = store.claims
+    if model_severity is None:
+        model_severity = np.full(len(claims), -1, dtype=np.int8)
+    if locations is None:
+        locations = np.full(len(claims), None, dtype=object)
+    if rows is not None:
+        claims, model_severity, locations = claims.iloc[rows], np.asarray(model_severity)[rows], locations[rows]
+        if duplicates is not None:
+            duplicates = {key: values[rows] for key, values in duplicates.items()}
+    start, end, policy_row = _incident_windows(store, rows)
+    return _inputs(
+        store,
+        policy_row,
+        claims["total"].to_numpy(),
+        claims["claim_date"].to_numpy(),
+        claims["severity"].map(REPORTED_SEVERITY_LEVELS).astype("float").fillna(-1).to_numpy(),
+        model_severity,
+        _speed_readings(store, policy_row, start, end, telematics),
+        locations,
+        _location_readings(store, policy_row, locations, start, end, telematics),
+        duplicates,
+    )
+
+
+def submission_inputs(store, submission, model_level=-1, telematics=None, duplicates=None):
+    """
+    Rule inputs for one claim that is not in the store yet (a batch of one).
+    `submission` carries policy_no, total, claim_date, severity and optionally the
+    incident hour and location; without an hour the telematics checks cover the
+    whole incident day. `duplicates` is the claim's DuplicateIndex.match() result.
+    """
+    policy_row = np.array([store.policy_index.last(str(submission["policy_no"]).strip())], dtype=np.int64)
+    claim_date = np.datetime64(pd.Timestamp(submission["claim_date"]).date(), "D")
+    hour = submission.get("hour")
+    if hour is None:
+        start, end = incident_window(claim_date, 0, padding=0)
+        end = end + 23 * 3600
+    else:
+        start, end = incident_window(claim_date, hour)
+    start, end = np.atleast_1d(start), np.atleast_1d(end)
+    locations = np.array([submission.get("location") or None], dtype=object)
+    return _inputs(
+        store,
+        policy_row,
+        [float(submission["total"])],
+        [claim_date],
+        [REPORTED_SEVERITY_LEVELS.get(submission.get("severity"), -1)],
+        [model_level],
+        _speed_readings(store, policy_row, start, end, telematics),
+        locations,
+        _location_readings(store, policy_row, locations, start, end, telematics),
+        duplicates,
+    )
+
+
+def check_amount(inputs):
+    """Claim total must exceed the deductible and stay within the sum insured."""
+    total, limit, deductible = inputs["total"], inputs["sum_insured"], inputs["deductible"]
+    outcome = np.full(len(total), PASS, dtype=np.int8)
+    outcome[total <= deductible] = WARN
+    outcome[total > limit] = FAIL
+    outcome[~inputs["has_policy"]] = FAIL
+    return outcome
+
+
+def check_policy_active(inputs):
+    """
+    The claim date must fall inside the policy's effective..expiry window. When
+    it does not but another policy covered the same vehicle that day (a renewal
+    filed against the old number), the claim warns instead of failing.
+    """
+    claim_date = inputs["claim_date"]
+    active = (claim_date >= inputs["eff_date"]) & (claim_date <= inputs["expiry_date"]) & inputs["has_policy"]
+    outcome = np.where(inputs["covering_row"] >= 0, WARN, FAIL).astype(np.int8)
+    outcome[active] = PASS
+    return outcome
+
+
+def check_severity(inputs):
+    """Self-reported severity must match the image model; unassessed claims warn."""
+    reported, model = inputs["reported_level"], inputs["model_level"]
+    return np.where((model >= 0) & (model == reported), PASS, WARN).astype(np.int8)
+
+
+def check_speed(inputs, limit=SPEED_LIMIT_MPH):
+    """Telematics around the incident must stay under the limit; no readings warn."""
+    readings, max_speed = inputs["speed_readings"], inputs["max_speed"]
+    outcome = np.full(len(readings), WARN, dtype=np.int8)
+    outcome[(readings > 0) & (max_speed <= limit)] = PASS
+    return outcome
+
+
+def check_location(inputs, radius=LOCATION_RADIUS_KM):
+    """
+    A GPS fix around the incident must lie within `radius` km of the stated
+    location; fixes only farther away fail. Claims without a placeable location,
+    or without fixes in the window, warn.
+    """
+    readings, distance = inputs["location_readings"], inputs["location_distance"]
+    outcome = np.full(len(readings), WARN, dtype=np.int8)
+    fixed = inputs["location_known"] & (readings > 0)
+    outcome[fixed & (distance <= radius)] = PASS
+    outcome[fixed & (distance > radius)] = FAIL
+    return outcome
+
+
+def check_duplicate(inputs):
+    """
+    Evidence already filed on other vehicles' claims, or a repeat of an earlier
+    claim's policy, incident date and amount, fails. Known sample or placeholder
+    images (duplicate_index.COMMON_IMAGE_DIGESTS), evidence reused on the same
+    vehicle's claims and near-duplicate images warn, as do unchecked claims.
+    """
+    outcome = np.full(len(inputs["duplicates_checked"]), PASS, dtype=np.int8)
+    outcome[(inputs["duplicate_image_claims"] > 0) | (inputs["similar_image_claims"] > 0)] = WARN
+    outcome[~inputs["duplicates_checked"]] = WARN
+    lifted = (inputs["duplicate_image_vehicles"] > 0) & ~inputs["common_image"].astype(bool)
+    outcome[lifted | inputs["duplicate_record"].astype(bool)] = FAIL
+    return outcome
+
+
+RULE_FUNCTIONS = {
+    "severity": check_severity,
+    "amount": check_amount,
+    "policy_active": check_policy_active,
+    "speed": check_speed,
+    "location": check_location,
+    "duplicate": check_duplicate,
+}
+
+
+class RuleResults:
+    """
+    Outcome codes of every rule for every claim, plus the inputs needed to explain
+    a single claim's outcome in the detail view.
+    """
+
+    def __init__(self, inputs, outcomes):
+        self.inputs = inputs
+        self.outcomes = outcomes
+        self.worst = np.max(np.vstack(list(outcomes.values())), axis=0) if outcomes else np.zeros(0, np.int8)
+
+    def __len__(self):
+        return len(self.worst)
+
+    def passed_mask(self):
+        return self.worst == PASS
+
+    def attention_mask(self):
+        return self.worst != PASS
+
+    def summary(self):
+        """Counts of PASS/WARN/FAIL per rule."""
+        return {
+            key: dict(zip(OUTCOME_LABELS, np.bincount(codes, minlength=3).tolist()))
+            for key, codes in self.outcomes.items()
+        }
+
+    def for_row(self, row):
+        """Returns [(label, outcome, subtext), ...] for one claim row."""
+        return [
+            (label, OUTCOME_LABELS[self.outcomes[key][row]], self._explain(key, row))
+            for key, label in RULES if key in self.outcomes
+        ]
+
+    def _explain(self, key, row):
+        inputs, outcome = self.inputs, self.outcomes[key][row]
+        if key in ("amount", "policy_active") and not inputs["has_policy"][row]:
+            return "Policy not found"
+        if key == "amount":
+            limit = f"${inputs['sum_insured'][row]:,.0f}"
+            if outcome == PASS:
+                return f"Within Limit ({limit})"
+            if outcome == FAIL:
+                return f"Exceeds Limit ({limit})"
+            return f"Below Deductible (${inputs['deductible'][row]:,.0f})"
+        if key == "policy_active":
+            expiry = pd.Timestamp(inputs["expiry_date"][row]).strftime("%m/%Y")
+            if outcome == PASS:
+                return f"Active until {expiry}"
+            if outcome == WARN:
+                covering_expiry = pd.Timestamp(inputs["covering_expiry"][row]).strftime("%m/%Y")
+                return f"Covered by #{inputs['covering_policy'][row]} until {covering_expiry}"
+            if inputs["claim_date"][row] < inputs["eff_date"][row]:
+                return f"Not active before {pd.Timestamp(inputs['eff_date'][row]).strftime('%m/%Y')}"
+            return f"Expired {expiry}"
+        if key == "severity":
+            model, reported = inputs["model_level"][row], inputs["reported_level"][row]
+            if model < 0:
+                return "No AI assessment"
+            if outcome == PASS:
+                return "AI matches User input"
+            user = SEVERITY_LEVEL_NAMES[reported] if reported >= 0 else "Unknown"
+            return f"AI: {SEVERITY_LEVEL_NAMES[model]} vs User: {user}"
+        if key == "speed":
+            if inputs["speed_readings"][row] == 0:
+                return "No telematics near incident"
+            max_speed = inputs["max_speed"][row]
+            if outcome == PASS:
+                return f"Max {max_speed:.0f}mph (limit {SPEED_LIMIT_MPH}mph)"
+            return f"{max_speed:.0f}mph in {SPEED_LIMIT_MPH}mph zone"
+        if key == "location":
+            location = inputs["location"][row]
+            if not location:
+                return "No location reported"
+            if not inputs["location_known"][row]:
+                return f"Unknown place: {location}"
+            if inputs["location_readings"][row] == 0:
+                return "No GPS fix near incident"
+            distance = inputs["location_distance"][row]
+            if outcome == PASS:
+                return f"Vehicle within {distance:.1f}km"
+            return f"Vehicle {distance:,.0f}km away"
+        if key == "duplicate":
+            if not inputs["duplicates_checked"][row]:
+                return "Not checked"
+            if inputs["duplicate_record"][row]:
+                return f"Repeats claim {inputs['duplicate_record'][row][:8].upper()}"
+            if inputs["common_image"][row] and inputs["duplicate_image_claims"][row]:
+                return f"Common image ({inputs['duplicate_image_claims'][row]:,} other claims)"
+            if inputs["duplicate_image_vehicles"][row]:
+                return f"Image on {inputs['duplicate_image_vehicles'][row]:,} other vehicles' claims"
+            if inputs["duplicate_image_claims"][row]:
+                return f"Image reused on {inputs['duplicate_image_claims'][row]:,} claims"
+            if inputs["similar_image_claims"][row]:
+                return f"Similar image on {inputs['similar_image_claims'][row]:,} claims"
+            return "No duplicates found"
+        return ""
+
+
+def evaluate_batch(inputs):
+    """Runs every rule as whole-column array operations over a batch of claims."""
+    return RuleResults(inputs, {key: fn(inputs) for key, fn in RULE_FUNCTIONS.items()})
+
+
+@timed("rules.evaluate_submission")
+def evaluate_submission(store, submission, model_level=-1, telematics=None, duplicates=None):
+    """Evaluates all rules for one submitted claim; read it back with `for_row(0)`."""
+    return evaluate_batch(submission_inputs(store, submission, model_level, telematics, duplicates))
+
+
+@timed("rules.evaluate_rules")
+def evaluate_rules(store, model_severity=None, telematics=None, locations=None, duplicates=None, rows=None):
+    """Evaluates all rules for the entire claims table (or the claim `rows`) in one pass."""
+    return evaluate_batch(rule_inputs(store, model_severity, telematics, locations, duplicates, rows))
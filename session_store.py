@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from claims_store import CACHE_DIR
+
+# "sqlite" (default) or "file"; replicas behind one load balancer must share the backend's location
+SESSION_BACKEND = os.environ.get("SMART_CLAIMS_SESSION_BACKEND", "sqlite")
+SESSIONS_DB_PATH = os.path.join(CACHE_DIR, "sessions.sqlite")
+SESSIONS_DIR = os.path.join(CACHE_DIR, "sessions")
+# Sessions untouched for this long are dropped
+SESSION_TTL_SECONDS = 7 * 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+"""
+
+
+class SqliteSessionBackend:
+    """
+    Session states as JSON rows in one SQLite database. WAL mode lets every
+    replica's script threads read and write concurrently.
+    """
+
+    def __init__(self, db_path=SESSIONS_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        """One connection per thread."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def load(self, session_id):
+        row = self._connect().execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, state):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (id, state, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state), time.time()),
+        )
+
+    def delete(self, session_id):
+        self._connect().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def expire(self, ttl=SESSION_TTL_SECONDS):
+        """Drops sessions not saved within `ttl` seconds; returns how many."""
+        return self._connect().execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - ttl,)).rowcount
+
+
+class FileSessionBackend:
+    """
+    One JSON file per session, replaced atomically on save: a stand-in for a
+    shared key-value store on a network file system.
+    """
+
+    def __init__(self, directory=SESSIONS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, session_id):
+        if not session_id.isalnum():
+            raise ValueError(f"Invalid session id {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def load(self, session_id):
+        try:
+            with open(self.path(session_id)) as source:
+                return json.load(source)
+        except FileNotFoundError:
+            return None
+
+    def save(self, session_id, state):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as out:
+            json.dump(state, out)
+        os.replace(tmp, self.path(session_id))
+
+    def delete(self, session_id):
+        try:
+            os.remove(self.path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def expire(self, ttl=SESSION_TTL_SECONDS):
+        """Drops sessions not saved within `ttl` seconds; returns how many."""
+        cutoff, expired = time.time() - ttl, 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                expired += 1
+        return expired
+
+
+SESSION_BACKENDS = {"sqlite": SqliteSessionBackend, "file": FileSessionBackend}
+
+
+def open_session_backend(kind=SESSION_BACKEND):
+    """The configured session backend, with expired sessions dropped."""
+    if kind not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend {kind!r} (expected one of {', '.join(SESSION_BACKENDS)})")
+    backend = SESSION_BACKENDS[kind]()
+    backend.expire()
+    return backend
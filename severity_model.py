@@ -0,0 +1,293 @@
+import glob
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image
+
+from claims_store import CACHE_DIR, DATA_DIR
+
+TRAINING_DIR = os.path.join(DATA_DIR, "training_imgs")
+MODEL_PATH = os.path.join(CACHE_DIR, "severity_model.npz")
+
+# Training labels come from the file names ("12-minor (3).png") and map onto the
+# three-level scale of rule_engine.SEVERITY_LEVEL_NAMES (Low, Medium, High).
+TRAINING_LABELS = {"ok": 0, "minor": 1, "major": 2}
+LEVEL_COUNT = 3
+
+# Images are scored on a small square thumbnail
+IMAGE_SIZE = 64
+# Key of the severity assessment in ImageStore.analyze
+SEVERITY_ANALYSIS = "severity"
+
+# --- MICRO-BATCHING DEFAULTS ---
+MAX_BATCH_SIZE = 16
+# Longest a request waits for others to share its forward pass
+MAX_BATCH_DELAY = 0.025
+
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+_COLOR_BINS = 4  # per channel, 64 joint colour bins
+_HIST_BINS = 8
+_GRID = 4
+
+
+def decode_image(source, size=IMAGE_SIZE):
+    """
+    Decodes a path, raw bytes or a file-like object (e.g. an ImageStore memory map)
+    into a (size, size, 3) float32 array in [0, 1]. JPEGs are decoded at reduced
+    resolution directly (draft mode).
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    image.draft("RGB", (size * 2, size * 2))
+    image = image.convert("RGB").resize((size, size), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255
+
+
+def _batched_histogram(values, bins, upper):
+    """Per-image normalized histograms of an (N, ...) array, in one bincount."""
+    n = len(values)
+    codes = np.clip((values.reshape(n, -1) * (bins / upper)).astype(np.int64), 0, bins - 1)
+    codes += np.arange(n)[:, None] * bins
+    return np.bincount(codes.ravel(), minlength=n * bins).reshape(n, bins) / codes.shape[1]
+
+
+def image_features(pixels):
+    """
+    Feature vectors for a batch of decoded images (N, S, S, 3): joint colour
+    histogram, saturation and gradient-magnitude histograms, and coarse grids of
+    edge energy and local contrast (crumpled panels and debris are high-frequency).
+    """
+    pixels = np.asarray(pixels, dtype=np.float32)
+    n, size = len(pixels), pixels.shape[1]
+    gray = pixels @ _LUMA
+    red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    # Elementwise over the channels; a reduction along the 3-wide last axis is far slower
+    brightest = np.maximum(np.maximum(red, green), blue)
+    darkest = np.minimum(np.minimum(red, green), blue)
+    saturation = (brightest - darkest) / (brightest + 1e-6)
+    gradient = np.hypot(np.diff(gray, axis=2)[:, :-1, :], np.diff(gray, axis=1)[:, :, :-1])
+
+    quantized = np.minimum((pixels * _COLOR_BINS).astype(np.int32), _COLOR_BINS - 1)
+    colors = (quantized[..., 0] * _COLOR_BINS + quantized[..., 1]) * _COLOR_BINS + quantized[..., 2]
+    cell = (size - 1) // _GRID
+    edges = gradient[:, : cell * _GRID, : cell * _GRID].reshape(n, _GRID, cell, _GRID, cell).mean((2, 4))
+    cell = size // (_GRID * 2)
+    contrast = gray[:, : cell * _GRID * 2, : cell * _GRID * 2].reshape(n, _GRID * 2, cell, _GRID * 2, cell).std((2, 4))
+    return np.hstack([
+        _batched_histogram(colors, _COLOR_BINS**3, _COLOR_BINS**3),
+        _batched_histogram(gradient, _HIST_BINS, 0.5),
+        _batched_histogram(saturation, _HIST_BINS, 1.0),
+        edges.reshape(n, -1),
+        contrast.reshape(n, -1),
+    ]).astype(np.float32)
+
+
+def training_set(directory=TRAINING_DIR):
+    """Returns (paths, levels) of the labelled training images."""
+    paths, levels = [], []
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        match = re.search(r"-(ok|minor|major)\b", os.path.basename(path))
+        if match:
+            paths.append(path)
+            levels.append(TRAINING_LABELS[match.group(1)])
+    return paths, np.array(levels, dtype=np.int64)
+
+
+def _fingerprint(paths):
+    """Identifies a training set by file names and sizes, to invalidate the cached model."""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(f"{os.path.basename(path)}:{os.path.getsize(path)};".encode())
+    return digest.hexdigest()
+
+
+class SeverityModel:
+    """
+    Multinomial logistic regression over `image_features`, trained with plain
+    NumPy gradient descent. Scoring a batch is one feature pass and one matrix
+    product, so the cost per image drops as batches grow.
+    """
+
+    def __init__(self, mean, scale, weights, bias, fingerprint=""):
+        self.mean = mean
+        self.scale = scale
+        self.weights = weights
+        self.bias = bias
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def fit(cls, features, levels, l2=0.1, iterations=500, learning_rate=0.5, fingerprint=""):
+        mean, scale = features.mean(0), features.std(0) + 1e-6
+        z = (features - mean) / scale
+        targets = np.eye(LEVEL_COUNT)[levels]
+        weights = np.zeros((z.shape[1], LEVEL_COUNT))
+        bias = np.zeros(LEVEL_COUNT)
+        for _ in range(iterations):
+            error = (_softmax(z @ weights + bias) - targets) / len(levels)
+            weights -= learning_rate * (z.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(0)
+        return cls(mean, scale, weights.astype(np.float32), bias.astype(np.float32), fingerprint)
+
+    def predict_proba(self, pixels):
+        """Class probabilities (N, 3) for a batch of decoded images."""
+        return _softmax(((image_features(pixels) - self.mean) / self.scale) @ self.weights + self.bias)
+
+    def predict(self, pixels):
+        """Returns (levels, confidences) for a batch of decoded images."""
+        proba = self.predict_proba(pixels)
+        return proba.argmax(1), proba.max(1)
+
+    def save(self, path=MODEL_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, mean=self.mean, scale=self.scale, weights=self.weights, bias=self.bias,
+                 fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path) as saved:
+            return cls(saved["mean"], saved["scale"], saved["weights"], saved["bias"], str(saved["fingerprint"]))
+
+
+def _softmax(logits):
+    logits = logits - logits.max(1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(1, keepdims=True)
+
+
+def train_severity_model(directory=TRAINING_DIR, **params):
+    """Trains on the labelled images plus their mirror images."""
+    paths, levels = training_set(directory)
+    pixels = np.stack([decode_image(path) for path in paths])
+    features = np.vstack([image_features(pixels), image_features(pixels[:, :, ::-1])])
+    return SeverityModel.fit(features, np.concatenate([levels, levels]), fingerprint=_fingerprint(paths), **params)
+
+
+def load_severity_model(path=MODEL_PATH, directory=TRAINING_DIR):
+    """Loads the cached model, retraining it when the training images changed."""
+    started = time.perf_counter()
+    fingerprint = _fingerprint(training_set(directory)[0])
+    model = SeverityModel.load(path) if os.path.exists(path) else None
+    if model is None or model.fingerprint != fingerprint:
+        model = train_severity_model(directory)
+        model.save(path)
+    model.load_seconds = time.perf_counter() - started
+    return model
+
+
+class MicroBatcher:
+    """
+    Groups concurrent calls into batches for a function that takes a list of items
+    and returns a list of results. A batch is flushed once it holds
+    `max_batch_size` items or its oldest item has waited `max_delay` seconds, so
+    requests arriving together share one call and none waits longer than the budget.
+    """
+
+    def __init__(self, fn, max_batch_size=MAX_BATCH_SIZE, max_delay=MAX_BATCH_DELAY):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending = deque()
+        self._ready = threading.Condition()
+        self._stopping = False
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queues one item and returns a Future for its result."""
+        future = Future()
+        with self._ready:
+            if self._stopping:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((time.monotonic(), item, future))
+            self._ready.notify()
+        return future
+
+    def _next_batch(self):
+        with self._ready:
+            while not self._pending and not self._stopping:
+                self._ready.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0][0] + self.max_delay
+            while len(self._pending) < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            return [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch_size))]
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            futures = [future for _, _, future in batch]
+            try:
+                results = self.fn([item for _, item, _ in batch])
+            except Exception as exc:  # fail the callers, keep serving
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        with self._ready:
+            self._stopping = True
+            self._ready.notify_all()
+        self._thread.join()
+
+
+class SeverityClassifier:
+    """
+    Thread-safe front end to a SeverityModel. Callers decode their own image
+    (in parallel) and the decoded pixels are scored in shared micro-batches.
+    """
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_delay=MAX_BATCH_DELAY):
+        self.model = model
+        self.batcher = MicroBatcher(self._score, max_batch_size, max_delay)
+
+    def _score(self, pixels):
+        levels, confidence = self.model.predict(np.stack(pixels))
+        return list(zip(levels.tolist(), confidence.tolist()))
+
+    def classify(self, image):
+        """Returns (level, confidence) for one image given as a path or bytes."""
+        return self.batcher.submit(decode_image(image)).result()
+
+    def classify_many(self, images):
+        """Scores a list of images in one batch, bypassing the queue."""
+        if not images:
+            return []
+        return self._score([decode_image(image) for image in images])
+
+    def close(self):
+        self.batcher.close()
+
+
+def assess_evidence(classifier, image_store, digests):
+    """
+    Classifies evidence images given as {image name: digest} in the image store,
+    returning {image name: (level, confidence)}. Each distinct content is
+    classified once, however many names or claims refer to it.
+    """
+    results = image_store.analyze_many(SEVERITY_ANALYSIS, list(digests.values()), classifier.classify_many)
+    return dict(zip(digests, results))
@@ -1,5 +1,20 @@
+import uuid
+
 import streamlit as st
 from utils import load_design_system, render_header
+from decision_log import DecisionLog, claim_record
+from image_store import ImageStore
+from instrumentation import span, timed
+
+@timed("data.get_decision_log")
+@st.cache_resource
+def get_decision_log():
+    return DecisionLog()
+
+@timed("data.get_image_store")
+@st.cache_resource
+def get_image_store():
+    return ImageStore()
 
 # 1. Load Design
 load_design_system()
@@ -60,11 +75,26 @@ with st.container():
         if st.button("Analyze & Submit Claim"):
             if not uploaded_file:
                 st.error("Please upload an image first.")
+            elif not policy_num.strip():
+                st.error("Please enter your policy number.")
             else:
-                # This is where we would trigger the backend logic
-                st.markdown("""
+                form = {
+                    "policy_no": policy_num.strip(),
+                    "claim_date": date.isoformat(),
+                    "severity": severity,
+                    "incident_type": collision_type,
+                    "notes": description,
+                    "image_name": uploaded_file.name,
+                }
+                with span("data.image_store_put"):
+                    form["image_digest"] = get_image_store().put(uploaded_file.getvalue())
+                claim_no = str(uuid.uuid4())
+                session = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+                with span("data.record_claim"):
+                    get_decision_log().record_claim(claim_record(claim_no, form), session=session, form=form)
+                st.markdown(f"""
                     <div class="success-box">
-                        <b>Success!</b> Claim #8821 submitted. Analysis in progress...
+                        <b>Success!</b> Claim #{claim_no[:8].upper()} submitted. Analysis in progress...
                     </div>
                 """, unsafe_allow_html=True)
                 
@@ -0,0 +1,164 @@
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from claims_store import DATA_DIR
+from geo_index import distance_km
+
+TELEMATICS_DIR = os.path.join(DATA_DIR, "telematics")
+TELEMATICS_COLUMNS = ["chassis_no", "latitude", "longitude", "event_timestamp", "speed"]
+
+# --- SPEED CHECK DEFAULTS ---
+SPEED_LIMIT_MPH = 35
+# Claims record the incident hour; readings within this margin of that hour count.
+WINDOW_PADDING_SECONDS = 15 * 60
+
+
+def parse_event_timestamps(values):
+    """Parses "YYYY-MM-DD HH:MM:SS" strings into int64 epoch seconds."""
+    parsed = pd.to_datetime(pd.Series(values), format="%Y-%m-%d %H:%M:%S")
+    return parsed.to_numpy().astype("datetime64[s]").astype(np.int64)
+
+
+def incident_window(incident_date, hour, padding=WINDOW_PADDING_SECONDS):
+    """
+    Returns (start, end) epoch seconds covering the incident hour plus padding.
+    Accepts scalars or arrays (datetime64 dates, integer hours).
+    """
+    day = np.asarray(incident_date, dtype="datetime64[s]").astype(np.int64)
+    start = day + np.asarray(hour, dtype=np.int64) * 3600
+    return start - padding, start + 3600 + padding
+
+
+class TelematicsIndex:
+    """
+    Per-chassis, time-sorted index over the telematics readings.
+
+    Readings are sorted by (chassis, event time) once; each chassis owns a contiguous
+    slice (CSR offsets), so a window query is a dict probe plus two binary searches
+    on that slice. A composite int64 key (chassis slot << 32 | seconds since the
+    first reading) lets bulk queries binary-search all claims in one call.
+    """
+
+    def __init__(self, chassis_no, event_ts, speed, latitude, longitude):
+        codes, uniques = pd.factorize(np.asarray(chassis_no, dtype=object))
+        event_ts = np.asarray(event_ts, dtype=np.int64)
+        order = np.lexsort((event_ts, codes))
+        codes = codes[order].astype(np.int64)
+
+        self.event_ts = event_ts[order]
+        self.speed = np.asarray(speed, dtype=np.float32)[order]
+        self.latitude = np.asarray(latitude, dtype=np.float64)[order]
+        self.longitude = np.asarray(longitude, dtype=np.float64)[order]
+        self.chassis = np.asarray(uniques, dtype=object)
+        self._slots = dict(zip(uniques.tolist(), range(len(uniques))))
+        self.offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=self.offsets[1:])
+
+        self.epoch = int(self.event_ts.min()) if len(self.event_ts) else 0
+        self._keys = (codes << 32) | (self.event_ts - self.epoch)
+        # Trailing sentinel so reduceat can address the end of the array
+        self._speed_padded = np.append(self.speed, np.float32(-np.inf))
+
+    def __len__(self):
+        return len(self.event_ts)
+
+    @property
+    def vehicle_count(self):
+        return len(self._slots)
+
+    def window(self, chassis_no, start, end):
+        """Returns the (lo, hi) positions of a chassis's readings with start <= ts <= end."""
+        slot = self._slots.get(chassis_no)
+        if slot is None:
+            return 0, 0
+        first, last = self.offsets[slot], self.offsets[slot + 1]
+        ts = self.event_ts[first:last]
+        return first + np.searchsorted(ts, start, "left"), first + np.searchsorted(ts, end, "right")
+
+    def readings(self, chassis_no, start, end):
+        """Returns a DataFrame of the readings inside the window (for display)."""
+        lo, hi = self.window(chassis_no, start, end)
+        return pd.DataFrame({
+            "event_ts": self.event_ts[lo:hi],
+            "speed": self.speed[lo:hi],
+            "latitude": self.latitude[lo:hi],
+            "longitude": self.longitude[lo:hi],
+        })
+
+    def speed_check(self, chassis_no, start, end):
+        """Returns (reading count, max speed or NaN) for one chassis and window."""
+        lo, hi = self.window(chassis_no, start, end)
+        if hi <= lo:
+            return 0, float("nan")
+        return int(hi - lo), float(self.speed[lo:hi].max())
+
+    def bulk_windows(self, chassis_no, start, end):
+        """(lo, hi) reading positions of many (chassis, window) pairs, found with one binary search per bound."""
+        chassis_no = np.asarray(chassis_no, dtype=object)
+        slots = np.fromiter((self._slots.get(c, -1) for c in chassis_no), dtype=np.int64, count=len(chassis_no))
+        start = np.clip(np.asarray(start, dtype=np.int64) - self.epoch, 0, 2**32 - 1)
+        end = np.clip(np.asarray(end, dtype=np.int64) - self.epoch, -1, 2**32 - 1)
+        lo = np.searchsorted(self._keys, (slots << 32) | start, "left")
+        hi = np.searchsorted(self._keys, (slots << 32) | np.maximum(end, 0), "right")
+        return lo, np.where((slots >= 0) & (end >= 0), hi, lo)
+
+    def bulk_speed_check(self, chassis_no, start, end):
+        """
+        Vectorized speed check for many (chassis, window) pairs at once.
+        Returns (reading counts, max speeds with NaN where there are no readings).
+        """
+        lo, hi = self.bulk_windows(chassis_no, start, end)
+        counts = hi - lo
+
+        max_speed = np.full(len(counts), np.nan, dtype=np.float32)
+        hit = counts > 0
+        if hit.any():
+            # reduceat also reduces the gaps between windows; visiting windows in
+            # ascending order keeps the total gap work bounded by one array pass.
+            rows = np.flatnonzero(hit)
+            rows = rows[np.argsort(lo[rows], kind="stable")]
+            bounds = np.column_stack([lo[rows], hi[rows]]).ravel()
+            max_speed[rows] = np.maximum.reduceat(self._speed_padded, bounds)[::2]
+        return counts, max_speed
+
+    def bulk_location_check(self, chassis_no, latitude, longitude, start, end):
+        """
+        Vectorized location check: how close each chassis came to a point inside
+        its window. Returns (reading counts, nearest distances in km with NaN where
+        there are no readings or the point is NaN).
+        """
+        latitude, longitude = np.asarray(latitude, dtype=np.float64), np.asarray(longitude, dtype=np.float64)
+        lo, hi = self.bulk_windows(chassis_no, start, end)
+        counts = hi - lo
+        nearest = np.full(len(counts), np.nan)
+        rows = np.flatnonzero((counts > 0) & ~np.isnan(latitude) & ~np.isnan(longitude))
+        if len(rows):
+            # Only the readings inside the windows are visited, one segment per claim
+            sizes = counts[rows]
+            owner = np.repeat(np.arange(len(rows)), sizes)
+            positions = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes) + lo[rows][owner]
+            distance = distance_km(latitude[rows][owner], longitude[rows][owner],
+                                   self.latitude[positions], self.longitude[positions])
+            nearest[rows] = np.minimum.reduceat(distance, np.cumsum(sizes) - sizes)
+        return counts, nearest
+
+
+def load_telematics(directory=TELEMATICS_DIR):
+    """Reads every parquet partition once and builds the TelematicsIndex."""
+    started = time.perf_counter()
+    paths = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+    frames = [pd.read_parquet(path, columns=TELEMATICS_COLUMNS) for path in paths]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TELEMATICS_COLUMNS)
+    index = TelematicsIndex(
+        df["chassis_no"].to_numpy(dtype=object),
+        parse_event_timestamps(df["event_timestamp"]),
+        df["speed"].to_numpy(),
+        df["latitude"].to_numpy(),
+        df["longitude"].to_numpy(),
+    )
+    index.load_seconds = time.perf_counter() - started
+    return index
@@ -0,0 +1,412 @@
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from claims_store import CACHE_DIR
+from geo_index import distance_km
+from telematics import SPEED_LIMIT_MPH, TELEMATICS_COLUMNS, TELEMATICS_DIR, parse_event_timestamps
+
+# Local stand-in for the Kinesis stream: drop .parquet / .ndjson files here
+TELEMATICS_INBOX_DIR = os.environ.get("SMART_CLAIMS_TELEMATICS_INBOX", os.path.join(CACHE_DIR, "telematics_inbox"))
+# Events/sec to replay data/telematics at when set (0 = as fast as possible)
+TELEMATICS_REPLAY_RATE = os.environ.get("SMART_CLAIMS_TELEMATICS_REPLAY")
+
+# --- STREAM DEFAULTS ---
+RING_CAPACITY = 256  # readings kept per vehicle (~4 hours at one reading a minute)
+RETENTION_SECONDS = 24 * 3600  # event time kept behind the watermark
+ALLOWED_LATENESS_SECONDS = 5 * 60  # how far behind the newest event a reading may arrive
+POLL_INTERVAL = 0.5
+
+_INT64_MIN = np.iinfo(np.int64).min
+# Per-vehicle arrays: name -> (dtype, value of a free row, is a ring buffer)
+_VEHICLE_ARRAYS = {
+    "ring_ts": (np.int64, 0, True),
+    "ring_speed": (np.float32, 0, True),
+    "written": (np.int64, 0, False),
+    "last_ts": (np.int64, _INT64_MIN, False),
+    "last_speed": (np.float32, 0, False),
+    "last_latitude": (np.float64, np.nan, False),
+    "last_longitude": (np.float64, np.nan, False),
+    "episodes": (np.int64, 0, False),
+    "_chassis": (object, None, False),
+}
+
+
+class StreamingTelematics:
+    """
+    Rolling per-vehicle telematics state fed by an event stream, in bounded memory.
+
+    Each tracked chassis owns one row of fixed-size ring buffers (event time and
+    speed of its last RING_CAPACITY readings) plus running aggregates: last GPS
+    fix, last speed and the number of speeding episodes (runs of readings over the
+    limit). The watermark trails the newest event time by the allowed lateness;
+    readings behind it are dropped as late, readings older than the retention
+    window are ignored by queries, and vehicles silent for the whole window give
+    their row back. Batches are applied with array operations, not per event.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, retention=RETENTION_SECONDS,
+                 lateness=ALLOWED_LATENESS_SECONDS, limit=SPEED_LIMIT_MPH, initial_vehicles=1024):
+        self.capacity = capacity
+        self.retention = retention
+        self.lateness = lateness
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._free = []
+        for name, (dtype, fill, ring) in _VEHICLE_ARRAYS.items():
+            setattr(self, name, np.full((0, capacity) if ring else 0, fill, dtype=dtype))
+        self._allocate(initial_vehicles)
+
+        self.watermark = _INT64_MIN
+        self.newest_event = _INT64_MIN
+        self.version = 0
+        self._listeners = []
+        self.events = 0
+        self.late_events = 0
+        self.evicted_vehicles = 0
+
+    def _allocate(self, vehicles):
+        """Grows every per-vehicle array to `vehicles` rows; the new rows are free."""
+        current = len(self._chassis)
+        for name, (dtype, fill, ring) in _VEHICLE_ARRAYS.items():
+            grown = np.full((vehicles, self.capacity) if ring else vehicles, fill, dtype=dtype)
+            grown[:current] = getattr(self, name)
+            setattr(self, name, grown)
+        self._free.extend(range(vehicles - 1, current - 1, -1))
+
+    @property
+    def retained_since(self):
+        """Oldest event time still answered by queries."""
+        return max(self.watermark - self.retention, _INT64_MIN)
+
+    def _slots_for(self, chassis):
+        """Row of every chassis in the batch, assigning rows to new vehicles."""
+        codes, uniques = pd.factorize(chassis)
+        rows = np.empty(len(uniques), dtype=np.int64)
+        for i, name in enumerate(uniques.tolist()):
+            slot = self._slots.get(name)
+            if slot is None:
+                if not self._free:
+                    self._allocate(len(self._chassis) * 2)
+                slot = self._slots[name] = self._free.pop()
+                self._chassis[slot] = name
+            rows[i] = slot
+        return rows[codes]
+
+    def __len__(self):
+        return len(self._slots)
+
+    # --- INGESTION ---
+    def add_listener(self, listener):
+        """Registers an object notified through `readings_ingested(chassis_nos)` after each batch."""
+        self._listeners.append(listener)
+
+    def ingest(self, chassis_no, event_ts, speed, latitude, longitude):
+        """Applies one batch of readings; returns the number accepted."""
+        accepted, chassis_no = self._ingest(chassis_no, event_ts, speed, latitude, longitude)
+        if accepted and self._listeners:
+            touched = np.unique(chassis_no.astype(str))
+            for listener in self._listeners:
+                listener.readings_ingested(touched)
+        return accepted
+
+    def _ingest(self, chassis_no, event_ts, speed, latitude, longitude):
+        event_ts = np.asarray(event_ts, dtype=np.int64)
+        with self._lock:
+            on_time = event_ts >= self.watermark
+            self.late_events += int((~on_time).sum())
+            if not on_time.any():
+                return 0, None
+            chassis_no = np.asarray(chassis_no, dtype=object)[on_time]
+            event_ts = event_ts[on_time]
+            speed = np.asarray(speed, dtype=np.float32)[on_time]
+            latitude = np.asarray(latitude, dtype=np.float64)[on_time]
+            longitude = np.asarray(longitude, dtype=np.float64)[on_time]
+
+            slots = self._slots_for(chassis_no)
+            order = np.lexsort((event_ts, slots))
+            slots, event_ts, speed = slots[order], event_ts[order], speed[order]
+            latitude, longitude = latitude[order], longitude[order]
+
+            first = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+            group = np.repeat(np.arange(len(first)), np.diff(np.r_[first, len(slots)]))
+            rank = np.arange(len(slots)) - first[group]
+            sizes = np.bincount(group)
+            touched = slots[first]
+
+            # Ring append; a vehicle sending more than `capacity` readings keeps the newest
+            keep = rank >= sizes[group] - self.capacity
+            position = (self.written[slots] + rank) % self.capacity
+            self.ring_ts[slots[keep], position[keep]] = event_ts[keep]
+            self.ring_speed[slots[keep], position[keep]] = speed[keep]
+            self.written[touched] += sizes
+
+            # Speeding episodes start where a reading is over the limit and the previous one was not
+            previous = np.r_[np.float32(0), speed[:-1]]
+            previous[first] = self.last_speed[touched]
+            starts = (speed > self.limit) & (previous <= self.limit)
+            self.episodes[touched] += np.bincount(group, weights=starts, minlength=len(first)).astype(np.int64)
+
+            # Last fix: the newest reading of each vehicle in this batch, if newer than what we had
+            last = np.r_[first[1:], len(slots)] - 1
+            newer = event_ts[last] >= self.last_ts[touched]
+            rows, picks = touched[newer], last[newer]
+            self.last_ts[rows] = event_ts[picks]
+            self.last_latitude[rows] = latitude[picks]
+            self.last_longitude[rows] = longitude[picks]
+            self.last_speed[touched] = speed[last]
+
+            self.events += len(slots)
+            newest = int(event_ts.max())
+            if newest > self.newest_event:
+                self.newest_event = newest
+                self.watermark = newest - self.lateness
+                self._evict_idle()
+            self.version += 1
+            return len(slots), chassis_no
+
+    def ingest_frame(self, frame):
+        """Ingests a DataFrame with the telematics columns (event_timestamp as text or epoch seconds)."""
+        timestamps = frame["event_timestamp"]
+        if not pd.api.types.is_integer_dtype(timestamps):
+            timestamps = parse_event_timestamps(timestamps)
+        return self.ingest(
+            frame["chassis_no"].to_numpy(dtype=object), timestamps, frame["speed"].to_numpy(),
+            frame["latitude"].to_numpy(), frame["longitude"].to_numpy(),
+        )
+
+    def _evict_idle(self):
+        """Frees the rows of vehicles with no reading inside the retention window."""
+        idle = np.flatnonzero((self.last_ts < self.retained_since) & (self.written > 0))
+        for name in self._chassis[idle].tolist():
+            del self._slots[name]
+        for name, (_, fill, _) in _VEHICLE_ARRAYS.items():
+            getattr(self, name)[idle] = fill
+        self._free.extend(idle.tolist())
+        self.evicted_vehicles += len(idle)
+
+    # --- QUERIES ---
+    def _window_mask(self, slots, start, end):
+        """(len(slots), capacity) mask of retained readings inside [start, end]."""
+        filled = np.arange(self.capacity) < np.minimum(self.written[slots], self.capacity)[:, None]
+        start = np.maximum(np.asarray(start, dtype=np.int64), self.retained_since)
+        ts = self.ring_ts[slots]
+        return filled & (ts >= start[..., None]) & (ts <= np.asarray(end, dtype=np.int64)[..., None])
+
+    def bulk_speed_check(self, chassis_no, start, end):
+        """Same contract as TelematicsIndex.bulk_speed_check, over the retained stream."""
+        chassis_no = np.asarray(chassis_no, dtype=object)
+        counts = np.zeros(len(chassis_no), dtype=np.int64)
+        max_speed = np.full(len(chassis_no), np.nan, dtype=np.float32)
+        with self._lock:
+            slots = np.fromiter((self._slots.get(c, -1) for c in chassis_no), dtype=np.int64, count=len(chassis_no))
+            known = np.flatnonzero(slots >= 0)
+            if len(known):
+                mask = self._window_mask(slots[known], np.asarray(start)[known], np.asarray(end)[known])
+                counts[known] = mask.sum(1)
+                speeds = np.where(mask, self.ring_speed[slots[known]], -np.inf).max(1)
+                max_speed[known] = np.where(counts[known] > 0, speeds, np.nan)
+        return counts, max_speed
+
+    def speed_check(self, chassis_no, start, end):
+        counts, max_speed = self.bulk_speed_check([chassis_no], [start], [end])
+        return int(counts[0]), float(max_speed[0])
+
+    def bulk_location_check(self, chassis_no, latitude, longitude, start, end):
+        """
+        Same contract as TelematicsIndex.bulk_location_check, but the stream only
+        keeps each vehicle's last GPS fix, so at most that one reading counts.
+        """
+        chassis_no = np.asarray(chassis_no, dtype=object)
+        counts = np.zeros(len(chassis_no), dtype=np.int64)
+        nearest = np.full(len(chassis_no), np.nan)
+        with self._lock:
+            slots = np.fromiter((self._slots.get(c, -1) for c in chassis_no), dtype=np.int64, count=len(chassis_no))
+            known = np.flatnonzero(slots >= 0)
+            if len(known):
+                last = self.last_ts[slots[known]]
+                inside = ((last >= np.maximum(np.asarray(start, dtype=np.int64)[known], self.retained_since))
+                          & (last <= np.asarray(end, dtype=np.int64)[known]))
+                rows = known[inside]
+                counts[rows] = 1
+                nearest[rows] = distance_km(np.asarray(latitude)[rows], np.asarray(longitude)[rows],
+                                            self.last_latitude[slots[rows]], self.last_longitude[slots[rows]])
+        return counts, nearest
+
+    def vehicle(self, chassis_no):
+        """Rolling aggregates of one vehicle, or None when it is not tracked."""
+        with self._lock:
+            slot = self._slots.get(chassis_no)
+            if slot is None:
+                return None
+            mask = self._window_mask(np.array([slot]), [_INT64_MIN], [np.iinfo(np.int64).max])[0]
+            speeds = self.ring_speed[slot][mask]
+            return {
+                "readings": int(mask.sum()),
+                "max_speed": float(speeds.max()) if len(speeds) else float("nan"),
+                "speeding_episodes": int(self.episodes[slot]),
+                "last_speed": float(self.last_speed[slot]),
+                "last_seen": pd.Timestamp(int(self.last_ts[slot]), unit="s"),
+                "latitude": float(self.last_latitude[slot]),
+                "longitude": float(self.last_longitude[slot]),
+            }
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in _VEHICLE_ARRAYS)
+
+    def stats(self):
+        with self._lock:
+            rows = len(self._chassis)
+            return {
+                "vehicles": len(self._slots),
+                "events": self.events,
+                "late_events": self.late_events,
+                "evicted_vehicles": self.evicted_vehicles,
+                "watermark": pd.Timestamp(self.watermark, unit="s") if self.events else None,
+                "bytes": self.nbytes(),
+                "bytes_per_vehicle": self.nbytes() / rows,
+            }
+
+
+class LiveTelematics:
+    """
+    The static TelematicsIndex plus the live stream, behind the speed- and
+    location-check interface the rule engine uses. `version` changes whenever
+    new readings land.
+
+    Stream readings at or before the index's last reading are left out of the
+    checks: they are already in the index (a ReplaySource replays the same
+    partitions, an inbox file may be delivered again) and would count twice.
+    """
+
+    def __init__(self, index, stream, ingestor=None):
+        self.index = index
+        self.stream = stream
+        self.ingestor = ingestor
+        self.static_until = int(index.event_ts.max()) if len(index) else _INT64_MIN
+
+    def _stream_start(self, start):
+        return np.maximum(np.asarray(start, dtype=np.int64), self.static_until + 1)
+
+    @property
+    def version(self):
+        return self.stream.version
+
+    def bulk_speed_check(self, chassis_no, start, end):
+        counts, max_speed = self.index.bulk_speed_check(chassis_no, start, end)
+        live_counts, live_max = self.stream.bulk_speed_check(chassis_no, self._stream_start(start), end)
+        return counts + live_counts, np.fmax(max_speed, live_max)
+
+    def speed_check(self, chassis_no, start, end):
+        counts, max_speed = self.bulk_speed_check([chassis_no], [start], [end])
+        return int(counts[0]), float(max_speed[0])
+
+    def bulk_location_check(self, chassis_no, latitude, longitude, start, end):
+        counts, nearest = self.index.bulk_location_check(chassis_no, latitude, longitude, start, end)
+        live_counts, live_nearest = self.stream.bulk_location_check(
+            chassis_no, latitude, longitude, self._stream_start(start), end)
+        return counts + live_counts, np.fmin(nearest, live_nearest)
+
+    def vehicle(self, chassis_no):
+        return self.stream.vehicle(chassis_no)
+
+    def add_listener(self, listener):
+        self.stream.add_listener(listener)
+
+
+# --- SOURCES ---
+class DirectorySource:
+    """
+    Tails a directory for new .parquet / .ndjson files, each read once in name
+    order. Producers should write under a dot-prefixed name and rename when done.
+    """
+
+    def __init__(self, directory=TELEMATICS_INBOX_DIR):
+        self.directory = directory
+        self._seen = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def poll(self):
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if not name.startswith(".") and name.endswith((".parquet", ".ndjson", ".jsonl")) and name not in self._seen
+        )
+        for name in names:
+            self._seen.add(name)
+            path = os.path.join(self.directory, name)
+            if name.endswith(".parquet"):
+                yield pd.read_parquet(path, columns=TELEMATICS_COLUMNS)
+            else:
+                with open(path) as lines:
+                    yield pd.DataFrame([json.loads(line) for line in lines if line.strip()], columns=TELEMATICS_COLUMNS)
+
+
+class ReplaySource:
+    """
+    Replays the static partitions in event-time order at `rate` events/sec
+    (0 or None = as fast as the consumer takes them), `batch_size` events at a time.
+    """
+
+    def __init__(self, directory=TELEMATICS_DIR, rate=None, batch_size=5000):
+        paths = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+        frame = pd.concat([pd.read_parquet(path, columns=TELEMATICS_COLUMNS) for path in paths], ignore_index=True)
+        frame["event_timestamp"] = parse_event_timestamps(frame["event_timestamp"])
+        self.frame = frame.sort_values("event_timestamp", kind="stable", ignore_index=True)
+        self.rate = rate
+        self.batch_size = batch_size
+        self.position = 0
+        self._started = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    def poll(self):
+        if self._started is None:
+            self._started = time.monotonic()
+        due = len(self.frame) if not self.rate else int((time.monotonic() - self._started) * self.rate)
+        while self.position < min(due, len(self.frame)):
+            end = min(self.position + self.batch_size, due, len(self.frame))
+            yield self.frame.iloc[self.position:end]
+            self.position = end
+
+
+class TelematicsIngestor:
+    """Background thread moving batches from a source into a StreamingTelematics."""
+
+    def __init__(self, stream, source, poll_interval=POLL_INTERVAL):
+        self.stream = stream
+        self.source = source
+        self.poll_interval = poll_interval
+        self.errors = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="telematics-ingest", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                for batch in self.source.poll():
+                    self.stream.ingest_frame(batch)
+            except Exception:  # a bad file must not stop ingestion
+                self.errors += 1
+            self._stopping.wait(self.poll_interval)
+
+    def close(self):
+        self._stopping.set()
+        self._thread.join()
+
+
+def start_live_telematics(index, inbox=TELEMATICS_INBOX_DIR, replay_rate=TELEMATICS_REPLAY_RATE):
+    """
+    Wraps the static index with a stream fed from the inbox directory, or from a
+    replay of data/telematics when a replay rate is configured.
+    """
+    stream = StreamingTelematics()
+    source = ReplaySource(rate=float(replay_rate)) if replay_rate is not None else DirectorySource(inbox)
+    return LiveTelematics(index, stream, TelematicsIngestor(stream, source))
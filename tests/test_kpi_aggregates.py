@@ -0,0 +1,52 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from claims_store import STATUSES, load_claims_store
+from kpi_aggregates import KpiAggregates
+
+SEVERITIES = ["Trivial Damage", "Minor Damage", "Major Damage", "Total Loss"]
+
+
+@pytest.fixture(scope="module")
+def source():
+    return load_claims_store()
+
+
+def random_claims(store, rng, count):
+    """New claims copied from random existing ones, with fresh numbers, severities, totals and statuses."""
+    records = []
+    for row in rng.integers(0, len(store.claims), count):
+        record = dict(store.claim_at(int(row)), claim_no=str(uuid.UUID(int=int(rng.integers(2**63)))))
+        record["severity"] = SEVERITIES[rng.integers(len(SEVERITIES))]
+        record["total"] = int(rng.integers(0, 100_000))
+        if rng.random() < 0.5:
+            record["status"] = STATUSES[rng.integers(len(STATUSES))]
+        else:
+            del record["status"]
+        records.append(record)
+    return records
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_matches_full_recompute(source, seed):
+    rng = np.random.default_rng(seed)
+    store = type(source)(source.claims.copy(), source.policies, source.customers)
+    kpis = KpiAggregates.from_claims(store.claims)
+    store.add_listener(kpis)
+    kpis.verify(store.claims)
+    for _ in range(60):
+        if rng.random() < 0.3:
+            store.add_claims(random_claims(store, rng, int(rng.integers(1, 5))))
+        else:
+            row = int(rng.integers(len(store.claims)))
+            store.set_status(store.claim_at(row)["claim_no"], STATUSES[rng.integers(len(STATUSES))])
+        kpis.verify(store.claims)
+
+
+def test_verify_detects_drift(source):
+    kpis = KpiAggregates.from_claims(source.claims)
+    kpis.buckets[STATUSES[0]][0] += 1
+    with pytest.raises(AssertionError):
+        kpis.verify(source.claims)
@@ -1,5 +1,13 @@
+import uuid
+from contextlib import contextmanager
+
 import streamlit as st
+from instrumentation import timed
+
+# URL query parameter carrying the persisted session id, so any replica can resume the session
+SESSION_PARAM = "sid"
 
+@timed("view.load_design_system")
 def load_design_system():
     """
     Injects the complete CSS Design System for the Smart Claims App.
@@ -160,6 +168,7 @@ def load_design_system():
         </style>
     """, unsafe_allow_html=True)
 
+@timed("view.render_header")
 def render_header():
     """
     Renders the top navigation bar with Logo and User Profile.
@@ -180,4 +189,29 @@ def render_header():
                 </div>
             </div>
         </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+@contextmanager
+def persisted_session(backend, keys):
+    """
+    Restores the listed session-state keys from the session backend the first
+    time this browser session runs, and saves them back when the script run ends
+    (st.rerun included) if they changed. Values must be compact and
+    JSON-serializable: claim numbers and image digests, never rows or bytes.
+    """
+    session = st.query_params.get(SESSION_PARAM)
+    if not session or not session.isalnum():
+        session = uuid.uuid4().hex
+        st.query_params[SESSION_PARAM] = session
+    if st.session_state.get('session_id') != session:
+        restored = backend.load(session) or {}
+        st.session_state.update(restored)
+        st.session_state['session_id'] = session
+        st.session_state['persisted_state'] = restored
+    try:
+        yield session
+    finally:
+        state = {key: st.session_state[key] for key in keys if key in st.session_state}
+        if state != st.session_state.get('persisted_state'):
+            backend.save(session, state)
+            st.session_state['persisted_state'] = state
@@ -0,0 +1,363 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from claims_store import (
+    CACHE_DIR, CLAIM_CATEGORIES, CUSTOMER_CATEGORIES, POLICY_CATEGORIES, SQL_SERVER_DIR, ClaimsStore,
+    initial_status, join_rows, parse_claims, parse_customers, parse_policies,
+)
+
+WAREHOUSE_DIR = os.path.join(CACHE_DIR, "warehouse")
+MANIFEST_FORMAT = 1
+RUN_HISTORY = 20
+CUSTOMER_BUCKETS = 8
+
+# Source table -> typed silver table. `partition` derives the partition value of
+# each raw (all-text) source row; `categories` are restored as categoricals on load.
+TableSpec = namedtuple("TableSpec", ["name", "file", "key", "parse", "partition_column", "partition", "categories"])
+
+
+def _year_of(column):
+    return lambda raw: pd.to_numeric(raw[column].str[:4], errors="coerce").fillna(0).astype(np.int64)
+
+
+def _customer_bucket(raw):
+    ids = pd.to_numeric(raw["customer_id"], errors="coerce").fillna(0).astype(np.int64)
+    return ids % CUSTOMER_BUCKETS
+
+
+TABLES = [
+    TableSpec("claims", "claims.csv", "claim_no", parse_claims, "claim_year", _year_of("claim_date"), CLAIM_CATEGORIES),
+    TableSpec("policies", "policies.csv", "POLICY_NO", parse_policies, "eff_year", _year_of("POL_EFF_DATE"), POLICY_CATEGORIES),
+    TableSpec("customers", "customers.csv", "customer_id", parse_customers, "bucket", _customer_bucket, CUSTOMER_CATEGORIES),
+]
+TABLES_BY_NAME = {spec.name: spec for spec in TABLES}
+
+# Gold: one denormalized row per claim with its policy and customer
+GOLD_TABLE = "claims_enriched"
+GOLD_PARTITION = "claim_year"
+GOLD_POLICY_COLUMNS = [
+    "POLICYTYPE", "POL_EFF_DATE", "POL_EXPIRY_DATE", "MAKE", "MODEL", "MODEL_YEAR", "CHASSIS_NO",
+    "USE_OF_VEHICLE", "PRODUCT", "SUM_INSURED", "PREMIUM", "DEDUCTABLE", "CUST_ID",
+]
+GOLD_CUSTOMER_COLUMNS = ["name", "date_of_birth", "borough", "neighborhood", "zip_code"]
+# Latest re-adjudication results (readjudicate.py), keyed by claim_no and joined onto the claims on load
+ADJUDICATIONS_TABLE = "claim_adjudications"
+
+
+# --- FILE HELPERS ---
+def _write_parquet(df, path):
+    """Writes through a temp file + rename so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _write_json(data, path):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as out:
+        json.dump(data, out, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _partition_path(table_dir, column, value):
+    return os.path.join(table_dir, f"{column}={value}", "part-0.parquet")
+
+
+class Warehouse:
+    """
+    Local medallion layout for the SQL Server extracts, under `root`:
+
+    - bronze/<table>.parquet: source rows as raw text, with a stable row key
+      (key + occurrence, since a few keys repeat) and a content hash per row.
+    - silver/<table>/<column>=<value>/: typed, cleaned rows (the ClaimsStore
+      parsers), hive-partitioned; silver/_order/<table>.parquet keeps source order.
+    - gold/claims_enriched/claim_year=<year>/: claims joined with their policy
+      and customer, for readers that want one wide table.
+    - gold/claim_adjudications/: the latest bulk re-adjudication results per
+      claim_no, added to the store's claims by `load_store`.
+    - manifest.json: source fingerprints, partition row counts and recent runs.
+
+    `refresh` is incremental: untouched source files are skipped by fingerprint,
+    and within a changed file only inserted/updated/deleted rows (found by hash)
+    are parsed and spliced into their silver partitions. Gold partitions are
+    rebuilt only for claim years touched by a claim, policy or customer change.
+
+    The dashboards keep one in-memory ClaimsStore built from silver: the grid,
+    KPIs and rule indexes need every claim, including those submitted or
+    decided since the last refresh, which gold does not hold. Gold serves
+    one-off wide reads, such as the grid's CSV export, with `read_gold`.
+    """
+
+    def __init__(self, root=WAREHOUSE_DIR, source_dir=SQL_SERVER_DIR):
+        self.root = root
+        self.source_dir = source_dir
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as source:
+                manifest = json.load(source)
+            if manifest.get("format") == MANIFEST_FORMAT:
+                return manifest
+        return {"format": MANIFEST_FORMAT, "tables": {}, "gold": {}, "runs": []}
+
+    def layer_dir(self, layer, table):
+        return os.path.join(self.root, layer, table)
+
+    # --- BUILD ---
+    def refresh(self, force=False):
+        """Brings silver and gold up to date with the sources; returns the run record."""
+        started = time.perf_counter()
+        os.makedirs(self.root, exist_ok=True)
+        run = {"started_at": pd.Timestamp.now().isoformat(timespec="seconds"), "tables": {}}
+        changed = {}
+        for spec in TABLES:
+            path = os.path.join(self.source_dir, spec.file)
+            fingerprint = _source_fingerprint(path)
+            state = self.manifest["tables"].get(spec.name)
+            if not force and state and state["source"] == fingerprint:
+                continue
+            changed[spec.name], run["tables"][spec.name] = self._refresh_table(spec, path, force)
+            self.manifest["tables"][spec.name] = {
+                "source": fingerprint,
+                "rows": run["tables"][spec.name]["rows"],
+                "partitions": self._partition_counts(spec),
+                "updated_at": run["started_at"],
+            }
+        if changed or force or not self.manifest["gold"]:
+            run["gold_partitions"] = self._refresh_gold(changed, force or not self.manifest["gold"])
+        run["seconds"] = round(time.perf_counter() - started, 4)
+        if run["tables"] or run.get("gold_partitions"):
+            self.manifest["runs"] = (self.manifest["runs"] + [run])[-RUN_HISTORY:]
+            _write_json(self.manifest, self.manifest_path)
+        return run
+
+    def _refresh_table(self, spec, path, force):
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+        key = raw[spec.key].str.strip()
+        raw["_row_key"] = key + "#" + key.groupby(key).cumcount().astype(str)
+        raw["_row_hash"] = pd.util.hash_pandas_object(raw.drop(columns="_row_key"), index=False).to_numpy()
+        raw["_partition"] = spec.partition(raw).to_numpy()
+
+        bronze_path = os.path.join(self.root, "bronze", f"{spec.name}.parquet")
+        if os.path.exists(bronze_path) and not force:
+            previous = pq.read_table(bronze_path, columns=["_row_key", "_row_hash", "_partition"]).to_pandas()
+        else:
+            previous = pd.DataFrame({"_row_key": [], "_row_hash": np.array([], np.uint64), "_partition": np.array([], np.int64)})
+            shutil.rmtree(self.layer_dir("silver", spec.name), ignore_errors=True)
+
+        merged = raw[["_row_key", "_row_hash", "_partition"]].merge(
+            previous, on="_row_key", how="outer", suffixes=("", "_old"), indicator=True
+        )
+        inserted = merged["_merge"] == "left_only"
+        deleted = merged["_merge"] == "right_only"
+        updated = (merged["_merge"] == "both") & (merged["_row_hash"] != merged["_row_hash_old"])
+        stale_keys = set(merged.loc[deleted | updated, "_row_key"])
+        affected = set(merged.loc[inserted | updated, "_partition"].dropna().astype(np.int64))
+        affected |= set(merged.loc[deleted | updated, "_partition_old"].dropna().astype(np.int64))
+
+        # Only the new and changed rows go through the typed parser
+        fresh = raw[raw["_row_key"].isin(set(merged.loc[inserted | updated, "_row_key"]))]
+        parsed = spec.parse(io.StringIO(fresh.drop(columns=["_row_key", "_row_hash", "_partition"]).to_csv(index=False)))
+        parsed = parsed.drop(columns=["status"], errors="ignore")
+        parsed["_row_key"] = fresh["_row_key"].to_numpy()
+        partitions = fresh["_partition"].to_numpy()
+
+        table_dir = self.layer_dir("silver", spec.name)
+        for value in sorted(affected):
+            path = _partition_path(table_dir, spec.partition_column, value)
+            parts = [parsed[partitions == value]]
+            if os.path.exists(path):
+                existing = pd.read_parquet(path)
+                parts.insert(0, existing[~existing["_row_key"].isin(stale_keys)])
+            rows = pd.concat(parts, ignore_index=True)
+            if len(rows):
+                _write_parquet(rows, path)
+            elif os.path.exists(path):
+                shutil.rmtree(os.path.dirname(path))
+
+        _write_parquet(raw[["_row_key"]], os.path.join(self.root, "silver", "_order", f"{spec.name}.parquet"))
+        _write_parquet(raw, bronze_path)
+        changes = {
+            "rows": len(raw),
+            "inserted": int(inserted.sum()),
+            "updated": int(updated.sum()),
+            "deleted": int(deleted.sum()),
+            "partitions_rewritten": len(affected),
+        }
+        touched = {
+            "keys": set(fresh[spec.key].str.strip()) | {k.rsplit("#", 1)[0] for k in stale_keys},
+            "partitions": affected,
+        }
+        return touched, changes
+
+    def _partition_counts(self, spec):
+        table_dir = self.layer_dir("silver", spec.name)
+        counts = {}
+        for name in sorted(os.listdir(table_dir)) if os.path.isdir(table_dir) else []:
+            path = os.path.join(table_dir, name, "part-0.parquet")
+            if os.path.exists(path):
+                counts[name.split("=", 1)[1]] = pq.ParquetFile(path).metadata.num_rows
+        return counts
+
+    def _refresh_gold(self, changed, rebuild):
+        """Rebuilds the gold partitions whose claims, policies or customers changed."""
+        claims_keys = self.read_silver("claims", columns=["policy_no", GOLD_PARTITION], typed=False)
+        years = claims_keys[GOLD_PARTITION].to_numpy()
+        gold_dir = self.layer_dir("gold", GOLD_TABLE)
+        if rebuild:
+            shutil.rmtree(gold_dir, ignore_errors=True)
+            affected = set(years.tolist())
+        else:
+            affected = set(changed.get("claims", {}).get("partitions", set()))
+            policies = None
+            if "policies" in changed or "customers" in changed:
+                policies = self.read_silver("policies", columns=["POLICY_NO", "CUST_ID"], typed=False)
+            policy_keys = set(changed.get("policies", {}).get("keys", set()))
+            if "customers" in changed:
+                customer_ids = {int(float(key)) for key in changed["customers"]["keys"] if key}
+                policy_keys |= set(policies.loc[policies["CUST_ID"].isin(customer_ids), "POLICY_NO"])
+            if policy_keys:
+                affected |= set(years[claims_keys["policy_no"].isin(policy_keys).to_numpy()].tolist())
+
+        if affected:
+            claims = self.read_silver("claims", partitions=sorted(affected), keep_partition=True)
+            policies = self.read_silver("policies")
+            customers = self.read_silver("customers")
+            gold = self._denormalize(claims, policies, customers)
+            for value in sorted(affected):
+                rows = gold[gold[GOLD_PARTITION] == value].drop(columns=[GOLD_PARTITION])
+                path = _partition_path(gold_dir, GOLD_PARTITION, value)
+                if len(rows):
+                    _write_parquet(rows, path)
+                elif os.path.exists(path):
+                    shutil.rmtree(os.path.dirname(path))
+        self.manifest["gold"][GOLD_TABLE] = {
+            "partitions": {
+                name.split("=", 1)[1]: pq.ParquetFile(os.path.join(gold_dir, name, "part-0.parquet")).metadata.num_rows
+                for name in sorted(os.listdir(gold_dir))
+            } if os.path.isdir(gold_dir) else {},
+        }
+        return sorted(int(value) for value in affected)
+
+    @staticmethod
+    def _denormalize(claims, policies, customers):
+        policy_row = join_rows(claims["policy_no"].to_numpy(), policies["POLICY_NO"].to_numpy())
+        customer_row = join_rows(policies["CUST_ID"].to_numpy(), customers["customer_id"].to_numpy())
+        gold = claims.drop(columns=["status"], errors="ignore").reset_index(drop=True)
+        policy_part = policies[GOLD_POLICY_COLUMNS].reindex(np.where(policy_row >= 0, policy_row, len(policies)))
+        gold = pd.concat([gold, policy_part.reset_index(drop=True)], axis=1)
+        linked = np.where(policy_row >= 0, customer_row[policy_row], -1)
+        customer_part = customers[GOLD_CUSTOMER_COLUMNS].reindex(np.where(linked >= 0, linked, len(customers)))
+        return pd.concat([gold, customer_part.reset_index(drop=True)], axis=1)
+
+    # --- READ ---
+    def read_silver(self, name, columns=None, partitions=None, typed=True, keep_partition=False):
+        """
+        Reads a silver table in source order. `columns` prunes columns and
+        `partitions` prunes partition directories before any data is read.
+        """
+        spec = TABLES_BY_NAME[name]
+        filters = [(spec.partition_column, "in", list(partitions))] if partitions is not None else None
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ["_row_key"]))
+        df = pq.read_table(
+            self.layer_dir("silver", name), columns=read_columns, filters=filters, partitioning="hive"
+        ).to_pandas()
+        order = pq.read_table(os.path.join(self.root, "silver", "_order", f"{name}.parquet")).column("_row_key")
+        position = pd.Index(order.to_pandas()).get_indexer(df["_row_key"])
+        df = df.iloc[np.argsort(position, kind="stable")].reset_index(drop=True)
+        if columns is None:
+            columns = [c for c in df.columns if c not in ("_row_key", spec.partition_column)]
+        if keep_partition and spec.partition_column not in columns:
+            columns = list(columns) + [spec.partition_column]
+        df = df[list(columns)].copy()
+        if spec.partition_column in df:
+            df[spec.partition_column] = df[spec.partition_column].astype(np.int64)
+        return _restore_types(df, spec.categories) if typed else df
+
+    def read_gold(self, columns=None, filters=None):
+        """
+        Reads the denormalized claims table. `columns` are pruned at the file
+        level and `filters` (pyarrow DNF, e.g. [("claim_year", ">=", 2020),
+        ("severity", "=", "Total Loss")]) skip partitions and row groups.
+        """
+        table = pq.read_table(self.layer_dir("gold", GOLD_TABLE), columns=columns, filters=filters, partitioning="hive")
+        return _restore_types(table.to_pandas(), CLAIM_CATEGORIES + POLICY_CATEGORIES + CUSTOMER_CATEGORIES)
+
+    def read_adjudications(self):
+        """The latest re-adjudication results (one row per claim_no), or None before the first run."""
+        path = os.path.join(self.layer_dir("gold", ADJUDICATIONS_TABLE), "part-0.parquet")
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def write_adjudications(self, results):
+        """Replaces the re-adjudication results (a DataFrame with a claim_no column)."""
+        os.makedirs(self.root, exist_ok=True)
+        _write_parquet(results, os.path.join(self.layer_dir("gold", ADJUDICATIONS_TABLE), "part-0.parquet"))
+        self.manifest["adjudications"] = {
+            "rows": len(results), "updated_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+        }
+        _write_json(self.manifest, self.manifest_path)
+
+    def load_store(self):
+        """
+        Builds a ClaimsStore from the silver tables, without parsing any CSV, with
+        the latest re-adjudication results as extra claim columns.
+        """
+        started = time.perf_counter()
+        claims = self.read_silver("claims")
+        claims["status"] = initial_status(len(claims))
+        store = ClaimsStore(claims, self.read_silver("policies"), self.read_silver("customers"))
+        adjudications = self.read_adjudications()
+        if adjudications is not None:
+            store.set_columns(_align(adjudications, "claim_no", store.claims["claim_no"].to_numpy()))
+        store.load_seconds = time.perf_counter() - started
+        return store
+
+
+def _restore_types(df, categories):
+    """
+    Matches the dtypes of the CSV parsers: categoricals with sorted categories
+    (partitions are written separately, so their dictionaries differ) and text
+    as object columns, which the store's row reader expects.
+    """
+    for name in df.columns:
+        if name in categories:
+            column = df[name] if isinstance(df[name].dtype, pd.CategoricalDtype) else df[name].astype("category")
+            column = column.cat.remove_unused_categories()
+            df[name] = column.cat.reorder_categories(column.cat.categories.sort_values())
+        elif pd.api.types.is_string_dtype(df[name].dtype) and df[name].dtype != object:
+            df[name] = df[name].astype(object)
+    return df
+
+
+def _align(df, key, keys):
+    """Columns of `df` (all but `key`) reordered to match `keys`, missing where a key has no row."""
+    rows = join_rows(keys, df[key].to_numpy())
+    aligned = df.drop(columns=[key]).reindex(np.where(rows >= 0, rows, len(df)))
+    return {name: column.reset_index(drop=True) for name, column in aligned.items()}
+
+
+def load_claims_store_from_warehouse(root=WAREHOUSE_DIR, source_dir=SQL_SERVER_DIR):
+    """Refreshes the warehouse (a no-op when the sources are unchanged) and loads the store from silver."""
+    warehouse = Warehouse(root, source_dir)
+    run = warehouse.refresh()
+    store = warehouse.load_store()
+    store.refresh_run = run
+    return store